@@ -1,37 +1,35 @@
+import os
 from flask import Flask, render_template, request, url_for, redirect
 from books import all_books  # Assume all_books is a list of book dicts in books.py
+import search
+import catalogue
 
 app = Flask(__name__, static_folder='static')  # Make sure this points to 'static'
 
-for i, b in enumerate(all_books):
-    b['id'] = i + 1
+# Sorted per-category views, id lookups and paragraph summaries are all built here, once
+store = catalogue.load(all_books)
 
-# Utility to fetch first and last paragraphs of description
-def get_first_last_paragraph(description):
-    paragraphs = [p for p in description if p]
-    if len(paragraphs) >= 2:
-        return paragraphs[0], paragraphs[-1]
-    elif paragraphs:
-        return paragraphs[0], ''
-    else:
-        return '', ''
+# Full-text index over all_books, reused from disk while the list is unchanged
+SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', os.path.join(app.instance_path, 'search_index.json'))
+search_index = search.load_index(SEARCH_INDEX_PATH, store, all_books)
 
 @app.route('/', methods=['GET', 'POST'])
 def book_titles():
     category = request.form.get('category', 'All')
-    if category == 'All':
-        books_filtered = sorted(all_books, key=lambda x: x['title'])
-    else:
-        books_filtered = sorted([b for b in all_books if b['category'] == category], key=lambda x: x['title'])
-
-    for b in books_filtered:
-        b['first_para'], b['last_para'] = get_first_last_paragraph(b['description'])
-
-    categories = ['All', 'Children', 'Teens', 'Adult']
-    return render_template('book_titles.html', books=books_filtered, categories=categories, selected=category)
+    books_filtered = catalogue.current().titles(category)
+    return render_template('book_titles.html', books=books_filtered, categories=catalogue.CATEGORIES, selected=category)
+
+@app.route('/search')
+def search_books():
+    q = request.args.get('q', '').strip()
+    hits = search_index.search(q) if q else []
+    store = catalogue.current()
+    books_found = [store.get(int(key)) for key, _ in hits]
+    books_found = [b for b in books_found if b]
+    return render_template('book_titles.html', books=books_found, categories=catalogue.CATEGORIES, selected='All', q=q)
 
 def get_book(book_id: int):
-    return next((b for b in all_books if b.get("id") == book_id), None)
+    return catalogue.current().get(book_id)
 
 @app.route('/books/<int:book_id>')
 def book_details(book_id):
@@ -41,4 +39,4 @@ def book_details(book_id):
     return render_template('book_detail.html', book=book)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
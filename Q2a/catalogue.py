@@ -0,0 +1,86 @@
+import threading
+
+CATEGORIES = ('All', 'Children', 'Teens', 'Adult')
+
+
+def get_first_last_paragraph(description):
+    paragraphs = [p for p in description if p]
+    if len(paragraphs) >= 2:
+        return paragraphs[0], paragraphs[-1]
+    elif paragraphs:
+        return paragraphs[0], ''
+    else:
+        return '', ''
+
+
+class BookRecord:
+    """Read-only view of one book; lists are frozen to tuples and summaries precomputed."""
+    __slots__ = ('id', 'genres', 'title', 'category', 'url', 'description',
+                 'authors', 'pages', 'available', 'copies', 'first_para', 'last_para')
+
+    def __init__(self, book_id, raw):
+        set_ = object.__setattr__
+        set_(self, 'id', book_id)
+        set_(self, 'genres', tuple(raw.get('genres', ())))
+        set_(self, 'title', raw.get('title', ''))
+        set_(self, 'category', raw.get('category', ''))
+        set_(self, 'url', raw.get('url', ''))
+        set_(self, 'description', tuple(raw.get('description', ())))
+        set_(self, 'authors', tuple(raw.get('authors', ())))
+        set_(self, 'pages', raw.get('pages', 0))
+        set_(self, 'available', raw.get('available', 0))
+        set_(self, 'copies', raw.get('copies', 0))
+        first, last = get_first_last_paragraph(self.description)
+        set_(self, 'first_para', first)
+        set_(self, 'last_para', last)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('BookRecord is read-only')
+
+    def get(self, name, default=None):
+        # dict-style access so the search indexer can read records directly
+        return getattr(self, name, default)
+
+
+class Catalogue:
+    """
+    Everything the request handlers need, computed once:
+    title-sorted views per category and an id -> record map.
+    Never mutated after construction; reloads build a new one and swap it in.
+    """
+    __slots__ = ('by_id', 'by_category')
+
+    def __init__(self, books):
+        records = [BookRecord(i + 1, b) for i, b in enumerate(books)]
+        ordered = tuple(sorted(records, key=lambda r: r.title))
+        self.by_id = {r.id: r for r in records}
+        self.by_category = {'All': ordered}
+        for cat in CATEGORIES[1:]:
+            self.by_category[cat] = tuple(r for r in ordered if r.category == cat)
+
+    def titles(self, category='All'):
+        return self.by_category.get(category, ())
+
+    def get(self, book_id):
+        return self.by_id.get(book_id)
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+_current = Catalogue(())
+_reload_lock = threading.Lock()
+
+
+def current():
+    """The live catalogue. Grab it once per request and use that reference throughout."""
+    return _current
+
+
+def load(books):
+    """Build a fresh catalogue off to the side, then publish it with a single assignment."""
+    global _current
+    store = Catalogue(books)
+    with _reload_lock:
+        _current = store
+    return store
@@ -0,0 +1,21 @@
+# The BM25F index is shared with Q2b (search_core.py in the repository root, which start.sh
+# puts on PYTHONPATH); this module only feeds it the in-memory catalogue.
+import hashlib
+import json
+
+from search_core import FIELDS, SearchIndex
+
+
+def fingerprint(books):
+    """Digest of every indexed field, so an edit to any of them invalidates the saved index."""
+    rows = [[b.get(f) for f in FIELDS] for b in books]
+    return hashlib.sha1(json.dumps(rows, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def load_index(path, store, books):
+    """Reuse the index saved at `path` while all_books is unchanged, else rebuild it."""
+    return SearchIndex.load_or_build(
+        path,
+        fingerprint(books),
+        lambda: ((r.id, r) for r in store.by_id.values()),
+    )
@@ -11,7 +11,7 @@ pip install --upgrade pip
 pip install -r requirements.txt
 
 export FLASK_APP=app.py
-export PYTHONPATH=.
+export PYTHONPATH=.:..  # .. holds search_core.py, shared with Q2b
 export FLASK_DEBUG=1
 
 flask run --host=0.0.0.0
\ No newline at end of file
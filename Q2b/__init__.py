@@ -1,11 +1,47 @@
 import os
-from flask import Flask
+from flask import Flask, request
 from flask_login import LoginManager
 from pymongo import MongoClient
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 
 
 app = Flask(__name__, static_folder="static")
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-change-me")
+app.config["BOOKS_PER_PAGE"] = int(os.environ.get("BOOKS_PER_PAGE", 20))
+app.config["LOANS_PER_PAGE"] = int(os.environ.get("LOANS_PER_PAGE", 20))
+app.config["DESK_MAX_BATCH"] = int(os.environ.get("DESK_MAX_BATCH", 50))
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+app.config["PASSWORD_POOL_WORKERS"] = int(os.environ.get("PASSWORD_POOL_WORKERS", os.cpu_count() or 1))
+app.config["PASSWORD_MAX_PENDING"] = int(os.environ.get("PASSWORD_MAX_PENDING", 2 * (os.cpu_count() or 1)))
+app.config["PASSWORD_WAIT_SECONDS"] = float(os.environ.get("PASSWORD_WAIT_SECONDS", 0.05))
+app.config["API_MAX_LIMIT"] = int(os.environ.get("API_MAX_LIMIT", 100))
+app.config["EXPORT_BATCH_SIZE"] = int(os.environ.get("EXPORT_BATCH_SIZE", 2000))
+app.config["INDEX_CHECK"] = os.environ.get("INDEX_CHECK", "warn")  # off | warn | strict
+app.config["OVERDUE_SWEEP_SECONDS"] = float(os.environ.get("OVERDUE_SWEEP_SECONDS", 300))
+app.config["OVERDUE_SWEEP_BATCH"] = int(os.environ.get("OVERDUE_SWEEP_BATCH", 500))
+# "counter" (one `available` field per book) or "copies" (one document per physical copy)
+app.config["INVENTORY_MODEL"] = os.environ.get("INVENTORY_MODEL", "counter")
+# Where books, users and loans live for the reader-facing views: "mongo" or "sqlite"
+# (embedded, single node; covers, holds, copies, desk, API, exports and the overdue report
+# are Mongo-only and switched off under sqlite)
+app.config["STORAGE_BACKEND"] = os.environ.get("STORAGE_BACKEND", "mongo")
+app.config["SQLITE_PATH"] = os.environ.get("SQLITE_PATH", os.path.join(app.instance_path, "library.sqlite3"))
+# Bearer token required to scrape /metrics (unset = open, e.g. behind a private network)
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
+# Per-request query tracing (staging): N+1 and over-budget requests are logged as warnings
+app.config["TRACE_QUERIES"] = os.environ.get("TRACE_QUERIES", "0") == "1"
+app.config["TRACE_SLOW_MS"] = float(os.environ.get("TRACE_SLOW_MS", 500))
+app.config["TRACE_MAX_ROUND_TRIPS"] = int(os.environ.get("TRACE_MAX_ROUND_TRIPS", 10))
+app.config["TRACE_REPEAT_THRESHOLD"] = int(os.environ.get("TRACE_REPEAT_THRESHOLD", 3))
+app.config["TRACE_SERVER_TIMING"] = os.environ.get("TRACE_SERVER_TIMING", "0") == "1"
+app.config["SEARCH_INDEX_PATH"] = os.environ.get(
+    "SEARCH_INDEX_PATH", os.path.join(app.instance_path, "search_index.json")
+)
+# How often a worker re-checks the catalogue for books added elsewhere, and how long a
+# local insert waits before the index file is rewritten (inserts in between share the write)
+app.config["SEARCH_REFRESH_SECONDS"] = float(os.environ.get("SEARCH_REFRESH_SECONDS", 10))
+app.config["SEARCH_SAVE_DELAY"] = float(os.environ.get("SEARCH_SAVE_DELAY", 2))
 
 from datetime import datetime
 
@@ -24,9 +60,16 @@ def fmtdate(value, fmt="%d %b %Y"):
 
 app.jinja_env.filters["fmtdate"] = fmtdate
 
+from . import metrics, tracing
+
+def event_listeners():
+    """Command latency and pool metrics for /metrics, plus the per-request query tracer."""
+    return metrics.listeners() + ([tracing.QueryTracer()] if app.config["TRACE_QUERIES"] else [])
+
 uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-client = MongoClient(uri)
-db = client["library_db"]
+db_name = os.getenv("MONGODB_DB", "library_db")
+client = MongoClient(uri, event_listeners=event_listeners())
+db = client[db_name]
 app.db = db
 
 books_col = db["books"]
@@ -37,22 +80,100 @@ app.books_col = books_col
 app.users_col = users_col
 app.loans_col = loans_col
 
+from .inventory import CopyInventory
+app.copies_col = db["copies"]
+app.holds_col = db["holds"]
+app.inventory = (CopyInventory(app.copies_col)
+                 if app.config["INVENTORY_MODEL"] == "copies" and app.config["STORAGE_BACKEND"] == "mongo" else None)
+
+from .repository import open_repositories
+app.repos = open_repositories(app)
+
+# Same collection, but documents stay as undecoded BSON until a field is touched (JSON API)
+app.raw_books_col = books_col.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+
+# Async twin of the client above for the I/O-heavy views (connects on first use)
+from .aio import AsyncMongo
+app.aio = AsyncMongo(uri, db_name, event_listeners=event_listeners())
+
+from .cache import CardCache
+app.card_cache = CardCache(maxsize=int(os.environ.get("CARD_CACHE_SIZE", 2048)))
+
+from .covers import CoverStore, cover_url
+app.cover_store = CoverStore(db, max_bytes=int(os.environ.get("COVER_MAX_BYTES", 10 * 1024 * 1024)))
+app.add_template_global(cover_url)
+
+from .assets import asset_url, load_manifest
+app.asset_manifest = load_manifest(app)
+app.add_template_global(asset_url)
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "auth_bp.login"
 login_manager.login_message = "Please log in to access this page."
 login_manager.login_message_category = "info"
 
+from . import passwords
+passwords.configure(app)
+
 # Import after app exists so @app.route binds
-from .models import User
+from .cache import TTLCache
+
+# Identity cache for flask_login: most requests rebuild the same User, so skip the round trip.
+# The app never edits a user after sign-up, so entries simply age out: a name or role changed
+# in the database directly shows up within USER_CACHE_TTL.
+app.user_cache = TTLCache(
+    maxsize=int(os.environ.get("USER_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("USER_CACHE_TTL", 60)),
+)
+
 @login_manager.user_loader
 def load_user(user_id: str):
-    return User.find_by_id(users_col, user_id)
+    user = app.user_cache.get(user_id)
+    if user is None:
+        user = app.repos.users.get(user_id)
+        if user is not None:
+            app.user_cache.set(user_id, user)
+    return user
 
 # Import after app exists so @app.route can bind
 from . import app as routes
 
+from .cli import library_cli
+app.cli.add_command(library_cli)
+
 from .blueprints.catalogue import bp as cat_bp
 from .blueprints.auth import bp as auth_bp
+from .blueprints.desk import bp as desk_bp
+from .blueprints.api import bp as api_bp
+from .blueprints.covers import bp as covers_bp
+from .blueprints.assets import bp as assets_bp
+from .blueprints.metrics import bp as metrics_bp
 app.register_blueprint(cat_bp)
 app.register_blueprint(auth_bp)
+app.register_blueprint(assets_bp)
+app.register_blueprint(metrics_bp)
+if app.config["STORAGE_BACKEND"] == "mongo":
+    # these read the collections directly; the embedded backend has no equivalent
+    app.register_blueprint(desk_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(covers_bp)
+
+# Per-endpoint request latency (before/after_request)
+metrics.init_app(app)
+tracing.init_app(app)
+
+# Response compression (outermost WSGI layer); stats are kept per endpoint
+from .compression import CompressionMiddleware, ENDPOINT_KEY
+app.compression = CompressionMiddleware(
+    app.wsgi_app,
+    min_size=int(os.environ.get("COMPRESS_MIN_SIZE", 500)),
+    level=int(os.environ.get("COMPRESS_LEVEL", 6)),
+    cache_size=int(os.environ.get("COMPRESS_CACHE_SIZE", 256)),
+)
+app.wsgi_app = app.compression
+
+@app.after_request
+def tag_endpoint(response):
+    request.environ[ENDPOINT_KEY] = request.endpoint
+    return response
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Optional
+
+from pymongo import AsyncMongoClient
+
+
+class AsyncMongo:
+    """
+    One AsyncMongoClient living on a dedicated event-loop thread.
+
+    An async client is bound to the loop it runs on, while Flask runs every async view in
+    a fresh loop. So all Mongo coroutines are shipped to this one long-lived loop, which
+    can keep many operations in flight over the shared connection pool. Views await the
+    result from their own loop via run(); sync code can use run_sync().
+    """
+
+    def __init__(self, uri: str, db_name: str, event_listeners: Optional[list] = None):
+        self.uri = uri
+        self.db_name = db_name
+        self.event_listeners = event_listeners or []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[AsyncMongoClient] = None
+        self._lock = threading.Lock()
+
+    # --- Loop management (started lazily, so importing the app does no I/O) ---
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="mongo-aio", daemon=True).start()
+                self._client = asyncio.run_coroutine_threadsafe(self._connect(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    async def _connect(self) -> AsyncMongoClient:
+        return AsyncMongoClient(self.uri, event_listeners=self.event_listeners)
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self._client = None
+
+    # --- Collections ---
+    @property
+    def db(self):
+        self._ensure_started()
+        return self._client[self.db_name]
+
+    @property
+    def books_col(self):
+        return self.db["books"]
+
+    @property
+    def copies_col(self):
+        return self.db["copies"]
+
+    # --- Running coroutines ---
+    def submit(self, coro: Awaitable) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    async def run(self, coro: Awaitable) -> Any:
+        """Await a Mongo coroutine from any event loop (e.g. inside an async Flask view)."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def run_sync(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        return self.submit(coro).result(timeout)
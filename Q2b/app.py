@@ -1,13 +1,9 @@
-from . import app, books_col
-from .models import *
-from . import app, books_col, users_col
-from .models import Book
+from . import app
+from .sweeper import start_overdue_sweeper
 
-with app.app_context():
-    Book.seed_if_empty(books_col)
-    seed_assignment_users(users_col)
-    app.loans_col.create_index([("user_id", 1), ("book_id", 1), ("return_date", 1)])
-    app.loans_col.create_index("borrow_date")
+# Importing this module makes no database round trips. Seeding and index setup are
+# one-off steps: run `flask library init` before the first start (start.sh does).
+start_overdue_sweeper(app)
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+from typing import Callable, Dict, Optional
+
+from flask import current_app, url_for
+
+try:  # optional: .br variants are skipped without it
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:  # optional: image derivatives are skipped without it
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+# ------------------------------
+# What gets built
+# ------------------------------
+# Third-party files fetched once into static/vendor/ (path under static/ -> source URL).
+# Bootstrap 5 only: the old Bootstrap 4 JS, jQuery and Popper are gone (the 5.x bundle has Popper).
+VENDOR: Dict[str, str] = {
+    "vendor/bootstrap/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
+    "vendor/bootstrap/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js",
+    "vendor/fontawesome/css/all.min.css": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.2/css/all.min.css",
+    "vendor/fontawesome/webfonts/fa-solid-900.woff2": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.2/webfonts/fa-solid-900.woff2",
+    "vendor/fontawesome/webfonts/fa-regular-400.woff2": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.2/webfonts/fa-regular-400.woff2",
+    "vendor/fontawesome/webfonts/fa-brands-400.woff2": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.2/webfonts/fa-brands-400.woff2",
+    "vendor/montserrat/montserrat-latin-400-normal.woff2": "https://cdn.jsdelivr.net/npm/@fontsource/montserrat@5.0.8/files/montserrat-latin-400-normal.woff2",
+}
+
+# Right-sized copies of images the templates show small (source -> widths in px, at 2x display size)
+DERIVATIVES: Dict[str, tuple] = {
+    "img/admin.jpeg": (100,),   # 50px avatar
+    "img/id-card.png": (48,),   # 1.5rem sidebar icon
+}
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".map", ".ttf", ".eot"}
+DIST = "dist"
+MANIFEST = "manifest.json"
+_CSS_URL = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+
+
+def _fingerprint(data: bytes, logical: str, suffix: str = "") -> str:
+    stem, ext = posixpath.splitext(logical)
+    return f"{stem}{suffix}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def _write(dist: str, name: str, data: bytes) -> None:
+    path = os.path.join(dist, *name.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+    if posixpath.splitext(name)[1] in COMPRESSIBLE:
+        with open(path + ".gz", "wb") as fh:
+            fh.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + ".br", "wb") as fh:
+                fh.write(brotli.compress(data, quality=11))
+
+
+# ------------------------------
+# Build step (`flask library assets`)
+# ------------------------------
+def fetch_vendor(static: str, log: Callable[[str], None] = print, timeout: float = 30.0) -> int:
+    """Download any VENDOR file not already under static/. Returns how many were fetched."""
+    fetched = 0
+    for logical, url in VENDOR.items():
+        path = os.path.join(static, *logical.split("/"))
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=timeout) as resp, open(path + ".part", "wb") as fh:
+            shutil.copyfileobj(resp, fh)
+        os.replace(path + ".part", path)
+        log(f"vendored {logical}")
+        fetched += 1
+    return fetched
+
+
+def _resize(data: bytes, width: int) -> bytes:
+    with Image.open(io.BytesIO(data)) as img:
+        fmt = img.format
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        if fmt == "JPEG":
+            img.convert("RGB").save(out, "JPEG", quality=82, optimize=True, progressive=True)
+        else:
+            img.save(out, fmt, optimize=True)
+    return out.getvalue()
+
+
+def build(static: str, log: Callable[[str], None] = print) -> Dict[str, str]:
+    """
+    Copy every file under static/ into static/dist/ with a content hash in its name, plus
+    .gz/.br siblings for text types and the DERIVATIVES images. CSS url(...) references are
+    rewritten to the hashed names (so fonts/images are done before stylesheets).
+    Writes and returns the manifest: logical path (or "path@<w>w") -> hashed path.
+    """
+    dist = os.path.join(static, DIST)
+    sources = []
+    for root, dirs, files in os.walk(static):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist]
+        for f in files:
+            if f.endswith(".part"):
+                continue
+            rel = os.path.relpath(os.path.join(root, f), static).replace(os.sep, "/")
+            sources.append(rel)
+    sources.sort(key=lambda p: (p.endswith(".css"), p))
+
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+    manifest: Dict[str, str] = {}
+    for logical in sources:
+        with open(os.path.join(static, *logical.split("/")), "rb") as fh:
+            data = fh.read()
+
+        if logical.endswith(".css"):
+            base = posixpath.dirname(logical)
+
+            def rewrite(m, base=base):
+                ref = m.group(2)
+                if ref.startswith(("data:", "http:", "https:", "//", "/")):
+                    return m.group(0)
+                path, _, tail = ref.partition("?")
+                path, _, frag = path.partition("#")
+                target = posixpath.normpath(posixpath.join(base, path))
+                if target not in manifest:
+                    return m.group(0)
+                new = posixpath.relpath(manifest[target], base)
+                return f"url({new}{'#' + frag if frag else ''})"
+
+            data = _CSS_URL.sub(rewrite, data.decode("utf-8")).encode("utf-8")
+
+        manifest[logical] = _fingerprint(data, logical)
+        _write(dist, manifest[logical], data)
+
+        if Image is not None:
+            for width in DERIVATIVES.get(logical, ()):
+                small = _resize(data, width)
+                key = f"{logical}@{width}w"
+                manifest[key] = _fingerprint(small, logical, f".{width}w")
+                _write(dist, manifest[key], small)
+
+    with open(os.path.join(dist, MANIFEST), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    log(f"built {len(manifest)} asset(s) into {dist}")
+    return manifest
+
+
+# ------------------------------
+# Runtime
+# ------------------------------
+def load_manifest(app) -> Dict[str, str]:
+    try:
+        with open(os.path.join(app.static_folder, DIST, MANIFEST), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(filename: str, width: Optional[int] = None) -> str:
+    """
+    Template helper, like url_for('static', filename=...) but resolving the fingerprinted
+    build output. `width` picks a DERIVATIVES copy. Before the build has run it falls back
+    to the plain static file, or to the original CDN for vendor files not yet fetched.
+    """
+    manifest = current_app.asset_manifest
+    if width and f"{filename}@{width}w" in manifest:
+        return url_for("assets_bp.asset", filename=manifest[f"{filename}@{width}w"])
+    if filename in manifest:
+        return url_for("assets_bp.asset", filename=manifest[filename])
+    if filename in VENDOR and not os.path.exists(os.path.join(current_app.static_folder, filename)):
+        return VENDOR[filename]
+    return url_for("static", filename=filename)
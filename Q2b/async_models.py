@@ -0,0 +1,56 @@
+"""
+Async book readers for the views that fetch several independent things at once (search
+results, book details). They take collections from AsyncMongo (see aio.py) and return the
+same Book dataclass as models.py. Under the per-copy inventory, pass copies_col so
+`available` is counted from the copies, concurrently with the book read.
+"""
+import asyncio
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from .inventory import free_counts_pipeline
+from .models import Book
+
+
+# ------------------------------
+# Book
+# ------------------------------
+class AsyncBook:
+    @staticmethod
+    async def free_copies(copies_col, oids: List[ObjectId]) -> Dict[ObjectId, int]:
+        counts = {oid: 0 for oid in oids}
+        cursor = await copies_col.aggregate(free_counts_pipeline(oids))
+        async for d in cursor:
+            counts[d["_id"]] = d["n"]
+        return counts
+
+    @staticmethod
+    async def find_one(collection, oid: str, copies_col=None) -> Optional[Book]:
+        try:
+            _id = ObjectId(oid)
+        except Exception:
+            return None
+        if copies_col is None:
+            doc = await collection.find_one({"_id": _id})
+            return Book.from_doc(doc) if doc else None
+        doc, counts = await asyncio.gather(collection.find_one({"_id": _id}),
+                                           AsyncBook.free_copies(copies_col, [_id]))
+        if not doc:
+            return None
+        book = Book.from_doc(doc)
+        book.available = counts[_id]
+        return book
+
+    @staticmethod
+    async def find_many(collection, oids: List[ObjectId], copies_col=None) -> Dict[ObjectId, Book]:
+        if not oids:
+            return {}
+        if copies_col is None:
+            docs = await collection.find({"_id": {"$in": oids}}).to_list()
+            return {d["_id"]: Book.from_doc(d) for d in docs}
+        docs, counts = await asyncio.gather(collection.find({"_id": {"$in": oids}}).to_list(),
+                                            AsyncBook.free_copies(copies_col, oids))
+        books = {d["_id"]: Book.from_doc(d) for d in docs}
+        for oid, book in books.items():
+            book.available = counts[oid]
+        return books
@@ -0,0 +1,73 @@
+from typing import Any, List
+
+from flask import Blueprint, request, current_app, Response, abort
+from bson import ObjectId, json_util
+
+from ..models import Book
+
+bp = Blueprint("api_bp", __name__, url_prefix="/api")
+
+# ---------------------------
+# Read-only JSON API over books
+# ---------------------------
+# Documents are read as RawBSONDocument (see app.raw_books_col) and serialised straight
+# from the projected BSON: no Book dataclass, no view dict, no template. _id and title
+# always come back because they form the page cursor.
+
+API_FIELDS = ("title", "authors", "category", "genres", "pages", "copies", "available", "url", "description", "rev")
+_JSON_OPTIONS = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED)
+
+def _projection():
+    requested = request.args.get("fields")
+    fields = [f.strip() for f in requested.split(",")] if requested else list(API_FIELDS)
+    projection = {f: 1 for f in fields if f in API_FIELDS}
+    projection["title"] = 1
+    return projection
+
+def _live_availability(docs: List[Any]) -> List[Any]:
+    """Under the per-copy inventory the stored counter is stale; count the free copies instead."""
+    if current_app.inventory is None or not docs or "available" not in docs[0]:
+        return docs
+    counts = current_app.inventory.available_many([d["_id"] for d in docs])
+    return [{**d, "available": counts.get(d["_id"], 0)} for d in docs]
+
+def _json(body: str, status: int = 200) -> Response:
+    rv = Response(body, status=status, mimetype="application/json")
+    if status == 200:
+        # lets clients revalidate, and lets the compression middleware reuse its bytes
+        rv.add_etag()
+        rv.make_conditional(request)
+    return rv
+
+def _dumps(value) -> str:
+    return json_util.dumps(value, json_options=_JSON_OPTIONS)
+
+@bp.get("/books")
+def list_books():
+    try:
+        limit = int(request.args.get("limit", current_app.config["BOOKS_PER_PAGE"]))
+    except ValueError:
+        limit = current_app.config["BOOKS_PER_PAGE"]
+    limit = min(max(1, limit), current_app.config["API_MAX_LIMIT"])
+    after, before = request.args.get("after"), request.args.get("before")
+
+    # same cursor rules as the HTML listing: a bad token means the first page
+    args = Book.page_query(request.args.get("category"), after=after, before=before, limit=limit)
+    docs = list(current_app.raw_books_col.find(args["filter"], _projection(),
+                                               sort=args["sort"], limit=args["limit"]))
+    page = Book.build_page(docs, limit=limit, after=after, before=before, decode=lambda d: d)
+
+    body = ('{"data":[' + ",".join(_dumps(d) for d in _live_availability(page.books)) + "]"
+            + ',"next":' + _dumps(page.next_cursor) + ',"prev":' + _dumps(page.prev_cursor) + "}")
+    return _json(body)
+
+@bp.get("/books/<book_id>")
+def get_book(book_id):
+    try:
+        oid = ObjectId(book_id)
+    except Exception:
+        abort(404)
+    doc = current_app.raw_books_col.find_one({"_id": oid}, _projection())
+    if doc is None:
+        return _json('{"error":"not found"}', 404)
+    return _json(_dumps(_live_availability([doc])[0]))
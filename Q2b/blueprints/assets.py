@@ -0,0 +1,40 @@
+import mimetypes
+import os
+
+from flask import Blueprint, request, current_app, send_from_directory, abort
+from werkzeug.security import safe_join
+
+from ..assets import DIST, MANIFEST
+
+bp = Blueprint("assets_bp", __name__, url_prefix="/assets")
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+# ---------------------------
+# Fingerprinted build output (static/dist)
+# ---------------------------
+
+@bp.get("/<path:filename>")
+def asset(filename):
+    """Names carry a content hash, so every response is immutable; serve .br/.gz when accepted."""
+    if filename == MANIFEST:
+        abort(404)  # the build's own bookkeeping, not an asset
+    dist = os.path.join(current_app.static_folder, DIST)
+    path = safe_join(dist, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    accept = request.accept_encodings
+    name, encoding = filename, None
+    for enc, ext in (("br", ".br"), ("gzip", ".gz")):
+        if accept[enc] and os.path.isfile(path + ext):
+            name, encoding = filename + ext, enc
+            break
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    rv = send_from_directory(dist, name, mimetype=mimetype, max_age=ONE_YEAR)
+    if encoding:
+        rv.headers["Content-Encoding"] = encoding
+    rv.vary.add("Accept-Encoding")
+    rv.cache_control.immutable = True
+    return rv
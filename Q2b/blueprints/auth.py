@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, url_for, redirect, flash, current_app
 from flask_login import login_user, login_required, logout_user
-from ..models import User
+from ..passwords import HasherBusy
 
 bp = Blueprint("auth_bp", __name__, url_prefix="/auth")
 
@@ -10,7 +10,11 @@ def login():
         return render_template("login.html", page_label="LOGIN", title="Login")
     email = request.form.get("email","").strip().lower()
     password = request.form.get("password","")
-    user = User.authenticate(current_app.users_col, email, password)
+    try:
+        user = current_app.repos.users.authenticate(email, password)
+    except HasherBusy as e:
+        flash(str(e), "warning")
+        return render_template("login.html", page_label="LOGIN", title="Login"), 503
     if not user:
         flash("Invalid credentials.","danger")
         return redirect(url_for("auth_bp.login"))
@@ -33,12 +37,15 @@ def register():
     if not email or not password or not name:
         flash("All fields are required.")
         return redirect(url_for("auth_bp.register"))
-    existing = User.find_by_email(current_app.users_col, email)
+    existing = current_app.repos.users.by_email(email)
     if existing:
         flash("Email already registered. Please login.")
         return redirect(url_for("auth_bp.login"))
     try:
-        User.create(current_app.users_col, email=email, password=password, name=name, role="user")
+        current_app.repos.users.create(email, password, name, role="user")
+    except HasherBusy as e:
+        flash(str(e))
+        return render_template("register.html", page_label="REGISTER", title="Register"), 503
     except Exception:
         flash("Could not register user. Please try again.")
         return redirect(url_for("auth_bp.register"))
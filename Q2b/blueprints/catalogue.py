@@ -1,11 +1,19 @@
-from flask import Blueprint, render_template, request, url_for, redirect, current_app, flash
+from flask import (
+    Blueprint, render_template, request, url_for, redirect, current_app, flash, jsonify,
+    Response, stream_with_context, stream_template, abort,
+)
 from flask_login import login_required, current_user
+from markupsafe import Markup
 from datetime import datetime, timedelta
 import random
+from functools import wraps
 from bson import ObjectId
 
-from ..models import Book, Loan
+from ..models import Book, Loan, LOAN_DAYS
+from ..holds import Hold
+from ..async_models import AsyncBook
 from ..forms import NewBookForm, GENRES
+from .. import search, exporter
 
 bp = Blueprint("catalogue_bp", __name__)
 
@@ -13,42 +21,191 @@ bp = Blueprint("catalogue_bp", __name__)
 # Book list and details
 # ---------------------------
 
+def mongo_only(view):
+    """Views that read the Mongo collections directly: 404 unless STORAGE_BACKEND=mongo."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_app.repos.backend != "mongo":
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
+
+def _page_arg(name: str) -> int:
+    try:
+        return max(1, int(request.args.get(name, 1)))
+    except ValueError:
+        return 1
+
+def book_view(b: Book) -> dict:
+    """Flatten a Book into the dict the card template expects."""
+    first, last = Book.first_last_paragraphs(b.description)
+    return {
+        "id": str(b._id),
+        "genres": b.genres,
+        "title": b.title,
+        "category": b.category,
+        "url": b.url,
+        "description": b.description,
+        "authors": b.authors,
+        "pages": b.pages,
+        "available": b.available,
+        "copies": b.copies,
+        "first_para": first,
+        "last_para": last,
+        "rev": b.rev,
+        "cover": b.cover,
+    }
+
+def with_card_html(view: dict) -> dict:
+    """Attach the cached static card markup; availability is still rendered live by the page."""
+    view["card_html"] = current_app.card_cache.render(
+        view["id"], view["rev"],
+        lambda: Markup(render_template("_book_card.html", book=view)),
+    )
+    return view
+
+STREAM_FLUSH_BYTES = 8 * 1024
+
+def streamed(template: str, **context) -> Response:
+    """
+    stream_template, coalesced into ~8 KB writes so every card isn't its own socket send.
+    Generators in the context are consumed while the page is being sent, not before, so the
+    request context is kept alive until the last chunk.
+    """
+    def chunks():
+        buf, size = [], 0
+        for piece in stream_template(template, **context):
+            buf.append(piece)
+            size += len(piece)
+            if size >= STREAM_FLUSH_BYTES:
+                yield "".join(buf)
+                buf, size = [], 0
+        if buf:
+            yield "".join(buf)
+    return Response(stream_with_context(chunks()), mimetype="text/html")
+
 @bp.route("/", methods=["GET", "POST"])
 def book_titles():
-    category = request.form.get("category", "All")
-    books = Book.find_all(current_app.books_col, category=category)
-    books_for_view = []
-    for b in books:
-        first, last = Book.first_last_paragraphs(b.description)
-        books_for_view.append({
-            "id": str(b._id),
-            "genres": b.genres,
-            "title": b.title,
-            "category": b.category,
-            "url": b.url,
-            "description": b.description,
-            "authors": b.authors,
-            "pages": b.pages,
-            "available": b.available,
-            "copies": b.copies,
-            "first_para": first,
-            "last_para": last,
-        })
+    # Category comes from the filter form (POST) or from the pager links (GET)
+    category = request.values.get("category", "All")
+    total = current_app.repos.books.count(category)
+    page = current_app.repos.books.stream_page(
+        category=category,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        limit=current_app.config["BOOKS_PER_PAGE"],
+    )
+    books = page.books
+    if current_app.inventory is not None:
+        books = current_app.inventory.with_availability(books)
     categories = ["All", "Children", "Teens", "Adult"]
-    return render_template(
+    return streamed(
         "book_titles.html",
         page_label="BOOK TITLES",
-        books=books_for_view,
+        books=(with_card_html(book_view(b)) for b in books),
+        page=page,  # cursors are known once the cards have been sent
+        total=total,
         categories=categories,
         selected=category,
     )
 
+@bp.get("/search")
+async def search_books():
+    q = request.args.get("q", "").strip()
+    hits = search.get_index(current_app).search(q, limit=current_app.config["BOOKS_PER_PAGE"]) if q else []
+    oids = [ObjectId(key) for key, _ in hits]
+    if current_app.repos.backend == "mongo":
+        aio = current_app.aio
+        copies_col = aio.copies_col if current_app.inventory is not None else None
+        by_id = await aio.run(AsyncBook.find_many(aio.books_col, oids, copies_col))
+    else:
+        by_id = current_app.repos.books.get_many(oids)
+
+    # keep BM25 rank order
+    books_for_view = [with_card_html(book_view(by_id[oid])) for oid in oids if oid in by_id]
+    return render_template(
+        "book_titles.html",
+        page_label="SEARCH RESULTS",
+        books=books_for_view,
+        categories=["All", "Children", "Teens", "Adult"],
+        selected="All",
+        q=q,
+    )
+
 @bp.route("/books/<book_id>")
-def book_details(book_id):
-    book = Book.find_one(current_app.books_col, book_id)
+async def book_details(book_id):
+    if current_app.repos.backend == "mongo":
+        aio = current_app.aio
+        copies_col = aio.copies_col if current_app.inventory is not None else None
+        book = await aio.run(AsyncBook.find_one(aio.books_col, book_id, copies_col))
+    else:
+        book = current_app.repos.books.get(book_id)  # embedded: a local read, no loop hop
     if not book:
         return redirect(url_for("catalogue_bp.book_titles"))
-    return render_template("book_detail.html", page_label="BOOK DETAILS", book=book)
+    spare = book.available  # copies not set aside for someone's ready hold
+    if current_app.repos.backend == "mongo":
+        spare -= Hold.reserved(current_app.holds_col, book._id)
+    return render_template("book_detail.html", page_label="BOOK DETAILS", book=book, spare=spare)
+
+@bp.get("/admin/cache")
+@login_required
+def cache_stats():
+    if getattr(current_user, "role", "user") != "admin":
+        return redirect(url_for("catalogue_bp.book_titles"))
+    return jsonify(cards=current_app.card_cache.stats(), users=current_app.user_cache.stats())
+
+@bp.get("/admin/compression")
+@login_required
+def compression_stats():
+    if getattr(current_user, "role", "user") != "admin":
+        return redirect(url_for("catalogue_bp.book_titles"))
+    return jsonify(current_app.compression.stats())
+
+@bp.get("/admin/traces")
+@login_required
+def trace_stats():
+    if getattr(current_user, "role", "user") != "admin":
+        return redirect(url_for("catalogue_bp.book_titles"))
+    return jsonify(enabled=current_app.config["TRACE_QUERIES"], routes=current_app.trace_stats.stats())
+
+@bp.get("/admin/overdue")
+@login_required
+@mongo_only
+def overdue_loans():
+    if getattr(current_user, "role", "user") != "admin":
+        return redirect(url_for("catalogue_bp.book_titles"))
+    page = _page_arg("page")
+    result = Loan.find_overdue(
+        current_app.loans_col, current_app.books_col, current_app.users_col,
+        page=page, per_page=current_app.config["LOANS_PER_PAGE"],
+    )
+    return render_template(
+        "overdue.html", page_label="OVERDUE LOANS",
+        loans=result["loans"], page=page, more=result["more"],
+    )
+
+@bp.get("/admin/export/<collection>.<fmt>")
+@login_required
+@mongo_only
+def export_collection(collection, fmt):
+    """Stream a whole collection as JSONL or CSV; ?fields=a,b narrows the projection."""
+    if getattr(current_user, "role", "user") != "admin":
+        abort(403)
+    if collection not in exporter.EXPORTS or fmt not in exporter.FORMATS:
+        abort(404)
+    fields = exporter.pick_fields(collection, request.args.get("fields"))
+    batch_size = current_app.config["EXPORT_BATCH_SIZE"]
+    live = collection == "books" and "available" in fields and current_app.inventory is not None
+    cursor = exporter.open_cursor(getattr(current_app, f"{collection}_col"),
+                                  ["_id", *fields] if live and "_id" not in fields else fields,
+                                  batch_size=batch_size)
+    if live:
+        cursor = exporter.live_availability(cursor, current_app.inventory, fields, group=batch_size)
+    return Response(
+        stream_with_context(exporter.stream(cursor, fmt, fields)),
+        mimetype=exporter.FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={collection}.{fmt}"},
+    )
 
 # ---------------------------
 # Admin: add book
@@ -102,8 +259,17 @@ def add_book():
                 "available": form.copies.data or 1,
                 "copies": form.copies.data or 1,
             })
-            result = current_app.books_col.insert_one(doc)
-            current_app.logger.info(f"Inserted book _id={result.inserted_id}")
+            if current_app.inventory is not None:
+                doc["copies_split"] = True
+            try:
+                book_id = current_app.repos.books.add(doc)
+            except ValueError as e:  # unique dedupe_key: same title and authors
+                flash(str(e), "warning")
+                return render_template("add_book.html", page_label="ADD A BOOK", form=form)
+            if current_app.inventory is not None:
+                current_app.inventory.add_copies(book_id, doc["copies"])
+            current_app.logger.info(f"Inserted book _id={book_id}")
+            search.index_book(current_app, book_id, doc)
             flash("Book added successfully.", "success")
             return redirect(url_for("catalogue_bp.book_titles"))
         else:
@@ -118,9 +284,10 @@ def add_book():
 
 @bp.post("/books/<book_id>/borrow")
 @login_required
+@mongo_only
 def borrow_book(book_id):
     try:
-        Book.borrow_by_id(current_app.books_col, book_id)
+        Book.borrow_by_id(current_app.books_col, book_id, current_app.inventory, current_app.holds_col)
         flash("Loan created.", "success")
     except ValueError as e:
         flash(str(e), "danger")
@@ -128,9 +295,10 @@ def borrow_book(book_id):
 
 @bp.post("/books/<book_id>/return")
 @login_required
+@mongo_only
 def return_book(book_id):
     try:
-        Book.return_by_id(current_app.books_col, book_id)
+        Book.return_by_id(current_app.books_col, book_id, current_app.inventory, current_app.holds_col)
         flash("Book returned.", "success")
     except ValueError as e:
         flash(str(e), "danger")
@@ -140,8 +308,6 @@ def return_book(book_id):
 # Per-user loans
 # ---------------------------
 
-LOAN_DAYS = 14  # due date is 2 weeks after borrow date
-
 @bp.post("/loans/create/<book_id>")
 @login_required
 def make_loan(book_id):
@@ -151,9 +317,7 @@ def make_loan(book_id):
 
     when = datetime.utcnow() - timedelta(days=random.randint(10, 20))
     try:
-        Loan.create(
-            current_app.loans_col,
-            current_app.books_col,
+        current_app.repos.loans.create(
             user_id=ObjectId(current_user.get_id()),
             book_id=ObjectId(book_id),
             when=when,
@@ -163,51 +327,84 @@ def make_loan(book_id):
         flash(str(e), "danger")
     return redirect(url_for("catalogue_bp.book_details", book_id=book_id))
 
+@bp.post("/books/<book_id>/hold")
+@login_required
+def place_hold(book_id):
+    if getattr(current_user, "role", "user") == "admin":
+        flash("Admins cannot place holds.", "warning")
+        return redirect(url_for("catalogue_bp.book_details", book_id=book_id))
+    if current_app.repos.backend != "mongo":
+        flash("Holds are not available on this deployment.", "warning")
+        return redirect(url_for("catalogue_bp.book_details", book_id=book_id))
+    if not ObjectId.is_valid(book_id):
+        abort(404)
+    oid = ObjectId(book_id)
+    user_oid = ObjectId(current_user.get_id())
+    if current_app.loans_col.count_documents({"user_id": user_oid, "book_id": oid, "return_date": None}, limit=1):
+        flash("You already have this title on loan.", "warning")
+        return redirect(url_for("catalogue_bp.book_details", book_id=book_id))
+    if Hold.spare(current_app.holds_col, current_app.books_col, oid, current_app.inventory) > 0:
+        flash("A copy of this title is on the shelf; borrow it instead of placing a hold.", "warning")
+        return redirect(url_for("catalogue_bp.book_details", book_id=book_id))
+    try:
+        hold = Hold.place(current_app.holds_col, user_id=user_oid, book_id=oid)
+        flash(f"Hold placed. You are number {Hold.position(current_app.holds_col, hold)} in the queue.", "success")
+    except ValueError as e:
+        flash(str(e), "danger")
+    return redirect(url_for("catalogue_bp.my_loans"))
+
+@bp.post("/holds/<hold_id>/cancel")
+@login_required
+def cancel_hold(hold_id):
+    if current_app.repos.backend != "mongo":
+        flash("Holds are not available on this deployment.", "warning")
+        return redirect(url_for("catalogue_bp.my_loans"))
+    if not ObjectId.is_valid(hold_id):
+        abort(404)
+    if Hold.cancel(current_app.holds_col, hold_id=ObjectId(hold_id), user_id=ObjectId(current_user.get_id())):
+        flash("Hold cancelled.", "success")
+    else:
+        flash("Hold not found.", "danger")
+    return redirect(url_for("catalogue_bp.my_loans"))
+
 @bp.get("/loans")
 @login_required
 def my_loans():
     user_oid = ObjectId(current_user.get_id())
-    loans = Loan.find_all_by_user(current_app.loans_col, user_oid)
-    book_ids = list({ln.book_id for ln in loans})
-    books = list(current_app.books_col.find({"_id": {"$in": book_ids}}))
-    by_id = {b["_id"]: Book.from_doc(b) for b in books}
-
-    items = []
-    for ln in loans:
-        bk = by_id.get(ln.book_id)
-        due_date = ln.borrow_date + timedelta(days=LOAN_DAYS)
-        returned = ln.return_date is not None
-        overdue = (not returned) and (datetime.utcnow().date() > due_date.date())
-        items.append({
-            "id": str(ln._id),
-            "book": {
-                "title": bk.title if bk else "(missing)",
-                "authors": bk.authors if bk else [],
-                "url": bk.url if bk else "",
-            },
-            "borrow_date": ln.borrow_date,
-            "due_date": due_date,
-            "return_date": ln.return_date,
-            "renew_count": ln.renew_count,
-            "returned": returned,
-            "overdue": overdue,
-        })
-    return render_template("make_loan.html", page_label="CURRENT LOANS", loans=items)
+    # keyset page tokens, one per section (see Loan.encode_cursor)
+    active_after = request.args.get("active_after") or None
+    returned_after = request.args.get("returned_after") or None
+    loans = current_app.repos.loans.stream_for_user(
+        user_oid,
+        active_after=active_after,
+        returned_after=returned_after,
+        per_page=current_app.config["LOANS_PER_PAGE"],
+        loan_days=LOAN_DAYS,
+    )
+    return streamed(
+        "make_loan.html",
+        page_label="CURRENT LOANS",
+        loans=loans,
+        holds=Hold.for_user(current_app.holds_col, current_app.books_col, user_oid)
+        if current_app.repos.backend == "mongo" else [],
+        active_after=active_after,
+        returned_after=returned_after,
+    )
 
 @bp.post("/loans/<loan_id>/renew")
 @login_required
 def renew_loan(loan_id):
-    ln = Loan.find_by_id(current_app.loans_col, loan_id)
+    ln = current_app.repos.loans.get(loan_id)
     if not ln or ln.return_date is not None:
         flash("Only active loans can be renewed.", "danger")
         return redirect(url_for("catalogue_bp.my_loans"))
-    if (datetime.utcnow().date() > (ln.borrow_date + timedelta(days=LOAN_DAYS)).date()) or ln.renew_count >= 2:
+    if ln.is_overdue() or ln.renew_count >= 2:
         flash("Overdue or already renewed twice — only return is allowed.", "warning")
         return redirect(url_for("catalogue_bp.my_loans"))
 
     new_borrow = min(ln.borrow_date + timedelta(days=random.randint(10, 20)), datetime.utcnow())
     try:
-        Loan.renew(current_app.loans_col, loan_id=ObjectId(loan_id), when=new_borrow)
+        current_app.repos.loans.renew(loan_id=ObjectId(loan_id), when=new_borrow)
         flash("Loan renewed.", "success")
     except ValueError as e:
         flash(str(e), "danger")
@@ -216,17 +413,14 @@ def renew_loan(loan_id):
 @bp.post("/loans/<loan_id>/return")
 @login_required
 def return_loan(loan_id):
-    ln = Loan.find_by_id(current_app.loans_col, loan_id)
+    ln = current_app.repos.loans.get(loan_id)
     if not ln or ln.return_date is not None:
         flash("Loan is already returned or does not exist.", "danger")
         return redirect(url_for("catalogue_bp.my_loans"))
 
     ret_date = min(ln.borrow_date + timedelta(days=random.randint(10, 20)), datetime.utcnow())
     try:
-        Loan.return_loan(
-            current_app.loans_col, current_app.books_col,
-            loan_id=ObjectId(loan_id), when=ret_date
-        )
+        current_app.repos.loans.return_loan(loan_id=ObjectId(loan_id), when=ret_date)
         flash("Book returned.", "success")
     except ValueError as e:
         flash(str(e), "danger")
@@ -236,7 +430,7 @@ def return_loan(loan_id):
 @login_required
 def delete_loan(loan_id):
     try:
-        ok = Loan.delete_if_returned(current_app.loans_col, loan_id=ObjectId(loan_id))
+        ok = current_app.repos.loans.delete_if_returned(loan_id=ObjectId(loan_id))
         flash("Loan deleted." if ok else "Only returned loans can be deleted.", "success" if ok else "warning")
     except ValueError as e:
         flash(str(e), "danger")
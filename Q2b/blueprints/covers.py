@@ -0,0 +1,43 @@
+from flask import Blueprint, request, current_app, Response, abort
+from werkzeug.wsgi import wrap_file
+from bson import ObjectId
+
+from ..covers import CHUNK_SIZE
+
+bp = Blueprint("covers_bp", __name__, url_prefix="/covers")
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+# ---------------------------
+# Cover images out of GridFS
+# ---------------------------
+
+@bp.get("/<book_id>/<variant>")
+def cover(book_id, variant):
+    """
+    Streams a stored cover chunk by chunk (never the whole file in memory).
+    Pages link here with ?v=<sha>, so the response is immutable; a new cover gets a new URL.
+    """
+    try:
+        oid = ObjectId(book_id)
+    except Exception:
+        abort(404)
+    gridout = current_app.cover_store.open(oid, variant)
+    if gridout is None:
+        abort(404)
+
+    meta = gridout.metadata or {}
+    rv = Response(
+        wrap_file(request.environ, gridout, buffer_size=CHUNK_SIZE),
+        mimetype=meta.get("contentType") or "application/octet-stream",
+        direct_passthrough=True,
+    )
+    rv.content_length = gridout.length
+    rv.last_modified = gridout.upload_date
+    # strong ETag: same original bytes and same variant mean the same response bytes
+    rv.set_etag(f"{meta.get('sha', gridout._id)}-{meta.get('variant', variant)}")
+    rv.cache_control.public = True
+    rv.cache_control.max_age = ONE_YEAR
+    rv.cache_control.immutable = True
+    # answers If-None-Match with 304 and Range with 206 by seeking the GridOut
+    return rv.make_conditional(request, accept_ranges=True, complete_length=gridout.length)
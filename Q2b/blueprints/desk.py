@@ -0,0 +1,94 @@
+from flask import Blueprint, request, current_app, jsonify
+from flask_login import login_required, current_user
+from datetime import datetime
+from bson import ObjectId
+
+from ..models import User, Loan
+
+bp = Blueprint("desk_bp", __name__, url_prefix="/desk")
+
+# ---------------------------
+# Circulation desk: batch checkout / return for one member
+# ---------------------------
+
+def _parse_cart():
+    """
+    Accepts JSON {"email": ..., "book_ids": [...]} or a form with email and
+    book_ids (repeated, or one comma/newline-separated field).
+    Returns (user, [ObjectId], error_response).
+    """
+    data = request.get_json(silent=True) or {}
+    email = (data.get("email") or request.form.get("email", "")).strip().lower()
+    raw_ids = data.get("book_ids")
+    if raw_ids is None:
+        raw_ids = []
+        for v in request.form.getlist("book_ids"):
+            raw_ids.extend(v.replace(",", "\n").split())
+
+    if not email:
+        return None, [], (jsonify(error="email is required"), 400)
+    if not raw_ids:
+        return None, [], (jsonify(error="book_ids is required"), 400)
+    if len(raw_ids) > current_app.config["DESK_MAX_BATCH"]:
+        return None, [], (jsonify(error=f"At most {current_app.config['DESK_MAX_BATCH']} books per batch"), 400)
+
+    try:
+        book_ids = [ObjectId(str(b).strip()) for b in raw_ids]
+    except Exception:
+        return None, [], (jsonify(error="book_ids must be valid ids"), 400)
+
+    user = User.find_by_email(current_app.users_col, email)
+    if not user:
+        return None, [], (jsonify(error="No member with that email"), 404)
+    return user, book_ids, None
+
+def _admin_only():
+    if getattr(current_user, "role", "user") != "admin":
+        return jsonify(error="Desk operations are for admins only"), 403
+    return None
+
+@bp.post("/checkout")
+@login_required
+def checkout():
+    denied = _admin_only()
+    if denied:
+        return denied
+    user, book_ids, err = _parse_cart()
+    if err:
+        return err
+    if user.role == "admin":
+        return jsonify(error="Admins cannot make loans."), 400
+
+    results = Loan.create_many(
+        current_app.loans_col, current_app.books_col,
+        user_id=ObjectId(user.get_id()), book_ids=book_ids, when=datetime.utcnow(),
+        inventory=current_app.inventory, holds_col=current_app.holds_col,
+    )
+    return jsonify(
+        user=user.email,
+        ok=sum(1 for r in results if r.ok),
+        failed=sum(1 for r in results if not r.ok),
+        items=[r.to_dict() for r in results],
+    )
+
+@bp.post("/return")
+@login_required
+def return_books():
+    denied = _admin_only()
+    if denied:
+        return denied
+    user, book_ids, err = _parse_cart()
+    if err:
+        return err
+
+    results = Loan.return_many(
+        current_app.loans_col, current_app.books_col,
+        user_id=ObjectId(user.get_id()), book_ids=book_ids, when=datetime.utcnow(),
+        inventory=current_app.inventory, holds_col=current_app.holds_col,
+    )
+    return jsonify(
+        user=user.email,
+        ok=sum(1 for r in results if r.ok),
+        failed=sum(1 for r in results if not r.ok),
+        items=[r.to_dict() for r in results],
+    )
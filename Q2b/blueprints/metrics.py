@@ -0,0 +1,21 @@
+import hmac
+
+from flask import Blueprint, Response, current_app, request, abort
+
+from ..metrics import registry
+
+bp = Blueprint("metrics_bp", __name__)
+
+# ---------------------------
+# Prometheus scrape target
+# ---------------------------
+
+@bp.get("/metrics")
+def metrics():
+    token = current_app.config["METRICS_TOKEN"]
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401)
+    rv = Response(registry.render(), mimetype="text/plain")
+    rv.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    rv.cache_control.no_store = True
+    return rv
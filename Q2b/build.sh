@@ -0,0 +1,14 @@
+if [ ! -d "venv" ]; then
+  python3 -m venv venv
+  source venv/bin/activate
+  pip install --upgrade pip
+  pip install -r requirements.txt
+else
+  source venv/bin/activate
+fi
+
+export FLASK_APP=app.py
+export PYTHONPATH=.
+
+# vendor the CDN files once, then fingerprint and precompress static/ into static/dist
+flask library assets
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+# ------------------------------
+# Bounded LRU cache
+# ------------------------------
+class LRUCache:
+    """Thread-safe, size-bounded LRU map with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, make: Callable[[], Any]) -> Any:
+        """Return the cached value, building it outside the lock on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = make()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_MISSING = object()
+
+
+# ------------------------------
+# LRU with time-to-live
+# ------------------------------
+class TTLCache(LRUCache):
+    """LRUCache whose entries also expire `ttl` seconds after they were stored."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        super().__init__(maxsize)
+        self.ttl = float(ttl)
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        super().set(key, (time.monotonic() + self.ttl, value))
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        out["ttl"] = self.ttl
+        out["expirations"] = self.expirations
+        return out
+
+
+# ------------------------------
+# Rendered book-card fragments
+# ------------------------------
+class CardCache(LRUCache):
+    """
+    Rendered static card markup (cover, authors, meta, paragraphs) keyed by (book _id, rev).
+    `rev` lives on the book document and every write that changes card content bumps it, so a
+    content change is a miss in every worker; stale entries simply age out of the LRU.
+    Books are not edited after they are added, so today only CoverStore.ingest bumps `rev`.
+    Availability changes on every loan and is left out of the card: pages render it live
+    next to the cached markup rather than invalidating the card.
+    """
+
+    def render(self, book_id, rev: int, make: Callable[[], Any]) -> Any:
+        return self.get_or_set((str(book_id), int(rev)), make)
@@ -0,0 +1,177 @@
+import json
+import subprocess
+import sys
+import time
+
+import click
+from flask.cli import AppGroup
+
+from .models import Book, seed_assignment_users
+from .indexes import check_indexes
+from .migrations import backfill_book_dedupe_keys, run_all, split_book_copies
+
+# ------------------------------
+# `flask library ...` maintenance commands
+# ------------------------------
+# Everything that talks to the database at setup time lives here, so importing the
+# app (every worker, every reloader restart) makes no round trips at all.
+library_cli = AppGroup("library", help="Library database setup and maintenance.")
+
+
+def run_init(app) -> dict:
+    """Seed books and the assignment users and make sure the indexes exist."""
+    timings = {}
+    if app.repos.backend != "mongo":
+        # embedded store: the schema and its indexes are created when it is opened
+        t = time.perf_counter()
+        inserted = app.repos.books.seed()
+        timings["books"] = time.perf_counter() - t
+        t = time.perf_counter()
+        app.repos.users.seed()
+        timings["users"] = time.perf_counter() - t
+        return {"inserted_books": inserted, "timings": timings}
+
+    t = time.perf_counter()
+    check_indexes(app, app.db)
+    timings["indexes"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    # Seeding upserts on dedupe_key, so older books must carry one first
+    backfill_book_dedupe_keys(app.db, log=app.logger.info)
+    inserted = Book.seed(app.books_col)
+    if app.inventory is not None:
+        split_book_copies(app.db, log=app.logger.info)
+    timings["books"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    seed_assignment_users(app.users_col)
+    timings["users"] = time.perf_counter() - t
+    return {"inserted_books": inserted, "timings": timings}
+
+
+@library_cli.command("init")
+def init_command():
+    """Create indexes, seed the catalogue and the assignment users (safe to re-run)."""
+    from flask import current_app
+    result = run_init(current_app)
+    click.echo(f"Seeded {result['inserted_books']} new title(s).")
+    for step, secs in result["timings"].items():
+        click.echo(f"  {step:<8} {secs * 1000:8.1f} ms")
+
+
+@library_cli.command("migrate")
+@click.option("--batch-size", default=1000, show_default=True)
+def migrate_command(batch_size):
+    """Run the resumable data migrations (book dedupe keys, loan due dates, per-copy inventory)."""
+    from flask import current_app
+    done = run_all(current_app.db, copies=current_app.inventory is not None, batch_size=batch_size, log=click.echo)
+    for name, n in done.items():
+        click.echo(f"  {name:<26} {n}")
+
+
+@library_cli.command("coldstart")
+@click.option("--runs", default=5, show_default=True, help="Fresh interpreters to time.")
+@click.option("--with-init", is_flag=True,
+              help="Also run the init steps on import, i.e. what a cold start used to cost.")
+def coldstart_command(runs, with_init):
+    """Measure how long a fresh process takes to import the app (and, optionally, to init it)."""
+    from flask import current_app
+    pkg = current_app.import_name
+    code = (
+        "import json, time; t = time.perf_counter()\n"
+        f"import {pkg}.app\n"
+        "steps = {'import': time.perf_counter() - t}\n"
+        + (f"from {pkg}.cli import run_init; steps.update(run_init({pkg}.app.app)['timings'])\n"
+           if with_init else "")
+        + "steps['total'] = time.perf_counter() - t\n"
+        "print(json.dumps(steps))"
+    )
+    samples = {}
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        for step, secs in json.loads(out.stdout.strip().splitlines()[-1]).items():
+            samples.setdefault(step, []).append(secs)
+    click.echo(f"{'with' if with_init else 'without'} init, {runs} run(s):")
+    for step, secs in samples.items():
+        secs.sort()
+        click.echo(f"  {step:<8} min {secs[0] * 1000:8.1f} ms  median {secs[len(secs) // 2] * 1000:8.1f} ms  "
+                   f"max {secs[-1] * 1000:8.1f} ms")
+
+
+@library_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=1000, show_default=True, help="Documents per insert_many.")
+@click.option("--rejects", "rejects_path", type=click.Path(dir_okay=False),
+              help="Where rejected records go (default: PATH.rejects.jsonl).")
+@click.option("--restart", is_flag=True, help="Ignore any saved progress and start from the top.")
+def import_command(path, batch_size, rejects_path, restart):
+    """Stream a JSONL or CSV catalogue file into the books collection."""
+    from flask import current_app
+    from . import search
+    from .importer import CatalogueImporter
+
+    def report(s):
+        click.echo(f"read {s.read:>9,}  inserted {s.inserted:>9,}  duplicates {s.duplicates:>7,}  "
+                   f"rejected {s.rejected:>7,}  {s.rate:,.0f} rec/s")
+
+    backfill_book_dedupe_keys(current_app.db, log=current_app.logger.info)
+    importer = CatalogueImporter(current_app.books_col, path, batch_size=batch_size,
+                                 rejects_path=rejects_path, progress=report,
+                                 on_insert=lambda docs: search.index_books(current_app, [(d["_id"], d) for d in docs]))
+    stats = importer.run(restart=restart)
+    search.save_index(current_app)
+    if current_app.inventory is not None:
+        split_book_copies(current_app.db, log=current_app.logger.info)
+    click.echo(f"Done in {stats.elapsed:.1f}s. Rejected records: {importer.rejects_path}")
+
+
+@library_cli.command("export")
+@click.argument("collection", type=click.Choice(["books", "loans"]))
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl", show_default=True)
+@click.option("--fields", help="Comma-separated fields to include (default: all exportable).")
+@click.option("-o", "--output", type=click.File("wb"), default="-", help="File to write (default: stdout).")
+def export_command(collection, fmt, fields, output):
+    """Stream a collection to JSONL or CSV without loading it into memory."""
+    from flask import current_app
+    from . import exporter
+
+    picked = exporter.pick_fields(collection, fields)
+    cursor = exporter.open_cursor(getattr(current_app, f"{collection}_col"), picked,
+                                  batch_size=current_app.config["EXPORT_BATCH_SIZE"])
+    for chunk in exporter.stream(cursor, fmt, picked):
+        output.write(chunk)
+
+
+@library_cli.command("covers")
+@click.option("--force", is_flag=True, help="Re-fetch covers that are already stored.")
+@click.option("--limit", default=0, help="Stop after this many books (0 = all).")
+def covers_command(force, limit):
+    """Fetch each book's cover once and store it (plus resized variants) in GridFS."""
+    from flask import current_app
+    from .covers import CoverError
+
+    store = current_app.cover_store
+    query = {} if force else {"$expr": {"$ne": ["$cover.source", "$url"]}}
+    cursor = current_app.books_col.find(query, {"url": 1, "cover": 1, "title": 1}, limit=limit)
+    stored = failed = 0
+    for book in cursor:
+        try:
+            if store.ingest(current_app.books_col, book, force=force):
+                stored += 1
+        except CoverError as e:
+            failed += 1
+            click.echo(f"  {book.get('title', book['_id'])}: {e}", err=True)
+    click.echo(f"Stored {stored} cover(s), {failed} failed.")
+
+
+@library_cli.command("assets")
+@click.option("--offline", is_flag=True, help="Don't download missing vendor files.")
+def assets_command(offline):
+    """Vendor third-party CSS/JS/fonts, then fingerprint and precompress everything in static/."""
+    from flask import current_app
+    from . import assets
+
+    static = current_app.static_folder
+    if not offline:
+        assets.fetch_vendor(static, log=click.echo)
+    current_app.asset_manifest = assets.build(static, log=click.echo)
@@ -0,0 +1,216 @@
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from werkzeug.http import parse_accept_header
+
+from .cache import LRUCache
+
+try:  # optional: without it only gzip/deflate are offered
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+ENDPOINT_KEY = "library.endpoint"  # set by an after_request hook so stats can be kept per route
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml",
+    "application/x-ndjson", "image/svg+xml",
+)
+SKIP_STATUS = {204, 206, 304}
+
+
+# ------------------------------
+# Per-encoding streaming compressors
+# ------------------------------
+class _Zlib:
+    def __init__(self, level: int, wbits: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def chunk(self, data: bytes) -> bytes:
+        # sync flush: whatever has been rendered so far reaches the browser now
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._c.flush(zlib.Z_FINISH)
+
+    def whole(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self.finish()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+    def whole(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+def _compressor(encoding: str, level: int):
+    if encoding == "br":
+        return _Brotli(min(level, 5))  # higher qualities cost far too much CPU per request
+    return _Zlib(level, 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+
+
+# ------------------------------
+# Middleware
+# ------------------------------
+class CompressionMiddleware:
+    """
+    Compresses text responses for clients that accept br, gzip or deflate.
+
+    Responses that are small, not text, partial, already encoded or marked no-transform pass
+    through untouched. Streamed bodies are compressed chunk by chunk with a sync flush so they
+    keep streaming. Complete 200 GET responses that carry an ETag are compressed once per
+    (ETag, encoding) and served from an LRU after that.
+    """
+
+    def __init__(self, app: Callable, *, min_size: int = 500, level: int = 6, cache_size: int = 256):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.encodings = (("br",) if brotli is not None else ()) + ("gzip", "deflate")
+        self.cache = LRUCache(cache_size)
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _negotiate(self, environ) -> Optional[str]:
+        accept = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        best, best_q = None, 0.0
+        for enc in self.encodings:
+            q = accept[enc]
+            if q > best_q:
+                best, best_q = enc, q
+        return best
+
+    def _wanted(self, status: str, headers: List[Tuple[str, str]]) -> bool:
+        if int(status.split(" ", 1)[0]) in SKIP_STATUS:
+            return False
+        h = {k.lower(): v for k, v in headers}
+        if "content-encoding" in h or "no-transform" in h.get("cache-control", ""):
+            return False
+        if not h.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = h.get("content-length")
+        return length is None or int(length) >= self.min_size
+
+    def _record(self, environ, raw: int, sent: int, seconds: float, hit: bool = False) -> None:
+        route = environ.get(ENDPOINT_KEY) or "other"
+        with self._lock:
+            s = self._stats.setdefault(route, {"responses": 0, "bytes_in": 0, "bytes_out": 0,
+                                               "seconds": 0.0, "cache_hits": 0})
+            s["responses"] += 1
+            s["bytes_in"] += raw
+            s["bytes_out"] += sent
+            s["seconds"] += seconds
+            s["cache_hits"] += int(hit)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {}
+            for route, s in sorted(self._stats.items()):
+                routes[route] = dict(s, ratio=round(s["bytes_in"] / s["bytes_out"], 2) if s["bytes_out"] else 0.0,
+                                     ms_per_response=round(s["seconds"] * 1000 / s["responses"], 3))
+        return {"routes": routes, "cache": self.cache.stats()}
+
+    def __call__(self, environ, start_response):
+        encoding = self._negotiate(environ)
+        if encoding is None:
+            return self.app(environ, start_response)
+
+        captured: List[Any] = []
+
+        def capture(status, headers, exc_info=None):
+            if captured or exc_info is not None or not self._wanted(status, headers):
+                # passthrough, or start_response arrived only once the body was iterated
+                captured.append(None)
+                return start_response(status, headers, exc_info)
+            captured[:] = [status, headers]
+            return _no_write
+
+        app_iter = self.app(environ, capture)
+        if not captured or captured[0] is None:
+            captured.append(None)
+            return app_iter
+
+        status, headers = captured
+        headers = [(k, v) for k, v in headers if k.lower() != "content-length"]
+        etag = next((v for k, v in headers if k.lower() == "etag"), None)
+        length = next((v for k, v in captured[1] if k.lower() == "content-length"), None)
+        headers.append(("Content-Encoding", encoding))
+        headers = _add_vary(headers)
+        if etag and not etag.startswith("W/"):
+            # one representation per encoding; weak so If-None-Match still matches upstream
+            headers = [(k, "W/" + v if k.lower() == "etag" else v) for k, v in headers]
+
+        if length is not None and etag and status.startswith("200") and environ.get("REQUEST_METHOD") == "GET":
+            # GET only: a HEAD response has the GET's Content-Length and ETag but no body
+            key = (environ.get("PATH_INFO"), environ.get("QUERY_STRING"), etag, encoding)
+            body = self.cache.get(key)
+            hit = body is not None
+            started = time.perf_counter()
+            if not hit:
+                try:
+                    raw = b"".join(app_iter)
+                finally:
+                    _close(app_iter)
+                started = time.perf_counter()
+                body = _compressor(encoding, self.level).whole(raw)
+                if len(raw) == int(length):  # never keep a truncated or padded body
+                    self.cache.set(key, body)
+            else:
+                _close(app_iter)
+            self._record(environ, int(length), len(body), time.perf_counter() - started, hit)
+            start_response(status, headers + [("Content-Length", str(len(body)))])
+            return [body]
+
+        start_response(status, headers)
+        return self._stream(environ, app_iter, encoding)
+
+    def _stream(self, environ, app_iter: Iterable[bytes], encoding: str):
+        comp = _compressor(encoding, self.level)
+        raw = sent = 0
+        spent = 0.0
+        try:
+            for data in app_iter:
+                if not data:
+                    continue
+                t = time.perf_counter()
+                out = comp.chunk(data)
+                spent += time.perf_counter() - t
+                raw += len(data)
+                sent += len(out)
+                yield out
+            t = time.perf_counter()
+            tail = comp.finish()
+            spent += time.perf_counter() - t
+            sent += len(tail)
+            yield tail
+        finally:
+            _close(app_iter)
+            self._record(environ, raw, sent, spent)
+
+
+def _no_write(data):  # the legacy WSGI write() callable; Flask never uses it
+    raise RuntimeError("write() is not supported under compression")
+
+
+def _add_vary(headers: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    for i, (k, v) in enumerate(headers):
+        if k.lower() == "vary":
+            if "accept-encoding" not in v.lower():
+                headers[i] = (k, f"{v}, Accept-Encoding")
+            return headers
+    return headers + [("Vary", "Accept-Encoding")]
+
+
+def _close(app_iter) -> None:
+    close = getattr(app_iter, "close", None)
+    if close is not None:
+        close()
@@ -0,0 +1,154 @@
+import hashlib
+import io
+import tempfile
+import urllib.request
+from typing import Any, Dict, Optional, Tuple
+
+import gridfs
+from bson import ObjectId
+from flask import url_for
+
+try:  # Pillow is optional: without it only the original is stored and served
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+# (max width, max height) per pre-sized variant, at 2x the size the CSS displays them
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    "thumb": (96, 144),    # make_loan rows (72px tall)
+    "card": (240, 340),    # book_titles cards (.book-img, 170px tall)
+    "detail": (250, 400),  # book_details (.details-cover, 125px wide)
+}
+ORIGINAL = "orig"
+CHUNK_SIZE = 255 * 1024  # GridFS default chunk size; also the streaming read size
+SPOOL_BYTES = 1024 * 1024
+
+
+class CoverError(Exception):
+    pass
+
+
+def _file_name(book_id, variant: str) -> str:
+    return f"{book_id}/{variant}"
+
+
+# ------------------------------
+# Cover store (GridFS bucket "covers")
+# ------------------------------
+class CoverStore:
+    """
+    Fetches a book's cover once and keeps the original plus pre-sized variants in GridFS.
+
+    Each stored file is named "<book _id>/<variant>" and carries the sha256 of the original,
+    which also goes onto the book document as `cover.sha`. Page URLs embed that hash, so a
+    cover response can be cached forever and a new cover is simply a new URL.
+    """
+
+    def __init__(self, db, bucket: str = "covers", max_bytes: int = 10 * 1024 * 1024, timeout: float = 10.0):
+        self.db = db
+        self.bucket = gridfs.GridFSBucket(db, bucket_name=bucket, chunk_size_bytes=CHUNK_SIZE)
+        self.files = db[f"{bucket}.files"]
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+    def _fetch(self, url: str):
+        """Download into a spooled temp file (memory up to 1 MB, then disk). Returns (file, sha256, type)."""
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+                content_type = resp.headers.get_content_type()
+                while True:
+                    block = resp.read(64 * 1024)
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > self.max_bytes:
+                        raise CoverError(f"cover larger than {self.max_bytes} bytes")
+                    digest.update(block)
+                    spool.write(block)
+        except (OSError, ValueError) as e:
+            spool.close()
+            raise CoverError(f"could not fetch {url}: {e}")
+        except CoverError:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool, digest.hexdigest(), content_type
+
+    def _put(self, book_id, variant: str, stream, sha: str, content_type: str, source: str) -> None:
+        name = _file_name(book_id, variant)
+        # drop any previous version first so open() always finds exactly one file
+        for old in self.files.find({"filename": name}, {"_id": 1}):
+            self.bucket.delete(old["_id"])
+        self.bucket.upload_from_stream(name, stream, metadata={
+            "book_id": book_id, "variant": variant, "sha": sha,
+            "contentType": content_type, "source": source,
+        })
+
+    def _resize(self, original, size: Tuple[int, int]) -> Optional[io.BytesIO]:
+        original.seek(0)
+        with Image.open(original) as img:
+            img.draft("RGB", size)  # lets JPEG decode at reduced scale
+            img = img.convert("RGB")
+            img.thumbnail(size)
+            out = io.BytesIO()
+            img.save(out, "JPEG", quality=82, optimize=True, progressive=True)
+        out.seek(0)
+        return out
+
+    def ingest(self, books_col, book: Dict[str, Any], *, force: bool = False) -> Optional[Dict[str, Any]]:
+        """Store the cover for one book document; returns the new `cover` field or None if unchanged."""
+        url = (book.get("url") or "").strip()
+        if not url.startswith(("http://", "https://")):
+            return None
+        current = book.get("cover") or {}
+        if current.get("source") == url and not force:
+            return None
+
+        book_id = book["_id"]
+        spool, sha, content_type = self._fetch(url)
+        with spool:
+            if current.get("sha") == sha and not force:
+                books_col.update_one({"_id": book_id}, {"$set": {"cover.source": url}})
+                return None
+            self._put(book_id, ORIGINAL, spool, sha, content_type, url)
+            variants = [ORIGINAL]
+            if Image is not None:
+                for variant, size in VARIANTS.items():
+                    try:
+                        resized = self._resize(spool, size)
+                    except (OSError, ValueError):
+                        break  # not an image Pillow understands; serve the original everywhere
+                    self._put(book_id, variant, resized, sha, "image/jpeg", url)
+                    variants.append(variant)
+
+        cover = {"sha": sha, "source": url, "variants": variants}
+        # rev bump: cached cards embed the cover URL
+        books_col.update_one({"_id": book_id}, {"$set": {"cover": cover}, "$inc": {"rev": 1}})
+        return cover
+
+    def open(self, book_id: ObjectId, variant: str):
+        """GridOut for the variant (falling back to the original), or None."""
+        for name in (_file_name(book_id, variant), _file_name(book_id, ORIGINAL)):
+            try:
+                return self.bucket.open_download_stream_by_name(name)
+            except gridfs.NoFile:
+                continue
+        return None
+
+
+# ------------------------------
+# Template helper
+# ------------------------------
+def cover_url(book, variant: str = "card") -> str:
+    """Local, fingerprinted cover URL when the cover has been ingested, otherwise the original link."""
+    get = book.get if isinstance(book, dict) else lambda k, d=None: getattr(book, k, d)
+    cover = get("cover") or {}
+    book_id = get("id") or get("_id")
+    if cover.get("sha") and book_id:
+        if variant not in cover.get("variants", []):
+            variant = ORIGINAL
+        return url_for("covers_bp.cover", book_id=str(book_id), variant=variant, v=cover["sha"][:16])
+    return get("url") or ""
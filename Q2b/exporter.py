@@ -0,0 +1,110 @@
+import csv
+import io
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from bson import json_util
+
+# What may be exported, and the columns used when the caller doesn't pick fields.
+# Password hashes never leave the database, so users are deliberately absent.
+EXPORTS: Dict[str, List[str]] = {
+    "books": ["_id", "title", "authors", "category", "genres", "pages", "copies", "available", "url", "description"],
+    "loans": ["_id", "user_id", "book_id", "borrow_date", "due_date", "return_date", "renew_count", "overdue"],
+}
+FORMATS = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+
+CHUNK_BYTES = 64 * 1024
+_JSON_OPTIONS = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED)
+
+
+def pick_fields(collection: str, requested: Optional[str]) -> List[str]:
+    allowed = EXPORTS[collection]
+    if not requested:
+        return allowed
+    fields = [f.strip() for f in requested.split(",") if f.strip() in allowed]
+    return fields or allowed
+
+
+def open_cursor(col, fields: List[str], batch_size: int = 2000):
+    """Projected cursor in natural order; only the requested fields cross the wire."""
+    projection = {f: 1 for f in fields}
+    if "_id" not in fields:
+        projection["_id"] = 0
+    return col.find({}, projection, batch_size=batch_size)
+
+
+def live_availability(cursor, inventory, fields: List[str], group: int = 2000) -> Iterator[Dict[str, Any]]:
+    """
+    Under the per-copy inventory the stored `available` counter is stale: overwrite it with the
+    free-copy count, one count query per `group` books. The cursor must include _id; it is
+    dropped again when the caller didn't ask for it.
+    """
+    buf: List[Dict[str, Any]] = []
+
+    def flush():
+        counts = inventory.available_many([d["_id"] for d in buf])
+        for d in buf:
+            d["available"] = counts.get(d["_id"], 0)
+            if "_id" not in fields:
+                del d["_id"]
+        return buf
+
+    for doc in cursor:
+        buf.append(doc)
+        if len(buf) >= group:
+            yield from flush()
+            buf = []
+    if buf:
+        yield from flush()
+
+
+def _chunked(pieces: Iterable[str]) -> Iterator[bytes]:
+    """Send the first row at once (fast first byte), then coalesce rows into ~64 KB writes."""
+    buf: List[str] = []
+    size = 0
+    first = True
+    for piece in pieces:
+        if first:
+            yield piece.encode("utf-8")
+            first = False
+            continue
+        buf.append(piece)
+        size += len(piece)
+        if size >= CHUNK_BYTES:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def _jsonl_rows(cursor) -> Iterator[str]:
+    for doc in cursor:
+        yield json_util.dumps(doc, json_options=_JSON_OPTIONS) + "\n"
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return "|".join(str(v) for v in value)  # same convention the importer reads
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_rows(cursor, fields: List[str]) -> Iterator[str]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(fields)
+    for doc in cursor:
+        writer.writerow([_csv_cell(doc.get(f)) for f in fields])
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    if out.tell():
+        yield out.getvalue()
+
+
+def stream(cursor, fmt: str, fields: List[str]) -> Iterator[bytes]:
+    """Encode documents as the cursor yields them; nothing is ever materialised."""
+    rows = _csv_rows(cursor, fields) if fmt == "csv" else _jsonl_rows(cursor)
+    return _chunked(rows)
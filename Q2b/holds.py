@@ -0,0 +1,191 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+HOLD_PICKUP_DAYS = 3
+QUEUE_ORDER = [("created", 1), ("_id", 1)]
+
+
+# ------------------------------
+# Hold queue (one FIFO queue per title)
+# ------------------------------
+# A hold is "waiting" until a returned copy is handed to it; it is then "ready" with an
+# expires_at, and the TTL index on expires_at deletes it if it is not collected in time.
+# A ready hold reserves a copy simply by existing: non-holders may only borrow while
+# available copies outnumber the ready holds on the title. The copy itself is restocked
+# as usual on return, so a hold vanishing through TTL can never strand it.
+@dataclass
+class Hold:
+    user_id: ObjectId
+    book_id: ObjectId
+    created: datetime
+    status: str = "waiting"
+    ready_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    _id: Optional[ObjectId] = field(default=None, repr=False)
+
+    @staticmethod
+    def from_doc(doc: Dict[str, Any]) -> "Hold":
+        return Hold(
+            user_id=doc["user_id"],
+            book_id=doc["book_id"],
+            created=doc["created"],
+            status=doc.get("status", "waiting"),
+            ready_at=doc.get("ready_at"),
+            expires_at=doc.get("expires_at"),
+            _id=doc.get("_id"),
+        )
+
+    def to_doc(self) -> Dict[str, Any]:
+        doc = {
+            "user_id": self.user_id,
+            "book_id": self.book_id,
+            "created": self.created,
+            "status": self.status,
+        }
+        if self.expires_at is not None:
+            doc["ready_at"] = self.ready_at
+            doc["expires_at"] = self.expires_at
+        return doc
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+
+    # --- Queue ---
+    @classmethod
+    def place(cls, holds_col, *, user_id: ObjectId, book_id: ObjectId, now: Optional[datetime] = None) -> "Hold":
+        hold = Hold(user_id=user_id, book_id=book_id, created=now or datetime.utcnow())
+        try:
+            hold._id = holds_col.insert_one(hold.to_doc()).inserted_id
+        except DuplicateKeyError:
+            raise ValueError("You already have a hold on this title.")
+        return hold
+
+    @classmethod
+    def cancel(cls, holds_col, *, hold_id: ObjectId, user_id: ObjectId) -> bool:
+        return holds_col.delete_one({"_id": hold_id, "user_id": user_id}).deleted_count == 1
+
+    @classmethod
+    def position(cls, holds_col, hold: "Hold") -> int:
+        """1-based place in the title's queue: an index-only count of the waiting holds ahead."""
+        if hold.is_ready:
+            return 0
+        ahead = holds_col.count_documents({
+            "book_id": hold.book_id,
+            "status": "waiting",
+            "$or": [
+                {"created": {"$lt": hold.created}},
+                {"created": hold.created, "_id": {"$lt": hold._id}},
+            ],
+        })
+        return ahead + 1
+
+    @classmethod
+    def for_user(cls, holds_col, books_col, user_id: ObjectId) -> List[Dict[str, Any]]:
+        """The user's holds with their titles and queue positions, for the loans page."""
+        now = datetime.utcnow()
+        holds = [h for h in (cls.from_doc(d) for d in holds_col.find({"user_id": user_id}, sort=QUEUE_ORDER))
+                 # an expired ready hold is only waiting for the TTL monitor to remove it
+                 if not (h.is_ready and h.expires_at <= now)]
+        if not holds:
+            return []
+        titles = {d["_id"]: d.get("title", "") for d in books_col.find(
+            {"_id": {"$in": [h.book_id for h in holds]}}, {"title": 1})}
+        ahead = cls.waiting_ahead(holds_col, [h for h in holds if not h.is_ready])
+        return [{
+            "id": str(h._id),
+            "book_id": str(h.book_id),
+            "title": titles.get(h.book_id, "(missing)"),
+            "ready": h.is_ready,
+            "expires_at": h.expires_at,
+            "position": 0 if h.is_ready else ahead.get(h.book_id, 0) + 1,
+        } for h in holds]
+
+    @classmethod
+    def waiting_ahead(cls, holds_col, holds: List["Hold"]) -> Dict[ObjectId, int]:
+        """Batch form of position(): waiting holds ahead of each given hold, in one aggregation."""
+        if not holds:
+            return {}
+        return {d["_id"]: d["n"] for d in holds_col.aggregate([
+            {"$match": {"status": "waiting", "$or": [{
+                "book_id": h.book_id,
+                "$or": [
+                    {"created": {"$lt": h.created}},
+                    {"created": h.created, "_id": {"$lt": h._id}},
+                ],
+            } for h in holds]}},
+            {"$group": {"_id": "$book_id", "n": {"$sum": 1}}},
+        ])}
+
+    # --- Allocation ---
+    @classmethod
+    def reserved(cls, holds_col, book_id: ObjectId, now: Optional[datetime] = None) -> int:
+        """Copies set aside for ready, unexpired holds on the title."""
+        return holds_col.count_documents({
+            "book_id": book_id, "status": "ready", "expires_at": {"$gt": now or datetime.utcnow()},
+        })
+
+    @classmethod
+    def reserved_for_others(cls, holds_col, book_ids: List[ObjectId], user_id: ObjectId,
+                            now: Optional[datetime] = None) -> Dict[ObjectId, int]:
+        """Batch form of reserved(): copies set aside per title, not counting user_id's own hold."""
+        counts: Dict[ObjectId, int] = {}
+        for d in holds_col.find({"book_id": {"$in": book_ids}, "status": "ready",
+                                 "expires_at": {"$gt": now or datetime.utcnow()}}, {"book_id": 1, "user_id": 1}):
+            if d["user_id"] != user_id:
+                counts[d["book_id"]] = counts.get(d["book_id"], 0) + 1
+        return counts
+
+    @classmethod
+    def spare(cls, holds_col, books_col, book_id: ObjectId, inventory=None,
+              now: Optional[datetime] = None) -> int:
+        """Copies on the shelf that no ready hold has set aside (anyone may borrow these)."""
+        if inventory is not None:
+            available = inventory.available(book_id)
+        else:
+            doc = books_col.find_one({"_id": book_id}, {"available": 1})
+            available = int(doc.get("available", 0)) if doc else 0
+        return available - cls.reserved(holds_col, book_id, now)
+
+    @classmethod
+    def allocate(cls, holds_col, book_id: ObjectId, now: Optional[datetime] = None,
+                 pickup_days: int = HOLD_PICKUP_DAYS) -> Optional["Hold"]:
+        """Hand one returned copy to the head of the queue (single-document claim on the queue index)."""
+        now = now or datetime.utcnow()
+        doc = holds_col.find_one_and_update(
+            {"book_id": book_id, "status": "waiting"},
+            {"$set": {"status": "ready", "ready_at": now, "expires_at": now + timedelta(days=pickup_days)}},
+            sort=QUEUE_ORDER,
+            return_document=ReturnDocument.AFTER,
+        )
+        return cls.from_doc(doc) if doc else None
+
+    @classmethod
+    def take_ready(cls, holds_col, *, user_id: ObjectId, book_id: ObjectId,
+                   now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Consume the user's ready hold when they collect the copy; returns the deleted doc."""
+        return holds_col.find_one_and_delete({
+            "user_id": user_id, "book_id": book_id,
+            "status": "ready", "expires_at": {"$gt": now or datetime.utcnow()},
+        })
+
+    @classmethod
+    def promote(cls, holds_col, books_col, inventory=None, now: Optional[datetime] = None,
+                pickup_days: int = HOLD_PICKUP_DAYS) -> int:
+        """
+        Sweeper step: when ready holds expire, their copies become free again; pass them on
+        to the next waiting holds. Returns how many holds became ready.
+        """
+        now = now or datetime.utcnow()
+        promoted = 0
+        for book_id in holds_col.distinct("book_id", {"status": "waiting"}):
+            spare = cls.spare(holds_col, books_col, book_id, inventory, now)
+            while spare > 0 and cls.allocate(holds_col, book_id, now, pickup_days):
+                promoted += 1
+                spare -= 1
+        return promoted
@@ -0,0 +1,210 @@
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from .models import Book
+
+CATEGORIES = ("Children", "Teens", "Adult")
+LIST_FIELDS = ("genres", "authors", "description")
+DUPLICATE_KEY = 11000
+
+
+# ------------------------------
+# Streaming readers
+# ------------------------------
+# Both readers work on the raw byte stream so the byte offset after every record is known;
+# that offset is what the checkpoint stores. CSV rows must therefore sit on one line each
+# (list fields are "|"-separated), which is what spreadsheet exports of the catalogue produce.
+
+def _read_jsonl(fh, start: int) -> Iterator[Tuple[int, int, Any]]:
+    fh.seek(start)
+    line_no = 0
+    while True:
+        line = fh.readline()
+        if not line:
+            return
+        line_no += 1
+        if line.strip():
+            try:
+                yield line_no, fh.tell(), json.loads(line)
+            except ValueError as e:
+                yield line_no, fh.tell(), ValueError(f"bad JSON: {e}")
+
+
+def _read_csv(fh, start: int) -> Iterator[Tuple[int, int, Any]]:
+    fh.seek(0)
+    header = next(csv.reader([fh.readline().decode("utf-8-sig")]), [])
+    if start:
+        fh.seek(start)
+    line_no = 0
+    while True:
+        line = fh.readline()
+        if not line:
+            return
+        line_no += 1
+        if not line.strip():
+            continue
+        row = next(csv.reader([line.decode("utf-8")]))
+        rec: Dict[str, Any] = dict(zip(header, row))
+        for f in LIST_FIELDS:
+            if f in rec:
+                rec[f] = [v.strip() for v in rec[f].split("|") if v.strip()]
+        yield line_no, fh.tell(), rec
+
+
+def coerce(raw: Any) -> Dict[str, Any]:
+    """Validate one input record and turn it into a books document (via Book.normalize)."""
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError("record is not an object")
+    raw = dict(raw)
+    for f in LIST_FIELDS:
+        if isinstance(raw.get(f), str):
+            raw[f] = [raw[f]]
+    try:
+        copies = int(raw.get("copies") or 1)
+        if raw.get("available") in (None, ""):
+            raw["available"] = copies
+        raw["copies"] = copies
+        doc = Book.normalize(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"bad field value: {e}")
+    doc["title"] = doc["title"].strip()
+    if not doc["title"]:
+        raise ValueError("title is required")
+    if doc["category"] not in CATEGORIES:
+        raise ValueError(f"category must be one of {', '.join(CATEGORIES)}")
+    if doc["copies"] < 1 or not 0 <= doc["available"] <= doc["copies"]:
+        raise ValueError("need copies >= 1 and 0 <= available <= copies")
+    if doc["pages"] < 0:
+        raise ValueError("pages must be >= 0")
+    return doc
+
+
+# ------------------------------
+# Import run
+# ------------------------------
+@dataclass
+class ImportStats:
+    read: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    offset: int = 0
+    line: int = 0
+    elapsed: float = 0.0
+    rejects_bytes: Optional[int] = None  # size of the rejects file at the checkpoint
+
+    @property
+    def rate(self) -> float:
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+class CatalogueImporter:
+    """
+    Streams a JSONL or CSV file into books_col in constant memory.
+
+    Records go out in unordered insert_many batches; the unique dedupe_key index rejects
+    titles already in the catalogue (or repeated in the file), so no lookups are needed up
+    front. After each batch the byte offsets of the input and of the rejects file are
+    written to `<file>.progress`; re-running after a crash cuts the rejects file back and
+    resumes from there, and replaying the last batch is harmless because its rows just
+    come back as duplicates. `on_insert` gets the documents each batch actually inserted
+    (with their _id), e.g. to add them to the search index.
+    """
+
+    def __init__(self, books_col, path: str, *, batch_size: int = 1000,
+                 rejects_path: Optional[str] = None, progress: Optional[Callable[[ImportStats], None]] = None,
+                 on_insert: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.books_col = books_col
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.rejects_path = rejects_path or f"{path}.rejects.jsonl"
+        self.checkpoint_path = f"{path}.progress"
+        self.progress = progress
+        self.on_insert = on_insert
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            self._reader = _read_csv
+        elif ext in (".jsonl", ".ndjson"):
+            self._reader = _read_jsonl
+        else:
+            raise ValueError("Import files must be .jsonl/.ndjson or .csv")
+
+    def _load_checkpoint(self) -> ImportStats:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as fh:
+                return ImportStats(**json.load(fh))
+        except (OSError, ValueError, TypeError):
+            return ImportStats()
+
+    def _save_checkpoint(self, stats: ImportStats) -> None:
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(asdict(stats), fh)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _flush(self, batch: List[Dict[str, Any]], stats: ImportStats) -> None:
+        if not batch:
+            return
+        failed = set()
+        try:
+            res = self.books_col.insert_many(batch, ordered=False)
+            stats.inserted += len(res.inserted_ids)
+        except BulkWriteError as e:
+            stats.inserted += e.details.get("nInserted", 0)
+            for err in e.details.get("writeErrors", []):
+                if err.get("code") == DUPLICATE_KEY:
+                    stats.duplicates += 1
+                    failed.add(err["index"])
+                else:
+                    raise
+        if self.on_insert:  # insert_many has set _id on every document it was given
+            self.on_insert([d for i, d in enumerate(batch) if i not in failed])
+
+    def run(self, *, restart: bool = False) -> ImportStats:
+        stats = ImportStats() if restart else self._load_checkpoint()
+        resumed_line = stats.line
+        started = time.perf_counter() - stats.elapsed
+        batch: List[Dict[str, Any]] = []
+
+        with open(self.path, "rb") as fh, open(self.rejects_path, "w" if restart or not resumed_line else "a",
+                                               encoding="utf-8") as rejects:
+            if resumed_line and stats.rejects_bytes is not None:
+                rejects.truncate(stats.rejects_bytes)  # rejects past the checkpoint are read again
+            for line_no, offset, raw in self._reader(fh, stats.offset):
+                stats.read += 1
+                try:
+                    batch.append(coerce(raw))
+                except ValueError as e:
+                    stats.rejected += 1
+                    rec = raw if not isinstance(raw, Exception) else None
+                    rejects.write(json.dumps({"line": resumed_line + line_no, "error": str(e), "record": rec},
+                                             default=str) + "\n")
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, stats)
+                    batch = []
+                    stats.offset, stats.line = offset, resumed_line + line_no
+                    stats.elapsed = time.perf_counter() - started
+                    rejects.flush()
+                    stats.rejects_bytes = os.fstat(rejects.fileno()).st_size
+                    self._save_checkpoint(stats)
+                    if self.progress:
+                        self.progress(stats)
+            self._flush(batch, stats)
+
+        stats.elapsed = time.perf_counter() - started
+        if self.progress:
+            self.progress(stats)
+        # Finished cleanly: nothing to resume
+        try:
+            os.remove(self.checkpoint_path)
+        except OSError:
+            pass
+        return stats
@@ -0,0 +1,181 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+from .models import ACTIVE_LOAN, ACTIVE_BY_DUE_INDEX, Book, Loan
+
+
+# ------------------------------
+# Declarative index registry
+# ------------------------------
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    name: Optional[str] = None
+    unique: bool = False
+    partial: Optional[Dict[str, Any]] = field(default=None, hash=False, compare=False)
+    why: str = ""
+    ttl: Optional[int] = None  # expireAfterSeconds
+
+    @property
+    def index_name(self) -> str:
+        # Same default name pymongo/mongod would generate
+        return self.name or "_".join(f"{k}_{d}" for k, d in self.keys)
+
+    def model(self) -> IndexModel:
+        opts: Dict[str, Any] = {"name": self.index_name}
+        if self.unique:
+            opts["unique"] = True
+        if self.partial:
+            opts["partialFilterExpression"] = self.partial
+        if self.ttl is not None:
+            opts["expireAfterSeconds"] = self.ttl
+        return IndexModel(list(self.keys), **opts)
+
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec("books", (("category", 1), ("title", 1), ("_id", 1)),
+              why="book_titles: category filter + keyset title order"),
+    IndexSpec("books", (("title", 1), ("_id", 1)),
+              why="book_titles: unfiltered keyset title order"),
+    IndexSpec("books", (("dedupe_key", 1),), unique=True, partial={"dedupe_key": {"$exists": True}},
+              why="one document per (title, authors); bulk import dedupes on it"),
+    IndexSpec("users", (("email", 1),), unique=True,
+              why="User.find_by_email on every login/registration; one account per email"),
+    IndexSpec("loans", (("user_id", 1), ("book_id", 1), ("return_date", 1)),
+              why="Loan.create duplicate-active-loan check"),
+    IndexSpec("loans", (("borrow_date", 1),)),
+    IndexSpec("loans", (("user_id", 1), ("return_date", 1), ("borrow_date", -1), ("_id", -1)),
+              why="my_loans: active loans slice"),
+    IndexSpec("loans", (("user_id", 1), ("borrow_date", -1), ("_id", -1)),
+              why="my_loans: returned loans slice"),
+    IndexSpec("loans", (("due_date", 1),), name=ACTIVE_BY_DUE_INDEX, partial=ACTIVE_LOAN,
+              why="overdue sweeper and admin overdue list"),
+    IndexSpec("loans", (("book_id", 1), ("return_date", 1)),
+              why="active loans of a title (copy split migration)"),
+    IndexSpec("copies", (("book_id", 1), ("free", 1), ("r", 1)),
+              why="per-copy inventory: claim a free copy, count available copies"),
+    IndexSpec("copies", (("book_id", 1), ("n", 1)), unique=True,
+              why="one document per physical copy; the split migration upserts on it"),
+    IndexSpec("copies", (("loan_id", 1),), partial={"loan_id": {"$type": "objectId"}},
+              why="read back a batch checkout's claims"),
+    IndexSpec("holds", (("book_id", 1), ("status", 1), ("created", 1), ("_id", 1)),
+              why="hold queue head on return, queue position and ready-hold counts"),
+    IndexSpec("holds", (("user_id", 1), ("book_id", 1)), unique=True,
+              why="one hold per reader per title; a reader's holds on the loans page"),
+    IndexSpec("holds", (("expires_at", 1),), ttl=0,
+              why="ready holds not collected by expires_at are deleted by the TTL monitor"),
+]
+
+
+def ensure_indexes(db, specs: List[IndexSpec] = None, log=print) -> List[str]:
+    """Create whatever indexes are missing; existing ones are left untouched. Returns names created."""
+    specs = INDEXES if specs is None else specs
+    created: List[str] = []
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for coll_name, coll_specs in by_collection.items():
+        coll = db[coll_name]
+        existing = coll.index_information()
+        missing = []
+        for spec in coll_specs:
+            info = existing.get(spec.index_name)
+            if info is None:
+                missing.append(spec)
+            elif [tuple(k) for k in info["key"]] != [tuple(k) for k in spec.keys]:
+                log(f"index {coll_name}.{spec.index_name} exists with different keys {info['key']}")
+        for spec in missing:
+            try:
+                coll.create_indexes([spec.model()])
+                created.append(f"{coll_name}.{spec.index_name}")
+            except OperationFailure as e:
+                # e.g. duplicate emails already present when adding the unique index
+                log(f"could not create {coll_name}.{spec.index_name}: {e}")
+    return created
+
+
+# ------------------------------
+# Plan verification for the app's real query shapes
+# ------------------------------
+class PlanProblem(Exception):
+    pass
+
+
+def _find_shape(coll: str, flt: Dict[str, Any], sort=None, limit: int = 0, projection=None, hint=None):
+    def run(db):
+        cursor = db[coll].find(flt, projection, sort=sort, limit=limit)
+        if hint:
+            cursor = cursor.hint(hint)
+        return cursor.explain()
+    return run
+
+
+def query_shapes() -> Dict[str, Callable]:
+    """Representative versions of every hot query the app issues, keyed by a readable name."""
+    oid = ObjectId()
+    now = datetime.utcnow()
+    after = Book.encode_cursor("M", oid)
+    shapes: Dict[str, Callable] = {}
+    for label, category in (("book_titles[category]", "Adult"), ("book_titles[All]", "All")):
+        args = Book.page_query(category, after=after, limit=20)
+        shapes[label] = _find_shape("books", args["filter"], args["sort"], args["limit"])
+    shapes["User.find_by_email"] = _find_shape("users", {"email": "someone@lib.sg"})
+    shapes["Loan.create[dup check]"] = _find_shape(
+        "loans", {"user_id": oid, "book_id": oid, "return_date": None}, limit=1)
+    shapes["my_loans[active]"] = _find_shape(
+        "loans", {"user_id": oid, "return_date": None}, sort=[("borrow_date", -1), ("_id", -1)], limit=21)
+    shapes["my_loans[returned]"] = _find_shape(
+        "loans", {"user_id": oid, "return_date": {"$ne": None}}, sort=[("borrow_date", -1), ("_id", -1)], limit=21)
+    shapes["overdue"] = _find_shape(
+        "loans", Loan.overdue_filter(now), sort=[("due_date", 1)], limit=51, hint=ACTIVE_BY_DUE_INDEX)
+    shapes["Hold.allocate"] = _find_shape(
+        "holds", {"book_id": oid, "status": "waiting"}, sort=[("created", 1), ("_id", 1)], limit=1)
+    shapes["CopyInventory.claim"] = _find_shape(
+        "copies", {"book_id": oid, "free": True, "r": {"$gte": 0.5}}, sort=[("r", 1)], limit=1)
+    return shapes
+
+
+def _stages(plan: Dict[str, Any]):
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("queryPlan", "inputStage", "innerStage", "outerStage"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def verify_query_plans(db, shapes: Dict[str, Callable] = None) -> List[str]:
+    """Explain each shape and report any that would COLLSCAN or sort in memory."""
+    problems: List[str] = []
+    for name, explain in (shapes or query_shapes()).items():
+        plan = explain(db).get("queryPlanner", {}).get("winningPlan", {})
+        stages = set(_stages(plan))
+        bad = sorted(stages & {"COLLSCAN", "SORT"})
+        if bad:
+            problems.append(f"{name}: {', '.join(bad)}")
+    return problems
+
+
+def check_indexes(app, db) -> None:
+    """Startup hook: create missing indexes, then explain the hot queries (INDEX_CHECK = off|warn|strict)."""
+    mode = app.config["INDEX_CHECK"]
+    created = ensure_indexes(db, log=app.logger.warning)
+    if created:
+        app.logger.info(f"Created indexes: {', '.join(created)}")
+    if mode == "off":
+        return
+    problems = verify_query_plans(db)
+    for p in problems:
+        app.logger.warning(f"Unindexed query shape {p}")
+    if problems and mode == "strict":
+        raise PlanProblem("; ".join(problems))
@@ -0,0 +1,161 @@
+import random
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+# ------------------------------
+# Per-copy inventory (INVENTORY_MODEL=copies)
+# ------------------------------
+# Instead of one `available` counter on the book, every physical copy is a document:
+#   {book_id, n, free, loan_id, r, since}
+# A checkout claims *some* free copy with find_one_and_update. Each copy carries a random
+# `r`, and claims start at a random point in r-order, so concurrent checkouts of one hot
+# title land on different documents instead of queueing on a single counter.
+# Availability is counted from the (book_id, free, r) index.
+# Copies set aside for ready holds are not marked; a claim that must leave `keep` copies
+# free checks the count after taking its copy and puts the copy back when it dipped below.
+# Two racing claimants may then both back off, but neither can keep a set-aside copy.
+
+
+def free_counts_pipeline(book_ids: List[ObjectId]) -> List[Dict[str, Any]]:
+    """Free copies per title, {_id: book_id, n}; titles with none free are left out."""
+    return [
+        {"$match": {"book_id": {"$in": list(book_ids)}, "free": True}},
+        {"$group": {"_id": "$book_id", "n": {"$sum": 1}}},
+    ]
+
+
+class CopyInventory:
+    def __init__(self, copies_col):
+        self.copies_col = copies_col
+
+    # --- Claim / release ---
+    def claim(self, book_id: ObjectId, loan_id: Optional[ObjectId] = None, keep: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take one free copy of the title for loan_id, leaving at least `keep` free.
+        None when no copy beyond those `keep` was free.
+        """
+        doc = self._claim_one(book_id, loan_id)
+        if doc and keep and self.available(book_id) < keep:
+            self.release([doc["_id"]])
+            return None
+        return doc
+
+    def _claim_one(self, book_id: ObjectId, loan_id: Optional[ObjectId]) -> Optional[Dict[str, Any]]:
+        start = random.random()
+        update = {"$set": {"free": False, "loan_id": loan_id, "since": datetime.utcnow()}}
+        for r in ({"$gte": start}, {"$lt": start}):
+            doc = self.copies_col.find_one_and_update(
+                {"book_id": book_id, "free": True, "r": r},
+                update,
+                sort=[("r", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc:
+                return doc
+        return None
+
+    def claim_many(self, claims: Dict[ObjectId, ObjectId],
+                   keep: Optional[Dict[ObjectId, int]] = None) -> Dict[ObjectId, ObjectId]:
+        """
+        Claim one copy per title, {book_id: loan_id}, in two round trips (bulk claim, read back).
+        Like claim(), each title is probed from a random point in r-order; titles with nothing
+        free past that point take two more round trips for the wrap-around probe.
+        `keep` is {book_id: copies to leave free}; those titles cost one more count, and one
+        release when any of them dipped below.
+        Returns {book_id: copy _id} for the titles that got one.
+        """
+        claimed: Dict[ObjectId, ObjectId] = {}
+        starts = {bid: random.random() for bid in claims}
+        for side in ("$gte", "$lt"):
+            todo = {bid: lid for bid, lid in claims.items() if bid not in claimed}
+            if not todo:
+                break
+            now = datetime.utcnow()
+            self.copies_col.bulk_write([
+                UpdateOne({"book_id": bid, "free": True, "r": {side: starts[bid]}},
+                          {"$set": {"free": False, "loan_id": lid, "since": now}})
+                for bid, lid in todo.items()
+            ], ordered=False)
+            claimed.update((d["book_id"], d["_id"]) for d in self.copies_col.find(
+                {"loan_id": {"$in": list(todo.values())}}, {"book_id": 1}))
+        guarded = [bid for bid in claimed if keep and keep.get(bid)]
+        if guarded:
+            counts = self.available_many(guarded)
+            short = [bid for bid in guarded if counts[bid] < keep[bid]]
+            self.release(claimed.pop(bid) for bid in short)
+        return claimed
+
+    def release(self, copy_ids: Iterable[ObjectId]) -> int:
+        copy_ids = [c for c in copy_ids if c is not None]
+        if not copy_ids:
+            return 0
+        res = self.copies_col.update_many(
+            {"_id": {"$in": copy_ids}, "free": False},
+            {"$set": {"free": True, "loan_id": None, "since": datetime.utcnow()}},
+        )
+        return res.modified_count
+
+    def release_any(self, book_id: ObjectId) -> bool:
+        """Inventory-only return: free one copy that was taken without a loan."""
+        doc = self.copies_col.find_one_and_update(
+            {"book_id": book_id, "free": False, "loan_id": None},
+            {"$set": {"free": True, "since": datetime.utcnow()}},
+        )
+        return doc is not None
+
+    # --- Counts (index-only) ---
+    def available(self, book_id: ObjectId) -> int:
+        return self.copies_col.count_documents({"book_id": book_id, "free": True})
+
+    def available_many(self, book_ids: List[ObjectId]) -> Dict[ObjectId, int]:
+        if not book_ids:
+            return {}
+        counts = {bid: 0 for bid in book_ids}
+        for d in self.copies_col.aggregate(free_counts_pipeline(book_ids)):
+            counts[d["_id"]] = d["n"]
+        return counts
+
+    def with_availability(self, books: Iterable[Any], group: int = 50) -> Iterator[Any]:
+        """Overwrite Book.available from the copy index, one count query per `group` books."""
+        buf: List[Any] = []
+
+        def flush():
+            counts = self.available_many([b._id for b in buf])
+            for b in buf:
+                b.available = counts.get(b._id, 0)
+            return buf
+
+        for b in books:
+            buf.append(b)
+            if len(buf) >= group:
+                yield from flush()
+                buf = []
+        if buf:
+            yield from flush()
+
+    # --- Stock ---
+    def add_copies(self, book_id: ObjectId, copies: int, *, taken: Optional[List[Optional[ObjectId]]] = None) -> int:
+        """
+        Upsert copy documents 1..copies for a title (safe to repeat). The first len(taken)
+        copies start out on loan to those loan ids. Returns how many were created.
+        """
+        taken = taken or []
+        ops = []
+        for n in range(1, int(copies) + 1):
+            out = n <= len(taken)
+            ops.append(UpdateOne(
+                {"book_id": book_id, "n": n},
+                {"$setOnInsert": {
+                    "free": not out,
+                    "loan_id": taken[n - 1] if out else None,
+                    "r": random.random(),
+                    "since": datetime.utcnow(),
+                }},
+                upsert=True,
+            ))
+        if not ops:
+            return 0
+        return self.copies_col.bulk_write(ops, ordered=False).upserted_count
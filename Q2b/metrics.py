@@ -0,0 +1,364 @@
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+# ------------------------------
+# Registry
+# ------------------------------
+# Every thread writes into its own shard (plain dicts, no lock on the hot path); a scrape
+# sums the shards. Gauges are kept as per-thread deltas so inc()/dec() from different
+# threads still add up. When a thread dies its shard is folded into a process-level
+# total and dropped, so a thread-per-request server doesn't grow the list forever. With METRICS_DIR set, each process also dumps its totals to
+# <dir>/<pid>.json every flush_seconds and a scrape merges every live process's file, so
+# gunicorn-style workers report as one target.
+class Registry:
+    def __init__(self, directory: Optional[str] = None, flush_seconds: float = 5.0):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._meta: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        self._shards: Dict[int, Dict] = {}
+        self._retired: Dict[Tuple[str, Labels], object] = {}  # totals of threads that have exited
+        self._local = threading.local()
+        self._lock = threading.Lock()  # only taken to add or retire a thread's shard
+        self._flusher: Optional[threading.Thread] = None
+
+    # --- Declaration ---
+    def counter(self, name: str, doc: str) -> str:
+        self._meta[name] = ("counter", doc, ())
+        return name
+
+    def gauge(self, name: str, doc: str) -> str:
+        self._meta[name] = ("gauge", doc, ())
+        return name
+
+    def histogram(self, name: str, doc: str, buckets: Tuple[float, ...]) -> str:
+        self._meta[name] = ("histogram", doc, tuple(buckets))
+        return name
+
+    # --- Hot path ---
+    def _shard(self) -> Dict:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            # the thread-local dies with its thread; the finalizer then retires the shard
+            holder = self._local.holder = _ShardHolder()
+            with self._lock:
+                self._shards[id(holder)] = holder.shard
+            weakref.finalize(holder, self._retire, id(holder))
+        return holder.shard
+
+    def _retire(self, key: int) -> None:
+        with self._lock:
+            shard = self._shards.pop(key, None)
+            if shard:
+                _add_into(self._retired, shard)
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1.0) -> None:
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def dec(self, name: str, labels: Labels = (), amount: float = 1.0) -> None:
+        self.inc(name, labels, -amount)
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        shard = self._shard()
+        key = (name, labels)
+        series = shard.get(key)
+        if series is None:
+            # bucket counts (non-cumulative, last is +Inf), then sum
+            series = shard[key] = [0] * (len(self._meta[name][2]) + 1) + [0.0]
+        series[bisect_left(self._meta[name][2], value)] += 1
+        series[-1] += value
+
+    # --- Collection ---
+    def collect(self) -> Dict[Tuple[str, Labels], object]:
+        """This process's totals across all thread shards."""
+        totals: Dict[Tuple[str, Labels], object] = {}
+        with self._lock:
+            shards = list(self._shards.values())
+            _add_into(totals, self._retired)
+        for shard in shards:
+            _add_into(totals, shard)
+        return totals
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self) -> None:
+        """Write this process's totals for the other workers' scrapes (atomic rename)."""
+        if not self.directory:
+            return
+        rows = [[name, list(labels), value] for (name, labels), value in self.collect().items()]
+        path = self._path(os.getpid())
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(rows, fh)
+        os.replace(path + ".tmp", path)
+
+    def start_flusher(self) -> None:
+        if not self.directory or self._flusher is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+
+        def loop():
+            while True:
+                time.sleep(self.flush_seconds)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        self._flusher = threading.Thread(target=loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def _merged(self) -> Dict[Tuple[str, Labels], object]:
+        totals = self.collect()
+        if not self.directory or not os.path.isdir(self.directory):
+            return totals
+        me = os.getpid()
+        for entry in os.listdir(self.directory):
+            stem, ext = os.path.splitext(entry)
+            if ext != ".json" or not stem.isdigit() or int(stem) == me:
+                continue
+            alive = _alive(int(stem))
+            try:
+                with open(os.path.join(self.directory, entry), encoding="utf-8") as fh:
+                    rows = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in rows:
+                if name not in self._meta:
+                    continue
+                if self._meta[name][0] == "gauge" and not alive:
+                    continue  # a dead worker holds no connections; its counters still count
+                key = (name, tuple(tuple(pair) for pair in labels))
+                acc = totals.get(key)
+                if isinstance(value, list):
+                    totals[key] = value if acc is None else [a + b for a, b in zip(acc, value)]
+                else:
+                    totals[key] = (acc or 0.0) + value
+        return totals
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        by_name: Dict[str, List[Tuple[Labels, object]]] = {}
+        for (name, labels), value in self._merged().items():
+            by_name.setdefault(name, []).append((labels, value))
+
+        out: List[str] = []
+        for name, (kind, doc, buckets) in sorted(self._meta.items()):
+            out.append(f"# HELP {name} {doc}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name.get(name, ()), key=lambda s: s[0]):
+                if kind != "histogram":
+                    out.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+                    continue
+                running = 0
+                for bound, n in zip(buckets + (float("inf"),), value[:-1]):
+                    running += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append(f"{name}_bucket{_fmt_labels(labels + (('le', le),))} {running}")
+                out.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(value[-1])}")
+                out.append(f"{name}_count{_fmt_labels(labels)} {running}")
+        return "\n".join(out) + "\n"
+
+
+class _ShardHolder:
+    """One thread's shard; weakref-able, unlike the dict itself."""
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self):
+        self.shard: Dict = {}
+
+
+def _add_into(totals: Dict, shard: Dict) -> None:
+    for key, value in list(shard.items()):
+        acc = totals.get(key)
+        if isinstance(value, list):
+            totals[key] = list(value) if acc is None else [a + b for a, b in zip(acc, value)]
+        else:
+            totals[key] = (acc or 0.0) + value
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+    return "{" + body + "}" if body else ""
+
+
+def _fmt_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ------------------------------
+# Library metrics
+# ------------------------------
+registry = Registry(
+    directory=os.environ.get("METRICS_DIR") or None,
+    flush_seconds=float(os.environ.get("METRICS_FLUSH_SECONDS", 5)),
+)
+
+HTTP_LATENCY = registry.histogram(
+    "library_http_request_duration_seconds",
+    "Time from the start of the request until the response body has been sent, by endpoint.", HTTP_BUCKETS)
+MONGO_LATENCY = registry.histogram(
+    "library_mongo_command_duration_seconds",
+    "MongoDB command round trip as reported by the driver, by command and collection.", MONGO_BUCKETS)
+MONGO_FAILURES = registry.counter(
+    "library_mongo_command_failures_total", "MongoDB commands that returned an error.")
+POOL_WAIT = registry.histogram(
+    "library_mongo_pool_checkout_wait_seconds",
+    "Time a thread waited to check a connection out of the pool.", POOL_BUCKETS)
+POOL_CHECKOUT_FAILURES = registry.counter(
+    "library_mongo_pool_checkout_failures_total", "Connection checkouts that failed, by reason.")
+POOL_IN_USE = registry.gauge(
+    "library_mongo_pool_connections_in_use", "Connections currently checked out of the pool.")
+POOL_OPEN = registry.gauge(
+    "library_mongo_pool_connections_open", "Connections currently open (idle or in use).")
+
+
+# ------------------------------
+# pymongo listeners
+# ------------------------------
+def command_collection(event) -> str:
+    """The collection a started command targets ("" for admin/server commands)."""
+    value = event.command.get(event.command_name)
+    if event.command_name == "getMore":
+        value = event.command.get("collection")
+    return value if isinstance(value, str) else ""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self, reg: Registry = registry):
+        self.registry = reg
+        # the collection only appears on the started event; keyed by (connection, request)
+        self._pending: Dict[Tuple, str] = {}
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = command_collection(event)
+
+    def _finish(self, event) -> Labels:
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        labels = (("command", event.command_name), ("collection", collection))
+        self.registry.observe(MONGO_LATENCY, labels, event.duration_micros / 1e6)
+        return labels
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self.registry.inc(MONGO_FAILURES, self._finish(event))
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self, reg: Registry = registry):
+        self.registry = reg
+        self._local = threading.local()  # checkout start, for drivers without event.duration
+
+    @staticmethod
+    def _labels(event) -> Labels:
+        host, port = event.address
+        return (("address", f"{host}:{port}"),)
+
+    def _waited(self, event) -> float:
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            return duration
+        started = getattr(self._local, "started", None)
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        labels = self._labels(event)
+        self.registry.observe(POOL_WAIT, labels, self._waited(event))
+        self.registry.inc(POOL_IN_USE, labels)
+
+    def connection_check_out_failed(self, event):
+        labels = self._labels(event)
+        self.registry.observe(POOL_WAIT, labels, self._waited(event))
+        self.registry.inc(POOL_CHECKOUT_FAILURES, labels + (("reason", str(event.reason)),))
+
+    def connection_checked_in(self, event):
+        self.registry.dec(POOL_IN_USE, self._labels(event))
+
+    def connection_created(self, event):
+        self.registry.inc(POOL_OPEN, self._labels(event))
+
+    def connection_closed(self, event):
+        self.registry.dec(POOL_OPEN, self._labels(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+def listeners() -> List[Any]:
+    """Fresh listeners for one client (pass as MongoClient(event_listeners=...))."""
+    return [CommandMetrics(), PoolMetrics()]
+
+
+# ------------------------------
+# Flask hooks
+# ------------------------------
+def init_app(app) -> None:
+    """
+    Per-endpoint latency, observed when the response is closed so streamed pages count the
+    time spent rendering their body; unmatched URLs share one label.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            labels = (("endpoint", request.endpoint or "unmatched"), ("method", request.method),
+                      ("status", str(response.status_code)))
+            response.call_on_close(lambda: registry.observe(HTTP_LATENCY, labels, time.perf_counter() - started))
+        return response
+
+    registry.start_flusher()
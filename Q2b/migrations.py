@@ -0,0 +1,185 @@
+from datetime import datetime
+from typing import Dict
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .models import Book, LOAN_DAYS, start_of_day
+from .inventory import CopyInventory
+
+# ------------------------------
+# Resumable, batched data migrations
+# ------------------------------
+# Progress is checkpointed in the `migrations` collection after every batch, so a
+# migration that is interrupted picks up where it stopped when it is run again.
+
+def _checkpoint(db, name: str):
+    doc = db["migrations"].find_one({"_id": name})
+    return doc or {"_id": name, "last_id": None, "done": False, "updated": 0}
+
+
+def backfill_loan_due_dates(db, *, batch_size: int = 1000, now: datetime = None, log=print) -> int:
+    """Store due_date (and the overdue flag for active loans) on loans created before it existed."""
+    name = "loan_due_dates"
+    state = _checkpoint(db, name)
+    if state["done"]:
+        return 0
+    loans_col = db["loans"]
+    today = start_of_day(now)
+    due_ms = LOAN_DAYS * 24 * 60 * 60 * 1000
+    total = 0
+
+    while True:
+        q = {"due_date": {"$exists": False}}
+        if state["last_id"] is not None:
+            q["_id"] = {"$gt": state["last_id"]}
+        ids = [d["_id"] for d in loans_col.find(q, {"_id": 1}, sort=[("_id", 1)], limit=batch_size)]
+        if not ids:
+            break
+        # Pipeline update: due_date is computed per document from its own borrow_date
+        res = loans_col.update_many(
+            {"_id": {"$in": ids}, "due_date": {"$exists": False}},
+            [{"$set": {
+                "due_date": {"$add": ["$borrow_date", due_ms]},
+                "overdue": {"$and": [
+                    {"$eq": ["$return_date", None]},
+                    {"$lt": [{"$add": ["$borrow_date", due_ms]}, today]},
+                ]},
+            }}],
+        )
+        total += res.modified_count
+        state["last_id"] = ids[-1]
+        state["updated"] += res.modified_count
+        db["migrations"].replace_one({"_id": name}, state, upsert=True)
+        log(f"{name}: {state['updated']} loan(s) updated, up to _id {ids[-1]}")
+
+    state["done"] = True
+    db["migrations"].replace_one({"_id": name}, state, upsert=True)
+    return total
+
+
+def clear_returned_overdue(db, *, batch_size: int = 1000, log=print) -> int:
+    """Drop the overdue flag from loans returned before returns started clearing it."""
+    name = "returned_overdue"
+    state = _checkpoint(db, name)
+    if state["done"]:
+        return 0
+    loans_col = db["loans"]
+    total = 0
+
+    while True:
+        q = {"overdue": True, "return_date": {"$ne": None}}
+        if state["last_id"] is not None:
+            q["_id"] = {"$gt": state["last_id"]}
+        ids = [d["_id"] for d in loans_col.find(q, {"_id": 1}, sort=[("_id", 1)], limit=batch_size)]
+        if not ids:
+            break
+        res = loans_col.update_many({"_id": {"$in": ids}, "return_date": {"$ne": None}},
+                                    {"$set": {"overdue": False}})
+        total += res.modified_count
+        state["last_id"] = ids[-1]
+        state["updated"] += res.modified_count
+        db["migrations"].replace_one({"_id": name}, state, upsert=True)
+        log(f"{name}: {state['updated']} loan(s) updated, up to _id {ids[-1]}")
+
+    state["done"] = True
+    db["migrations"].replace_one({"_id": name}, state, upsert=True)
+    return total
+
+
+def backfill_book_dedupe_keys(db, *, batch_size: int = 1000, log=print) -> int:
+    """
+    Give books created before dedupe_key existed their key. A title that collides with one
+    already keyed is left without a key (and logged) rather than failing the batch.
+    """
+    name = "book_dedupe_keys"
+    state = _checkpoint(db, name)
+    if state["done"]:
+        return 0
+    books_col = db["books"]
+    total = 0
+
+    while True:
+        q = {"dedupe_key": {"$exists": False}}
+        if state["last_id"] is not None:
+            q["_id"] = {"$gt": state["last_id"]}
+        docs = list(books_col.find(q, {"title": 1, "authors": 1}, sort=[("_id", 1)], limit=batch_size))
+        if not docs:
+            break
+        ops = [
+            UpdateOne({"_id": d["_id"]}, {"$set": {"dedupe_key": Book.dedupe_key(d.get("title", ""), d.get("authors", []))}})
+            for d in docs
+        ]
+        try:
+            modified = books_col.bulk_write(ops, ordered=False).modified_count
+        except BulkWriteError as e:
+            modified = e.details.get("nModified", 0)
+            for err in e.details.get("writeErrors", []):
+                log(f"{name}: skipped {docs[err['index']]['_id']} ({err.get('errmsg', err.get('code'))})")
+        total += modified
+        state["last_id"] = docs[-1]["_id"]
+        state["updated"] += modified
+        db["migrations"].replace_one({"_id": name}, state, upsert=True)
+        log(f"{name}: {state['updated']} book(s) keyed, up to _id {docs[-1]['_id']}")
+
+    state["done"] = True
+    db["migrations"].replace_one({"_id": name}, state, upsert=True)
+    return total
+
+def split_book_copies(db, *, batch_size: int = 500, log=print) -> int:
+    """
+    Per-copy inventory: give every book one `copies` document per physical copy. Copies
+    currently on loan are tied to the title's active loans (and those loans get copy_id).
+    Books are flagged copies_split as they are done, so the flag is the checkpoint and
+    books added later are picked up by the next run.
+    """
+    name = "book_copies"
+    books_col, loans_col = db["books"], db["loans"]
+    inventory = CopyInventory(db["copies"])
+    total = 0
+
+    while True:
+        books = list(books_col.find({"copies_split": {"$ne": True}}, {"copies": 1, "available": 1},
+                                    sort=[("_id", 1)], limit=batch_size))
+        if not books:
+            break
+        ids = [b["_id"] for b in books]
+        active: dict = {}
+        for ln in loans_col.find({"book_id": {"$in": ids}, "return_date": None}, {"book_id": 1, "copy_id": 1},
+                                 sort=[("borrow_date", 1)]):
+            active.setdefault(ln["book_id"], []).append(ln["_id"])
+
+        for b in books:
+            copies = int(b.get("copies", 0))
+            taken = active.get(b["_id"], [])[:copies]
+            out = copies - int(b.get("available", copies))
+            if out != len(taken):
+                log(f"{name}: {b['_id']} counter says {out} out, {len(taken)} active loan(s); trusting the loans")
+            total += inventory.add_copies(b["_id"], copies, taken=taken)
+            if taken:
+                loans_col.bulk_write([
+                    UpdateOne({"_id": c["loan_id"]}, {"$set": {"copy_id": c["_id"]}})
+                    for c in db["copies"].find({"book_id": b["_id"], "loan_id": {"$in": taken}}, {"loan_id": 1})
+                ], ordered=False)
+        books_col.update_many({"_id": {"$in": ids}}, {"$set": {"copies_split": True}})
+        log(f"{name}: {total} copy document(s) created, up to book _id {ids[-1]}")
+    return total
+
+
+# Every migration, in the order they must run; split_book_copies only under INVENTORY_MODEL=copies.
+MIGRATIONS = [backfill_book_dedupe_keys, backfill_loan_due_dates, clear_returned_overdue, split_book_copies]
+
+
+def run_all(db, *, copies: bool = False, batch_size: int = 1000, log=print) -> Dict[str, int]:
+    """Run every registered migration; returns the count each one reported, by function name."""
+    done: Dict[str, int] = {}
+    for migration in MIGRATIONS:
+        if migration is split_book_copies and not copies:
+            continue
+        done[migration.__name__] = migration(db, batch_size=batch_size, log=log)
+    return done
+
+
+if __name__ == "__main__":
+    from . import app, db
+    run_all(db, copies=app.inventory is not None)
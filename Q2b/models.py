@@ -1,10 +1,15 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, Iterator
+from datetime import datetime, timedelta
+import base64
+import json
+import re
 from bson import ObjectId
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
-from pymongo import ReturnDocument
+from pymongo import ReturnDocument, UpdateOne, InsertOne
+
+from . import passwords
+from .holds import Hold
 
 # Import in‑memory list
 from .books import all_books  # same structure already used by the current app
@@ -28,6 +33,8 @@ class Book:
     available: int
     copies: int
     _id: Optional[ObjectId] = field(default=None, repr=False)
+    rev: int = 0  # $inc'ed by the same update that changes card content (not availability)
+    cover: Optional[Dict[str, Any]] = None  # {"sha", "source", "variants"} once stored in GridFS
 
     @staticmethod
     def from_doc(doc: Dict[str, Any]) -> "Book":
@@ -42,6 +49,8 @@ class Book:
             available=int(doc.get("available", 0)),
             copies=int(doc.get("copies", 0)),
             _id=doc.get("_id"),
+            rev=int(doc.get("rev", 0)),
+            cover=doc.get("cover"),
             )
         
     def to_doc(self) -> Dict[str, Any]:
@@ -55,7 +64,10 @@ class Book:
             "pages": int(self.pages),
             "available": int(self.available),
             "copies": int(self.copies),
+            "rev": int(self.rev),
         }
+        if self.cover:
+            doc["cover"] = self.cover
         if self._id:
             doc["_id"] = self._id
         return doc
@@ -74,8 +86,18 @@ class Book:
             "pages": int(raw.get("pages", 0)),
             "available": int(raw.get("available", 0)),
             "copies": int(raw.get("copies", 0)),
+            "rev": int(raw.get("rev", 0)),
+            "dedupe_key": Book.dedupe_key(raw.get("title", ""), raw.get("authors", [])),
         }
 
+    @staticmethod
+    def dedupe_key(title: str, authors: List[str]) -> str:
+        """Case/spacing/punctuation-insensitive (title, authors) key; unique-indexed on books."""
+        def norm(text: str) -> str:
+            return " ".join(re.sub(r"[^\w\s]", " ", str(text).casefold()).split())
+        names = sorted(norm(a.replace("(Illustrator)", "")) for a in authors or [])
+        return norm(title) + "|" + ";".join(names)
+
     @classmethod
     def seed_if_empty(cls, collection) -> int:
         """Insert all_books into MongoDB if the collection is empty. Returns inserted count."""
@@ -87,12 +109,154 @@ class Book:
         result = collection.insert_many(docs)
         return len(result.inserted_ids)
 
+    @classmethod
+    def seed(cls, collection, books: Optional[List[Dict[str, Any]]] = None) -> int:
+        """
+        Idempotent seed: one unordered bulk_write of upserts keyed on dedupe_key,
+        so re-running it never duplicates a title and never overwrites live availability.
+        Returns how many titles were newly inserted.
+        """
+        docs = [cls.normalize(b) for b in (all_books if books is None else books)]
+        if not docs:
+            return 0
+        result = collection.bulk_write([
+            UpdateOne({"dedupe_key": d["dedupe_key"]}, {"$setOnInsert": d}, upsert=True)
+            for d in docs
+        ], ordered=False)
+        return result.upserted_count
+
     @classmethod
     def find_all(cls, collection, category: Optional[str] = None) -> List["Book"]:
         q = {} if not category or category == "All" else {"category": category}
         docs = collection.find(q, sort=[("title", 1)])
         return [cls.from_doc(d) for d in docs]
 
+    # --- Keyset pagination (backed by the (category, title, _id) / (title, _id) indexes) ---
+    @staticmethod
+    def encode_cursor(title: str, oid: ObjectId) -> str:
+        raw = json.dumps([title, str(oid)]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(token: Optional[str]) -> Optional[Tuple[str, ObjectId]]:
+        """Turn an opaque page token back into (title, _id); bad tokens mean 'first page'."""
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            title, oid = json.loads(raw.decode("utf-8"))
+            return str(title), ObjectId(oid)
+        except Exception:
+            return None
+
+    @classmethod
+    def page_query(cls, category: Optional[str] = None, *,
+                   after: Optional[str] = None, before: Optional[str] = None,
+                   limit: int = 20) -> Dict[str, Any]:
+        """find() arguments for one keyset page; fetches limit+1 rows to detect a further page."""
+        limit = max(1, int(limit))
+        q: Dict[str, Any] = {} if not category or category == "All" else {"category": category}
+        backwards = False
+        key = cls.decode_cursor(before)
+        if key:
+            backwards = True
+            op = "$lt"
+        else:
+            key = cls.decode_cursor(after)
+            op = "$gt"
+        if key:
+            title, oid = key
+            q["$or"] = [{"title": {op: title}}, {"title": title, "_id": {op: oid}}]
+        direction = -1 if backwards else 1
+        return {
+            "filter": q,
+            "sort": [("title", direction), ("_id", direction)],
+            "limit": limit + 1,
+        }
+
+    @classmethod
+    def build_page(cls, docs: List[Dict[str, Any]], *, limit: int,
+                   after: Optional[str] = None, before: Optional[str] = None,
+                   decode: Optional[Callable[[Dict[str, Any]], Any]] = None) -> "BookPage":
+        """
+        Trim page_query's limit+1 rows to a page and work out its cursors. page.books holds
+        Book objects, or decode(doc) for each row (e.g. the raw documents, for the JSON API).
+        """
+        limit = max(1, int(limit))
+        backwards = cls.decode_cursor(before) is not None
+        had_cursor = backwards or cls.decode_cursor(after) is not None
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        if backwards:
+            docs.reverse()
+
+        page = BookPage(books=[(decode or cls.from_doc)(d) for d in docs])
+        if docs:
+            first = cls.encode_cursor(docs[0].get("title", ""), docs[0]["_id"])
+            last = cls.encode_cursor(docs[-1].get("title", ""), docs[-1]["_id"])
+            if backwards:
+                page.next_cursor = last
+                page.prev_cursor = first if has_more else None
+            else:
+                page.next_cursor = last if has_more else None
+                page.prev_cursor = first if had_cursor else None
+        return page
+
+    @classmethod
+    def find_page(cls, collection, category: Optional[str] = None, *,
+                  after: Optional[str] = None, before: Optional[str] = None,
+                  limit: int = 20) -> "BookPage":
+        """
+        One page of titles in (title, _id) order, starting after/before a cursor.
+        Each page is a bounded index range scan, so page 500 costs the same as page 1.
+        """
+        args = cls.page_query(category, after=after, before=before, limit=limit)
+        docs = list(collection.find(**args))
+        return cls.build_page(docs, limit=limit, after=after, before=before)
+
+    @classmethod
+    def stream_page(cls, collection, category: Optional[str] = None, *,
+                    after: Optional[str] = None, before: Optional[str] = None,
+                    limit: int = 20, batch_size: int = 100) -> "BookPage":
+        """
+        Same page as find_page, but page.books is a generator that decodes documents as the
+        cursor delivers them. The page cursors are only set once it is exhausted, so read them
+        after the loop. Backward pages arrive in reverse order and are buffered (one page at most).
+        """
+        args = cls.page_query(category, after=after, before=before, limit=limit)
+        page = BookPage(books=[])
+
+        def rows() -> Iterator[Book]:
+            cursor = collection.find(**args, batch_size=min(args["limit"], batch_size))
+            if cls.decode_cursor(before) is not None:
+                built = cls.build_page(list(cursor), limit=limit, after=after, before=before)
+                page.next_cursor, page.prev_cursor = built.next_cursor, built.prev_cursor
+                yield from built.books
+                return
+            first = last = None
+            seen = 0
+            for doc in cursor:
+                seen += 1
+                if seen > limit:
+                    break
+                first = first or doc
+                last = doc
+                yield cls.from_doc(doc)
+            if first:
+                if seen > limit:
+                    page.next_cursor = cls.encode_cursor(last.get("title", ""), last["_id"])
+                if cls.decode_cursor(after) is not None:
+                    page.prev_cursor = cls.encode_cursor(first.get("title", ""), first["_id"])
+
+        page.books = rows()
+        return page
+
+    @classmethod
+    def count(cls, collection, category: Optional[str] = None) -> int:
+        if not category or category == "All":
+            return collection.estimated_document_count()
+        return collection.count_documents({"category": category})
+
     @classmethod
     def find_one(cls, collection, oid: str) -> Optional["Book"]:
         try:
@@ -140,21 +304,43 @@ class Book:
         return self
 
     # Class helpers by id (useful for routes)
+    # `inventory` is the app's CopyInventory under INVENTORY_MODEL=copies, else None (counter).
+    # With `holds_col`, copies set aside for ready holds can't be taken and returns feed the queue.
     @classmethod
-    def borrow_by_id(cls, col, book_id):
+    def borrow_by_id(cls, col, book_id, inventory=None, holds_col=None):
         oid = ObjectId(book_id) if isinstance(book_id, str) else book_id
+        reserved = Hold.reserved(holds_col, oid) if holds_col is not None else 0
+        if inventory is not None:
+            if not inventory.claim(oid, keep=reserved):
+                if reserved:
+                    raise ValueError("All available copies are on hold for other readers.")
+                raise ValueError("No available copies for this title.")
+            return cls.find_one(col, oid)
         doc = col.find_one_and_update(
-            {"_id": oid, "available": {"$gt": 0}},
+            {"_id": oid, "available": {"$gt": reserved}},
             {"$inc": {"available": -1}},
             return_document=ReturnDocument.AFTER
         )
         if not doc:
+            if reserved:
+                raise ValueError("All available copies are on hold for other readers.")
             raise ValueError("No available copies for this title.")
         return cls.from_doc(doc)
 
     @classmethod
-    def return_by_id(cls, col, book_id):
+    def return_by_id(cls, col, book_id, inventory=None, holds_col=None):
         oid = ObjectId(book_id) if isinstance(book_id, str) else book_id
+        book = cls._return_by_id(col, oid, inventory)
+        if holds_col is not None:
+            Hold.allocate(holds_col, oid)
+        return book
+
+    @classmethod
+    def _return_by_id(cls, col, oid, inventory=None):
+        if inventory is not None:
+            if not inventory.release_any(oid):
+                raise ValueError("This title has not been borrowed.")
+            return cls.find_one(col, oid)
         doc = col.find_one_and_update(
             {"_id": oid, "available": {"$lt": "$copies"}},  # alternative below if pipeline not enabled
             {"$inc": {"available": 1}},
@@ -170,6 +356,12 @@ class Book:
             raise ValueError("Unable to return this title.")
         return cls.from_doc(doc)
     
+@dataclass
+class BookPage:
+    books: Iterable[Book]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
 # ------------------------------    
 # User Class
 # ------------------------------
@@ -218,21 +410,44 @@ class User(UserMixin):
             "email": email.lower().strip(),
             "name": name.strip(),
             "role": role,
-            "pw_hash": generate_password_hash(password),
+            "pw_hash": passwords.hasher.hash(password),
         }
         res = users_col.insert_one(doc)
         doc["_id"] = res.inserted_id
         return User.from_mongo(doc)
 
     def verify_password(self, password: str) -> bool:
-        return check_password_hash(self.pw_hash, password)
+        return passwords.hasher.verify(self.pw_hash, password)
 
     @staticmethod
     def authenticate(users_col, email: str, password: str) -> Optional["User"]:
+        """May raise passwords.HasherBusy when the hashing pool is saturated."""
         u = User.find_by_email(users_col, email.lower().strip())
         if not u:
             return None
-        return u if u.verify_password(password) else None
+        if not u.verify_password(password):
+            return None
+        User.upgrade_hash(users_col, u, password)
+        return u
+
+    @staticmethod
+    def upgrade_hash(users_col, u: "User", password: str) -> None:
+        """Re-hash with the current parameters after a successful login; best effort."""
+        if not passwords.hasher.needs_rehash(u.pw_hash):
+            return
+        try:
+            new_hash = passwords.hasher.hash(password)
+        except passwords.HasherBusy:
+            return  # try again on a quieter login
+        # Guard on the old hash so a concurrent password change is never overwritten
+        res = users_col.update_one({"_id": ObjectId(u.id), "pw_hash": u.pw_hash}, {"$set": {"pw_hash": new_hash}})
+        if res.modified_count:
+            u.pw_hash = new_hash
+
+ASSIGNMENT_USERS = [
+    {"email": "admin@lib.sg", "name": "Admin", "role": "admin", "password": "12345"},
+    {"email": "poh@lib.sg", "name": "Peter Oh", "role": "user", "password": "12345"},
+]
 
 def seed_assignment_users(users_col) -> None:
     """
@@ -241,17 +456,30 @@ def seed_assignment_users(users_col) -> None:
     - poh@lib.sg (Peter Oh, user role)
     If they already exist, do not change their current passwords or data.
     """
-    required = [
-        {"email": "admin@lib.sg", "name": "Admin", "role": "admin", "password": "12345"},
-        {"email": "poh@lib.sg", "name": "Peter Oh", "role": "user", "password": "12345"},
-    ]
+    required = ASSIGNMENT_USERS
+    # One round trip to see who exists; only the missing ones pay for a password hash
+    present = {d["email"] for d in users_col.find({"email": {"$in": [u["email"] for u in required]}}, {"email": 1})}
     for u in required:
-        if not User.find_by_email(users_col, u["email"]):
+        if u["email"] not in present:
             User.create(users_col, u["email"], u["password"], u["name"], u["role"])
 
 # ------------------------------
 # Loan Class
 # ------------------------------
+LOAN_DAYS = 14  # due date is 2 weeks after borrow date
+
+# Active loans by due date. return_date is written as an explicit null on every loan,
+# so {"$type": "null"} selects exactly the active ones and matches the partial index.
+ACTIVE_LOAN = {"return_date": {"$type": "null"}}
+ACTIVE_BY_DUE_INDEX = "active_loans_by_due_date"
+
+def due_date_for(borrow_date: datetime) -> datetime:
+    return borrow_date + timedelta(days=LOAN_DAYS)
+
+def start_of_day(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.utcnow()
+    return datetime(now.year, now.month, now.day)
+
 @dataclass
 class Loan:
     user_id: ObjectId
@@ -260,6 +488,9 @@ class Loan:
     return_date: Optional[datetime] = None
     renew_count: int = 0
     _id: Optional[ObjectId] = field(default=None, repr=False)
+    due_date: Optional[datetime] = None
+    overdue: bool = False
+    copy_id: Optional[ObjectId] = None  # the physical copy, under the per-copy inventory
 
     # --- Builders / mappers ---
     @staticmethod
@@ -271,25 +502,42 @@ class Loan:
             return_date=doc.get("return_date"),
             renew_count=int(doc.get("renew_count", 0)),
             _id=doc.get("_id"),
+            due_date=doc.get("due_date"),
+            overdue=bool(doc.get("overdue", False)),
+            copy_id=doc.get("copy_id"),
         )
 
     def to_doc(self) -> Dict[str, Any]:
-        return {
+        doc = {
             "user_id": self.user_id,
             "book_id": self.book_id,
             "borrow_date": self.borrow_date,
+            "due_date": self.due,
             "return_date": self.return_date,
             "renew_count": self.renew_count,
+            "overdue": self.overdue,
         }
+        if self.copy_id is not None:
+            doc["copy_id"] = self.copy_id
+        return doc
 
     # --- Helpers ---
     @property
     def is_active(self) -> bool:
         return self.return_date is None
 
+    @property
+    def due(self) -> datetime:
+        """Stored due date, or the computed one for loans not yet backfilled."""
+        return self.due_date or due_date_for(self.borrow_date)
+
+    def is_overdue(self, now: Optional[datetime] = None) -> bool:
+        return self.is_active and self.due < start_of_day(now)
+
     # --- Create ---
     @classmethod
-    def create(cls, loans_col, books_col, *, user_id: ObjectId, book_id: ObjectId, when: datetime) -> "Loan":
+    def create(cls, loans_col, books_col, *, user_id: ObjectId, book_id: ObjectId, when: datetime,
+               inventory=None, holds_col=None) -> "Loan":
         # 1) Prevent duplicate active loan for same user+book
         exists = loans_col.count_documents({
             "user_id": user_id,
@@ -299,16 +547,54 @@ class Loan:
         if exists:
             raise ValueError("User already has an active loan for this title.")
 
-        # 2) Decrement Book.available only if > 0
+        # 2) Holds: collecting a ready hold uses the copy set aside for it; anyone else may
+        #    only take copies beyond those set aside for ready holds
+        held = reserved = None
+        if holds_col is not None:
+            held = Hold.take_ready(holds_col, user_id=user_id, book_id=book_id)
+            reserved = 0 if held else Hold.reserved(holds_col, book_id)
+        try:
+            loan = cls._take_copy(loans_col, books_col, user_id=user_id, book_id=book_id, when=when,
+                                  inventory=inventory, reserved=reserved or 0)
+        except ValueError:
+            if held:
+                holds_col.insert_one(held)  # put the hold back; it keeps its place and expiry
+            raise
+        if holds_col is not None and not held:
+            holds_col.delete_one({"user_id": user_id, "book_id": book_id})  # a waiting hold is now moot
+        return loan
+
+    @classmethod
+    def _take_copy(cls, loans_col, books_col, *, user_id: ObjectId, book_id: ObjectId, when: datetime,
+                   inventory=None, reserved: int = 0) -> "Loan":
+        if inventory is not None:
+            # Claim any free copy beyond the reserved ones for this loan (per-copy inventory)
+            loan = Loan(user_id=user_id, book_id=book_id, borrow_date=when, _id=ObjectId())
+            copy = inventory.claim(book_id, loan._id, keep=reserved)
+            if not copy:
+                if reserved:
+                    raise ValueError("All available copies are on hold for other readers.")
+                raise ValueError("No available copies for this title.")
+            loan.copy_id = copy["_id"]
+            try:
+                loans_col.insert_one({**loan.to_doc(), "_id": loan._id})
+            except Exception:
+                inventory.release([loan.copy_id])
+                raise
+            return loan
+
+        # Decrement Book.available only if copies beyond the reserved ones remain
         book = books_col.find_one_and_update(
-            {"_id": book_id, "available": {"$gt": 0}},
+            {"_id": book_id, "available": {"$gt": reserved}},
             {"$inc": {"available": -1}},
             return_document=ReturnDocument.AFTER
         )
         if not book:
+            if reserved:
+                raise ValueError("All available copies are on hold for other readers.")
             raise ValueError("No available copies for this title.")
 
-        # 3) Insert the loan
+        # Insert the loan
         loan = Loan(user_id=user_id, book_id=book_id, borrow_date=when)
         result = loans_col.insert_one(loan.to_doc())
         loan._id = result.inserted_id
@@ -325,12 +611,163 @@ class Loan:
     def find_all_by_user(cls, loans_col, user_id: ObjectId) -> List["Loan"]:
         return [cls.from_doc(d) for d in loans_col.find({"user_id": user_id}).sort("borrow_date", -1)]
 
+    # --- My-loans page: one aggregation, bounded payload ---
+    # Each section pages newest first on (borrow_date, _id); a page token is the key of the
+    # last row shown, so every page is an index range scan however deep it is.
+    @staticmethod
+    def encode_cursor(borrow_date: datetime, oid: ObjectId) -> str:
+        raw = json.dumps([borrow_date.isoformat(), str(oid)]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(token: Optional[str]) -> Optional[Tuple[datetime, ObjectId]]:
+        """Turn a my-loans page token back into (borrow_date, _id); bad tokens mean 'newest page'."""
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            when, oid = json.loads(raw.decode("utf-8"))
+            return datetime.fromisoformat(when), ObjectId(oid)
+        except Exception:
+            return None
+
+    @staticmethod
+    def user_page_pipeline(loans_coll_name: str, books_coll_name: str, user_id: ObjectId, *,
+                           active_after: Optional[str], returned_after: Optional[str], per_page: int,
+                           loan_days: int, now: datetime) -> List[Dict[str, Any]]:
+        """
+        Active and returned loans are paged independently: each branch is an index-ordered
+        slice of per_page+1 rows older than its page token (the extra row says whether a
+        next page exists), the two are glued together with $unionWith, and only then are the
+        books joined and trimmed to the fields the template shows. Due/overdue are computed
+        by the server.
+        """
+        def branch(match: Dict[str, Any], after: Optional[str], section: str) -> List[Dict[str, Any]]:
+            q = {"user_id": user_id, **match}
+            key = Loan.decode_cursor(after)
+            if key:
+                when, oid = key
+                q["$or"] = [{"borrow_date": {"$lt": when}}, {"borrow_date": when, "_id": {"$lt": oid}}]
+            return [
+                {"$match": q},
+                {"$sort": {"borrow_date": -1, "_id": -1}},
+                {"$limit": per_page + 1},
+                {"$set": {"section": section}},
+            ]
+
+        today = start_of_day(now)
+        due = {"$ifNull": ["$due_date", {"$add": ["$borrow_date", loan_days * 24 * 60 * 60 * 1000]}]}
+        return branch({"return_date": None}, active_after, "active") + [
+            {"$unionWith": {
+                "coll": loans_coll_name,
+                "pipeline": branch({"return_date": {"$ne": None}}, returned_after, "returned"),
+            }},
+            {"$lookup": {"from": books_coll_name, "localField": "book_id", "foreignField": "_id", "as": "book"}},
+            {"$project": {
+                "section": 1,
+                "borrow_date": 1,
+                "return_date": 1,
+                "renew_count": {"$ifNull": ["$renew_count", 0]},
+                "due_date": due,
+                # overdue once today is past the due day (same rule the view used to apply)
+                "overdue": {"$and": [{"$eq": ["$return_date", None]}, {"$lt": [due, today]}]},
+                "book": {
+                    "_id": {"$first": "$book._id"},
+                    "title": {"$ifNull": [{"$first": "$book.title"}, "(missing)"]},
+                    "authors": {"$ifNull": [{"$first": "$book.authors"}, []]},
+                    "url": {"$ifNull": [{"$first": "$book.url"}, ""]},
+                    "cover": {"$first": "$book.cover"},
+                },
+            }},
+        ]
+
+    @staticmethod
+    def split_user_page(docs: List[Dict[str, Any]], per_page: int) -> Dict[str, Any]:
+        """The two sections of a user_page_pipeline result, with the token of each next page."""
+        stream = LoanPageStream(docs, per_page)
+        active, returned = list(stream.active()), list(stream.returned())
+        return {
+            "active": active,
+            "active_next": stream.active_next,
+            "returned": returned,
+            "returned_next": stream.returned_next,
+        }
+
+    @classmethod
+    def stream_for_user(cls, loans_col, books_col, user_id: ObjectId, *, active_after: Optional[str] = None,
+                        returned_after: Optional[str] = None, per_page: int = 20, loan_days: int = LOAN_DAYS,
+                        now: Optional[datetime] = None) -> "LoanPageStream":
+        """page_for_user, but rows are handed to the template as the aggregation cursor yields them."""
+        pipeline = cls.user_page_pipeline(
+            loans_col.name, books_col.name, user_id,
+            active_after=active_after, returned_after=returned_after, per_page=per_page,
+            loan_days=loan_days, now=now or datetime.utcnow(),
+        )
+        return LoanPageStream(loans_col.aggregate(pipeline, batchSize=per_page + 1), per_page)
+
+    @classmethod
+    def page_for_user(cls, loans_col, books_col, user_id: ObjectId, *, active_after: Optional[str] = None,
+                      returned_after: Optional[str] = None, per_page: int = 20, loan_days: int = LOAN_DAYS,
+                      now: Optional[datetime] = None) -> Dict[str, Any]:
+        pipeline = cls.user_page_pipeline(
+            loans_col.name, books_col.name, user_id,
+            active_after=active_after, returned_after=returned_after, per_page=per_page,
+            loan_days=loan_days, now=now or datetime.utcnow(),
+        )
+        return cls.split_user_page(list(loans_col.aggregate(pipeline)), per_page)
+
+    # --- Overdue (served from the partial active-by-due-date index) ---
+    @staticmethod
+    def overdue_filter(now: Optional[datetime] = None) -> Dict[str, Any]:
+        return {**ACTIVE_LOAN, "due_date": {"$lt": start_of_day(now)}}
+
+    @classmethod
+    def find_overdue(cls, loans_col, books_col, users_col, *, page: int = 1, per_page: int = 50,
+                     now: Optional[datetime] = None) -> Dict[str, Any]:
+        """One page of overdue loans, oldest due first, with the borrower and title joined in."""
+        docs = list(loans_col.aggregate([
+            {"$match": cls.overdue_filter(now)},
+            {"$sort": {"due_date": 1}},
+            {"$skip": max(0, page - 1) * per_page},
+            {"$limit": per_page + 1},
+            {"$lookup": {"from": books_col.name, "localField": "book_id", "foreignField": "_id", "as": "book"}},
+            {"$lookup": {"from": users_col.name, "localField": "user_id", "foreignField": "_id", "as": "user"}},
+            {"$project": {
+                "borrow_date": 1, "due_date": 1, "renew_count": 1,
+                "title": {"$ifNull": [{"$first": "$book.title"}, "(missing)"]},
+                "email": {"$ifNull": [{"$first": "$user.email"}, ""]},
+                "name": {"$ifNull": [{"$first": "$user.name"}, ""]},
+            }},
+        ], hint=ACTIVE_BY_DUE_INDEX))
+        for d in docs:
+            d["id"] = str(d.pop("_id"))
+        return {"loans": docs[:per_page], "more": len(docs) > per_page}
+
+    @classmethod
+    def mark_overdue(cls, loans_col, *, batch_size: int = 500, now: Optional[datetime] = None) -> int:
+        """
+        Flag newly overdue loans in batches; returns how many were flagged.
+        Each batch is an index range read of _ids plus one update_many, so the sweep
+        never holds a long-running multi-document write.
+        """
+        flt = {**cls.overdue_filter(now), "overdue": {"$ne": True}}
+        flagged = 0
+        while True:
+            ids = [d["_id"] for d in loans_col.find(flt, {"_id": 1}, sort=[("due_date", 1)],
+                                                     limit=batch_size, hint=ACTIVE_BY_DUE_INDEX)]
+            if not ids:
+                return flagged
+            res = loans_col.update_many({"_id": {"$in": ids}, **ACTIVE_LOAN}, {"$set": {"overdue": True}})
+            flagged += res.modified_count
+            if len(ids) < batch_size:
+                return flagged
+
     # --- Renew (active loans only) ---
     @classmethod
     def renew(cls, loans_col, *, loan_id: ObjectId, when: datetime) -> "Loan":
         doc = loans_col.find_one_and_update(
             {"_id": loan_id, "return_date": None},
-            {"$inc": {"renew_count": 1}, "$set": {"borrow_date": when}},
+            {"$inc": {"renew_count": 1}, "$set": {"borrow_date": when, "due_date": due_date_for(when)}},
             return_document=ReturnDocument.AFTER
         )
         if not doc:
@@ -339,21 +776,30 @@ class Loan:
 
     # --- Return (active loans only, then increment book.available) ---
     @classmethod
-    def return_loan(cls, loans_col, books_col, *, loan_id: ObjectId, when: datetime) -> "Loan":
+    def return_loan(cls, loans_col, books_col, *, loan_id: ObjectId, when: datetime,
+                    inventory=None, holds_col=None) -> "Loan":
         # 1) Mark loan returned if active
         loan_doc = loans_col.find_one_and_update(
             {"_id": loan_id, "return_date": None},
-            {"$set": {"return_date": when}},
+            {"$set": {"return_date": when, "overdue": False}},
             return_document=ReturnDocument.AFTER
         )
         if not loan_doc:
             raise ValueError("Loan is already returned or does not exist.")
 
-        # 2) Increment availability for the related book (guard against exceeding copies)
-        books_col.update_one(
-            {"_id": loan_doc["book_id"], "$expr": {"$lt": ["$available", "$copies"]}},
-            {"$inc": {"available": 1}}
-        )
+        # 2) Put the copy back: free the loan's copy document, or increment the counter
+        #    (guarded against exceeding copies)
+        if inventory is not None:
+            inventory.release([loan_doc.get("copy_id")])
+        else:
+            books_col.update_one(
+                {"_id": loan_doc["book_id"], "$expr": {"$lt": ["$available", "$copies"]}},
+                {"$inc": {"available": 1}}
+            )
+
+        # 3) Hand it to the head of the title's hold queue, if anyone is waiting
+        if holds_col is not None:
+            Hold.allocate(holds_col, loan_doc["book_id"])
 
         return cls.from_doc(loan_doc)
 
@@ -361,4 +807,190 @@ class Loan:
     @classmethod
     def delete_if_returned(cls, loans_col, *, loan_id: ObjectId) -> bool:
         res = loans_col.delete_one({"_id": loan_id, "return_date": {"$ne": None}})
-        return res.deleted_count == 1
\ No newline at end of file
+        return res.deleted_count == 1
+
+    # --- Batch circulation (desk cart): a fixed handful of round trips for any number of titles ---
+    @classmethod
+    def create_many(cls, loans_col, books_col, *, user_id: ObjectId, book_ids: List[ObjectId],
+                    when: datetime, inventory=None, holds_col=None) -> List["CirculationResult"]:
+        """
+        Check out several titles for one user.
+        1) one query for the user's active loans among them,
+        2) one bulk_write of guarded decrements, each tagged with a batch token,
+        3) one read of the token to learn which decrements landed,
+        4) one bulk_write of loan inserts, 5) one update to clear the token.
+        With the per-copy inventory, 2)+3) are a bulk claim and its read-back, and 5) goes away.
+        With holds, one more read finds copies set aside for other readers' ready holds (with the
+        per-copy inventory, one count after the claim checks they were left free) and one
+        delete clears this user's holds on the titles they got.
+        """
+        results: Dict[ObjectId, CirculationResult] = {}
+        wanted: List[ObjectId] = []
+        for bid in book_ids:
+            if bid not in results:
+                results[bid] = CirculationResult(book_id=bid)
+                wanted.append(bid)
+        if not wanted:
+            return []
+
+        active = {d["book_id"] for d in loans_col.find(
+            {"user_id": user_id, "book_id": {"$in": wanted}, "return_date": None},
+            {"book_id": 1},
+        )}
+        for bid in active:
+            results[bid].error = "User already has an active loan for this title."
+        todo = [bid for bid in wanted if bid not in active]
+
+        reserved: Dict[ObjectId, int] = {}
+        if holds_col is not None and todo:
+            reserved = Hold.reserved_for_others(holds_col, todo, user_id)
+
+        if todo and inventory is not None:
+            loan_ids = {bid: ObjectId() for bid in todo}
+            claimed = inventory.claim_many(loan_ids, keep=reserved)
+            loans = [Loan(user_id=user_id, book_id=bid, borrow_date=when, _id=loan_ids[bid], copy_id=claimed[bid])
+                     for bid in todo if bid in claimed]
+            if loans:
+                loans_col.bulk_write([InsertOne({**ln.to_doc(), "_id": ln._id}) for ln in loans], ordered=False)
+        elif todo:
+            token = ObjectId()
+            books_col.bulk_write([
+                UpdateOne(
+                    {"_id": bid, "available": {"$gt": reserved.get(bid, 0)}},
+                    {"$inc": {"available": -1}, "$addToSet": {"checkout_batches": token}},
+                )
+                for bid in todo
+            ], ordered=False)
+            # token is unindexed: the _id range keeps both the read-back and the cleanup on _id_
+            claimed = {d["_id"] for d in books_col.find({"_id": {"$in": todo}, "checkout_batches": token}, {"_id": 1})}
+
+            loans = [Loan(user_id=user_id, book_id=bid, borrow_date=when, _id=ObjectId())
+                     for bid in todo if bid in claimed]
+            if loans:
+                loans_col.bulk_write([InsertOne({**ln.to_doc(), "_id": ln._id}) for ln in loans], ordered=False)
+                books_col.update_many({"_id": {"$in": list(claimed)}, "checkout_batches": token},
+                                      {"$pull": {"checkout_batches": token}})
+        if todo:
+            if holds_col is not None and loans:
+                holds_col.delete_many({"user_id": user_id, "book_id": {"$in": [ln.book_id for ln in loans]}})
+            for ln in loans:
+                results[ln.book_id].ok = True
+                results[ln.book_id].loan = ln
+            for bid in todo:
+                if bid not in claimed:
+                    results[bid].error = ("All available copies are on hold for other readers."
+                                          if reserved.get(bid) else "No available copies for this title.")
+
+        return [results[bid] for bid in wanted]
+
+    @classmethod
+    def return_many(cls, loans_col, books_col, *, user_id: ObjectId, book_ids: List[ObjectId],
+                    when: datetime, inventory=None, holds_col=None) -> List["CirculationResult"]:
+        """
+        Return several titles for one user in four round trips (mark, read back, clear the
+        token, restock), plus one queue claim per returned title when holds are in use.
+        """
+        wanted = list(dict.fromkeys(book_ids))
+        if not wanted:
+            return []
+        token = ObjectId()
+        loans_col.update_many(
+            {"user_id": user_id, "book_id": {"$in": wanted}, "return_date": None},
+            {"$set": {"return_date": when, "overdue": False, "return_batch": token}},
+        )
+        # same user/book range as the mark, so the read-back uses the user's loan index
+        returned = {d["book_id"]: cls.from_doc(d) for d in loans_col.find(
+            {"user_id": user_id, "book_id": {"$in": wanted}, "return_batch": token})}
+        if returned:
+            loans_col.update_many({"_id": {"$in": [ln._id for ln in returned.values()]}},
+                                  {"$unset": {"return_batch": ""}})
+        if returned and inventory is not None:
+            inventory.release(ln.copy_id for ln in returned.values())
+        elif returned:
+            books_col.bulk_write([
+                UpdateOne(
+                    {"_id": bid, "$expr": {"$lt": ["$available", "$copies"]}},
+                    {"$inc": {"available": 1}},
+                )
+                for bid in returned
+            ], ordered=False)
+        if holds_col is not None:
+            for bid in returned:
+                Hold.allocate(holds_col, bid)
+
+        out = []
+        for bid in wanted:
+            ln = returned.get(bid)
+            if ln:
+                out.append(CirculationResult(book_id=bid, ok=True, loan=ln))
+            else:
+                out.append(CirculationResult(book_id=bid, error="No active loan for this title."))
+        return out
+
+
+@dataclass
+class CirculationResult:
+    book_id: ObjectId
+    ok: bool = False
+    error: Optional[str] = None
+    loan: Optional[Loan] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {"book_id": str(self.book_id), "ok": self.ok}
+        if self.error:
+            out["error"] = self.error
+        if self.loan is not None and self.loan._id is not None:
+            out["loan_id"] = str(self.loan._id)
+        return out
+
+
+class LoanPageStream:
+    """
+    Splits the my-loans $unionWith cursor (all active rows, then all returned rows) into its
+    two sections lazily. Templates iterate active() before returned(); active_next and
+    returned_next (the page token of the next, older page, or None) are set as each section
+    is drained.
+    """
+
+    def __init__(self, docs: Iterable[Dict[str, Any]], per_page: int):
+        self._docs = iter(docs)
+        self._head: Optional[Dict[str, Any]] = None
+        self._done = False
+        self.per_page = per_page
+        self.active_next: Optional[str] = None
+        self.returned_next: Optional[str] = None
+
+    def _peek(self) -> Optional[Dict[str, Any]]:
+        if self._head is None and not self._done:
+            self._head = next(self._docs, None)
+            self._done = self._head is None
+        return self._head
+
+    def has(self, section: str) -> bool:
+        """True when the next unread row belongs to `section` (reads at most one row ahead)."""
+        head = self._peek()
+        return head is not None and head.get("section") == section
+
+    @property
+    def empty(self) -> bool:
+        return self._peek() is None
+
+    def _section(self, section: str) -> Iterator[Dict[str, Any]]:
+        shown = 0
+        last = None
+        while self.has(section):
+            d, self._head = self._head, None
+            if shown == self.per_page:  # the +1 row only says another page exists
+                setattr(self, f"{section}_next", Loan.encode_cursor(*last))
+                continue
+            shown += 1
+            last = (d["borrow_date"], d["_id"])
+            d["id"] = str(d.pop("_id"))
+            d["returned"] = d.pop("section") == "returned"
+            yield d
+
+    def active(self) -> Iterator[Dict[str, Any]]:
+        return self._section("active")
+
+    def returned(self) -> Iterator[Dict[str, Any]]:
+        return self._section("returned")
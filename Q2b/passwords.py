@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Every hashing slot is taken; the caller should answer 'try again shortly' instead of queueing."""
+
+
+# ------------------------------
+# Password hashing off the request thread
+# ------------------------------
+class PasswordHasher:
+    """
+    Runs werkzeug's (deliberately slow) key derivations on a bounded process pool.
+
+    At most `max_pending` hashes may be queued or running; a caller that can't get a slot
+    within `acquire_timeout` seconds gets HasherBusy straight away, so a login burst can't
+    tie up every web worker. workers=0 hashes inline (handy for CLI scripts and seeding).
+    """
+
+    def __init__(self, method: str = "scrypt", workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, acquire_timeout: float = 0.05):
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(1, self.workers) * 2
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._prefix: Optional[str] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # the pool starts lazily, after the server's threads are up: forking then
+                    # could copy a lock some other thread holds, so start workers fresh instead
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise HasherBusy("Too many sign-ins at once, please try again in a moment.")
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pw_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash: str) -> bool:
+        """True when pw_hash was made with different parameters than the current method."""
+        if self._prefix is None:
+            # werkzeug expands e.g. "scrypt" to "scrypt:32768:8:1"; learn the expansion once
+            self._prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return pw_hash.split("$", 1)[0] != self._prefix
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+hasher = PasswordHasher(workers=0)
+
+
+def configure(app) -> PasswordHasher:
+    """Swap in the pooled hasher described by the app config."""
+    global hasher
+    hasher = PasswordHasher(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        workers=app.config["PASSWORD_POOL_WORKERS"],
+        max_pending=app.config["PASSWORD_MAX_PENDING"],
+        acquire_timeout=app.config["PASSWORD_WAIT_SECONDS"],
+    )
+    return hasher
@@ -0,0 +1,216 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from .models import Book, BookPage, User, Loan, LoanPageStream, LOAN_DAYS, ASSIGNMENT_USERS
+from .search import FIELDS as SEARCH_FIELDS, collection_fingerprint
+
+# ------------------------------
+# Repository interface
+# ------------------------------
+# What the reader-facing views (catalogue, login, loans) need from storage, so the same
+# views can run on MongoDB or on the embedded SQLite store (STORAGE_BACKEND=mongo|sqlite).
+# Ids stay ObjectIds and results stay the model classes whichever backend is used.
+# Mongo-only features (covers, holds, per-copy inventory, desk batches, the JSON API,
+# exports, the overdue report) keep using the collections directly and are only offered
+# when STORAGE_BACKEND=mongo.
+
+
+class BookRepository(ABC):
+    @abstractmethod
+    def get(self, book_id) -> Optional[Book]:
+        ...
+
+    @abstractmethod
+    def get_many(self, book_ids: List[ObjectId]) -> Dict[ObjectId, Book]:
+        """The books that exist among book_ids, by id (order is up to the caller)."""
+
+    @abstractmethod
+    def count(self, category: Optional[str] = None) -> int:
+        ...
+
+    @abstractmethod
+    def stream_page(self, category: Optional[str] = None, *, after: Optional[str] = None,
+                    before: Optional[str] = None, limit: int = 20) -> BookPage:
+        """One keyset page in (title, _id) order; page.books may be lazy (see Book.stream_page)."""
+
+    @abstractmethod
+    def add(self, doc: Dict[str, Any]) -> ObjectId:
+        """Insert one Book.normalize()d document; ValueError if its dedupe_key is taken."""
+
+    @abstractmethod
+    def seed(self, books: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Idempotent insert keyed on dedupe_key (default: all_books); returns how many were new."""
+
+    # --- Search index feed (see search.get_index) ---
+    @abstractmethod
+    def fingerprint(self) -> List[Any]:
+        """[book count, newest id as a string]: the search index's change detector."""
+
+    @abstractmethod
+    def search_docs(self) -> Iterable[Tuple[ObjectId, Dict[str, Any]]]:
+        """(id, doc) for every book, with at least the search.FIELDS."""
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[User]:
+        ...
+
+    @abstractmethod
+    def by_email(self, email: str) -> Optional[User]:
+        ...
+
+    @abstractmethod
+    def create(self, email: str, password: str, name: str, role: str = "user") -> User:
+        """Raises ValueError if the email is taken (and passwords.HasherBusy when saturated)."""
+
+    @abstractmethod
+    def authenticate(self, email: str, password: str) -> Optional[User]:
+        ...
+
+    def seed(self, required: List[Dict[str, str]] = ASSIGNMENT_USERS) -> None:
+        """Create whichever required users are missing; existing ones are left alone."""
+        for u in required:
+            if self.by_email(u["email"]) is None:
+                self.create(u["email"], u["password"], u["name"], u["role"])
+
+
+class LoanRepository(ABC):
+    @abstractmethod
+    def get(self, loan_id) -> Optional[Loan]:
+        ...
+
+    @abstractmethod
+    def create(self, *, user_id: ObjectId, book_id: ObjectId, when: datetime) -> Loan:
+        """Take a copy and record the loan atomically; ValueError when that isn't possible."""
+
+    @abstractmethod
+    def renew(self, *, loan_id: ObjectId, when: datetime) -> Loan:
+        ...
+
+    @abstractmethod
+    def return_loan(self, *, loan_id: ObjectId, when: datetime) -> Loan:
+        ...
+
+    @abstractmethod
+    def delete_if_returned(self, *, loan_id: ObjectId) -> bool:
+        ...
+
+    @abstractmethod
+    def stream_for_user(self, user_id: ObjectId, *, active_after: Optional[str] = None,
+                        returned_after: Optional[str] = None, per_page: int = 20,
+                        loan_days: int = LOAN_DAYS, now: Optional[datetime] = None) -> LoanPageStream:
+        """Each section newest first, from just after its Loan.encode_cursor token (None: the newest)."""
+
+
+class Repositories:
+    def __init__(self, backend: str, books: BookRepository, users: UserRepository, loans: LoanRepository):
+        self.backend = backend
+        self.books = books
+        self.users = users
+        self.loans = loans
+
+
+# ------------------------------
+# MongoDB (the existing model code)
+# ------------------------------
+class MongoBooks(BookRepository):
+    def __init__(self, books_col):
+        self.books_col = books_col
+
+    def get(self, book_id) -> Optional[Book]:
+        return Book.find_one(self.books_col, book_id)
+
+    def get_many(self, book_ids) -> Dict[ObjectId, Book]:
+        return {d["_id"]: Book.from_doc(d) for d in self.books_col.find({"_id": {"$in": list(book_ids)}})}
+
+    def count(self, category: Optional[str] = None) -> int:
+        return Book.count(self.books_col, category=category)
+
+    def stream_page(self, category=None, *, after=None, before=None, limit=20) -> BookPage:
+        return Book.stream_page(self.books_col, category=category, after=after, before=before, limit=limit)
+
+    def add(self, doc) -> ObjectId:
+        try:
+            return self.books_col.insert_one(doc).inserted_id
+        except DuplicateKeyError:  # unique dedupe_key: same title and authors
+            raise ValueError("This title already exists.")
+
+    def seed(self, books=None) -> int:
+        return Book.seed(self.books_col, books)
+
+    def fingerprint(self) -> List[Any]:
+        return collection_fingerprint(self.books_col)
+
+    def search_docs(self):
+        return ((d["_id"], d) for d in self.books_col.find({}, {f: 1 for f in SEARCH_FIELDS}))
+
+
+class MongoUsers(UserRepository):
+    def __init__(self, users_col):
+        self.users_col = users_col
+
+    def get(self, user_id: str) -> Optional[User]:
+        return User.find_by_id(self.users_col, user_id)
+
+    def by_email(self, email: str) -> Optional[User]:
+        return User.find_by_email(self.users_col, email)
+
+    def create(self, email, password, name, role="user") -> User:
+        return User.create(self.users_col, email=email, password=password, name=name, role=role)
+
+    def authenticate(self, email: str, password: str) -> Optional[User]:
+        return User.authenticate(self.users_col, email, password)
+
+
+class MongoLoans(LoanRepository):
+    """Loans plus the Mongo-only extras: per-copy inventory and the hold queue."""
+
+    def __init__(self, loans_col, books_col, inventory=None, holds_col=None):
+        self.loans_col = loans_col
+        self.books_col = books_col
+        self.inventory = inventory
+        self.holds_col = holds_col
+
+    def get(self, loan_id) -> Optional[Loan]:
+        return Loan.find_by_id(self.loans_col, loan_id)
+
+    def create(self, *, user_id, book_id, when) -> Loan:
+        return Loan.create(self.loans_col, self.books_col, user_id=user_id, book_id=book_id, when=when,
+                           inventory=self.inventory, holds_col=self.holds_col)
+
+    def renew(self, *, loan_id, when) -> Loan:
+        return Loan.renew(self.loans_col, loan_id=loan_id, when=when)
+
+    def return_loan(self, *, loan_id, when) -> Loan:
+        return Loan.return_loan(self.loans_col, self.books_col, loan_id=loan_id, when=when,
+                                inventory=self.inventory, holds_col=self.holds_col)
+
+    def delete_if_returned(self, *, loan_id) -> bool:
+        return Loan.delete_if_returned(self.loans_col, loan_id=loan_id)
+
+    def stream_for_user(self, user_id, *, active_after=None, returned_after=None, per_page=20,
+                        loan_days=LOAN_DAYS, now=None) -> LoanPageStream:
+        return Loan.stream_for_user(self.loans_col, self.books_col, user_id, active_after=active_after,
+                                    returned_after=returned_after, per_page=per_page,
+                                    loan_days=loan_days, now=now)
+
+
+def open_repositories(app) -> Repositories:
+    backend = app.config["STORAGE_BACKEND"]
+    if backend == "sqlite":
+        from .sqlite_store import SQLiteStore
+        store = SQLiteStore(app.config["SQLITE_PATH"])
+        return Repositories("sqlite", store.books, store.users, store.loans)
+    if backend != "mongo":
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r} (expected mongo or sqlite)")
+    return Repositories(
+        "mongo",
+        MongoBooks(app.books_col),
+        MongoUsers(app.users_col),
+        MongoLoans(app.loans_col, app.books_col, app.inventory, app.holds_col),
+    )
@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+# The index itself is shared with Q2a; this module only feeds it from the book repository
+from search_core import FIELDS, SearchIndex  # noqa: F401  (FIELDS is re-exported)
+
+
+# ------------------------------
+# Q2b adapter
+# ------------------------------
+# Each worker keeps its own copy of the index. Reads re-check the repository fingerprint
+# (book count, newest id) at most every SEARCH_REFRESH_SECONDS and reload when it moved, so
+# titles added by another worker or by `flask library import` show up without a restart.
+# Local inserts are folded in straight away and written to disk off the request path.
+_lock = threading.Lock()
+
+
+def collection_fingerprint(books_col) -> List[Any]:
+    """Cheap change detector: document count plus the newest _id."""
+    newest = books_col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return [books_col.estimated_document_count(), str(newest["_id"]) if newest else None]
+
+
+def get_index(app, refresh: bool = True) -> SearchIndex:
+    """The worker's index: loaded from disk or built on first use, reloaded when the books change."""
+    def due() -> bool:
+        return refresh and time.monotonic() - app.search_checked >= app.config["SEARCH_REFRESH_SECONDS"]
+
+    index = getattr(app, "search_index", None)
+    if index is not None and not due():
+        return index
+    with _lock:
+        index = getattr(app, "search_index", None)
+        if index is None or due():
+            books = app.repos.books
+            fingerprint = books.fingerprint()
+            if index is None or index.fingerprint != fingerprint:
+                # another process may already have saved a matching index; else rebuild
+                app.search_index = SearchIndex.load_or_build(
+                    app.config["SEARCH_INDEX_PATH"], fingerprint, books.search_docs,
+                )
+            app.search_checked = time.monotonic()
+    return app.search_index
+
+
+def index_books(app, items: Iterable[Tuple[Any, Dict[str, Any]]]) -> None:
+    """
+    Fold freshly inserted books into the index and schedule a save. The fingerprint is
+    advanced by exactly these inserts, so anything added elsewhere meanwhile still reads
+    as a change on the next check.
+    """
+    index = get_index(app, refresh=False)  # our own insert must not read as a foreign change
+    with _lock:
+        count, newest = index.fingerprint or [0, None]
+        for oid, doc in items:
+            index.add_document(oid, doc)
+            count += 1
+            newest = max(newest or "", str(oid))
+        index.fingerprint = [count, newest]
+    _schedule_save(app)
+
+
+def index_book(app, oid, doc: Dict[str, Any]) -> None:
+    index_books(app, [(oid, doc)])
+
+
+def save_index(app) -> None:
+    """Write the index now (e.g. at the end of a CLI import), cancelling any pending save."""
+    with _lock:
+        timer, app.search_save_timer = getattr(app, "search_save_timer", None), None
+    if timer is not None:
+        timer.cancel()
+    try:
+        get_index(app, refresh=False).save(app.config["SEARCH_INDEX_PATH"])
+    except OSError:
+        app.logger.warning("Could not persist search index")
+
+
+def _schedule_save(app) -> None:
+    # Saving rewrites the whole file, so a burst of inserts shares one write
+    with _lock:
+        if getattr(app, "search_save_timer", None) is not None:
+            return
+        app.search_save_timer = threading.Timer(app.config["SEARCH_SAVE_DELAY"], save_index, (app,))
+        app.search_save_timer.daemon = True
+        app.search_save_timer.start()
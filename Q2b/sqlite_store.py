@@ -0,0 +1,398 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from bson import ObjectId
+
+from . import passwords
+from .books import all_books
+from .models import Book, BookPage, User, Loan, LoanPageStream, LOAN_DAYS, due_date_for, start_of_day
+from .repository import BookRepository, UserRepository, LoanRepository
+
+# ------------------------------
+# Schema
+# ------------------------------
+# Ids are ObjectId hex strings, so URLs, page cursors and the views are the same as on Mongo
+# (and hex order is ObjectId order). List fields are JSON text; datetimes are ISO text.
+# books.available is guarded by a CHECK, and a partial unique index allows one active loan
+# per (user, book), so neither rule depends on a read-then-write in Python.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id          TEXT PRIMARY KEY,
+    title       TEXT NOT NULL,
+    category    TEXT NOT NULL DEFAULT '',
+    genres      TEXT NOT NULL DEFAULT '[]',
+    url         TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '[]',
+    authors     TEXT NOT NULL DEFAULT '[]',
+    pages       INTEGER NOT NULL DEFAULT 0,
+    available   INTEGER NOT NULL DEFAULT 0,
+    copies      INTEGER NOT NULL DEFAULT 0,
+    rev         INTEGER NOT NULL DEFAULT 0,
+    dedupe_key  TEXT NOT NULL UNIQUE,
+    CHECK (available >= 0 AND available <= copies)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS books_title ON books (title, id);
+CREATE INDEX IF NOT EXISTS books_category_title ON books (category, title, id);
+
+CREATE TABLE IF NOT EXISTS users (
+    id      TEXT PRIMARY KEY,
+    email   TEXT NOT NULL UNIQUE,
+    name    TEXT NOT NULL DEFAULT '',
+    role    TEXT NOT NULL DEFAULT 'user',
+    pw_hash TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS loans (
+    id          TEXT PRIMARY KEY,
+    user_id     TEXT NOT NULL REFERENCES users (id),
+    book_id     TEXT NOT NULL REFERENCES books (id),
+    borrow_date TEXT NOT NULL,
+    due_date    TEXT NOT NULL,
+    return_date TEXT,
+    renew_count INTEGER NOT NULL DEFAULT 0,
+    overdue     INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS loans_one_active ON loans (user_id, book_id) WHERE return_date IS NULL;
+CREATE INDEX IF NOT EXISTS loans_user_active ON loans (user_id, borrow_date DESC, id DESC) WHERE return_date IS NULL;
+CREATE INDEX IF NOT EXISTS loans_user_returned ON loans (user_id, borrow_date DESC, id DESC) WHERE return_date IS NOT NULL;
+CREATE INDEX IF NOT EXISTS loans_book ON loans (book_id, return_date);
+"""
+
+# Every statement is a constant string with ? parameters, so sqlite3's per-connection
+# statement cache prepares each one once and reuses it.
+BOOK_COLUMNS = "id, title, category, genres, url, description, authors, pages, available, copies, rev"
+SQL = {
+    "book": f"SELECT {BOOK_COLUMNS} FROM books WHERE id = ?",
+    "count_all": "SELECT COUNT(*) FROM books",
+    "count_category": "SELECT COUNT(*) FROM books WHERE category = ?",
+    "insert_book": """INSERT OR IGNORE INTO books (id, title, category, genres, url, description, authors,
+                      pages, available, copies, rev, dedupe_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    "add_book": """INSERT INTO books (id, title, category, genres, url, description, authors,
+                   pages, available, copies, rev, dedupe_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    "fingerprint": "SELECT COUNT(*), MAX(id) FROM books",
+    "search_docs": "SELECT id, title, authors, genres, description FROM books",
+    "take_copy": "UPDATE books SET available = available - 1 WHERE id = ? AND available > 0",
+    "put_copy": "UPDATE books SET available = available + 1 WHERE id = ? AND available < copies",
+
+    "user": "SELECT id, email, name, role, pw_hash FROM users WHERE id = ?",
+    "user_by_email": "SELECT id, email, name, role, pw_hash FROM users WHERE email = ?",
+    "insert_user": "INSERT INTO users (id, email, name, role, pw_hash) VALUES (?, ?, ?, ?, ?)",
+    "upgrade_hash": "UPDATE users SET pw_hash = ? WHERE id = ? AND pw_hash = ?",
+
+    "loan": "SELECT * FROM loans WHERE id = ?",
+    "insert_loan": """INSERT INTO loans (id, user_id, book_id, borrow_date, due_date, return_date, renew_count, overdue)
+                      VALUES (?, ?, ?, ?, ?, NULL, 0, 0)""",
+    "renew_loan": """UPDATE loans SET renew_count = renew_count + 1, borrow_date = ?, due_date = ?
+                     WHERE id = ? AND return_date IS NULL""",
+    "return_loan": "UPDATE loans SET return_date = ?, overdue = 0 WHERE id = ? AND return_date IS NULL",
+    "delete_loan": "DELETE FROM loans WHERE id = ? AND return_date IS NOT NULL",
+    "user_loans_active": """
+        SELECT l.*, b.title, b.authors, b.url FROM loans l LEFT JOIN books b ON b.id = l.book_id
+        WHERE l.user_id = ? AND l.return_date IS NULL AND (l.borrow_date, l.id) < (?, ?)
+        ORDER BY l.borrow_date DESC, l.id DESC LIMIT ?""",
+    "user_loans_returned": """
+        SELECT l.*, b.title, b.authors, b.url FROM loans l LEFT JOIN books b ON b.id = l.book_id
+        WHERE l.user_id = ? AND l.return_date IS NOT NULL AND (l.borrow_date, l.id) < (?, ?)
+        ORDER BY l.borrow_date DESC, l.id DESC LIMIT ?""",
+}
+
+
+def _ts(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat(" ", "microseconds") if value is not None else None
+
+
+def _dt(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+# Sorts after every stored (borrow_date, id): the key a first my-loans page starts below
+_NEWEST_LOAN = ("9999-12-31 23:59:59.999999", "~")
+
+
+def _book_row(oid: ObjectId, d: Dict[str, Any]) -> tuple:
+    """Parameters for insert_book/add_book from a Book.normalize()d document."""
+    return (str(oid), d["title"], d["category"], json.dumps(d["genres"]), d["url"],
+            json.dumps(d["description"]), json.dumps(d["authors"]), d["pages"],
+            min(d["available"], d["copies"]), d["copies"], d["rev"], d["dedupe_key"])
+
+
+def _page_sql(category: Optional[str], key, backwards: bool) -> str:
+    """Keyset page query for Book.page_query's (title, _id) order; both shapes hit an index."""
+    where = [] if not category or category == "All" else ["category = ?"]
+    op, order = ("<", "DESC") if backwards else (">", "ASC")
+    if key:
+        where.append(f"(title {op} ? OR (title = ? AND id {op} ?))")
+    clause = f"WHERE {' AND '.join(where)} " if where else ""
+    return f"SELECT {BOOK_COLUMNS} FROM books {clause}ORDER BY title {order}, id {order} LIMIT ?"
+
+
+# ------------------------------
+# Store (one connection per thread)
+# ------------------------------
+class SQLiteStore:
+    """
+    Embedded backend for single-node deployments and tests. WAL lets readers run alongside
+    the one writer; writes that touch two tables run in BEGIN IMMEDIATE transactions.
+    """
+
+    def __init__(self, path: str, *, busy_timeout: float = 5.0, cached_statements: int = 128):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        # a file path, not ":memory:": every thread opens its own connection to it
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn().executescript(SCHEMA)
+        self.books = SQLiteBooks(self)
+        self.users = SQLiteUsers(self)
+        self.loans = SQLiteLoans(self)
+
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode (isolation_level=None): transactions are only the explicit ones below
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   cached_statements=self.cached_statements)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")  # durable at checkpoints; no fsync per commit
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """BEGIN IMMEDIATE takes the write lock up front, so the transaction never has to upgrade."""
+        conn = self.conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+# ------------------------------
+# Books
+# ------------------------------
+def _book_doc(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(row["id"]),
+        "title": row["title"],
+        "category": row["category"],
+        "genres": json.loads(row["genres"]),
+        "url": row["url"],
+        "description": json.loads(row["description"]),
+        "authors": json.loads(row["authors"]),
+        "pages": row["pages"],
+        "available": row["available"],
+        "copies": row["copies"],
+        "rev": row["rev"],
+    }
+
+
+class SQLiteBooks(BookRepository):
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    def get(self, book_id) -> Optional[Book]:
+        try:
+            oid = str(ObjectId(book_id))
+        except Exception:
+            return None
+        row = self.store.conn().execute(SQL["book"], (oid,)).fetchone()
+        return Book.from_doc(_book_doc(row)) if row else None
+
+    def get_many(self, book_ids) -> Dict[ObjectId, Book]:
+        ids = [str(b) for b in book_ids]
+        if not ids:
+            return {}
+        sql = f"SELECT {BOOK_COLUMNS} FROM books WHERE id IN ({', '.join('?' * len(ids))})"
+        return {ObjectId(r["id"]): Book.from_doc(_book_doc(r)) for r in self.store.conn().execute(sql, ids)}
+
+    def count(self, category: Optional[str] = None) -> int:
+        conn = self.store.conn()
+        if not category or category == "All":
+            return conn.execute(SQL["count_all"]).fetchone()[0]
+        return conn.execute(SQL["count_category"], (category,)).fetchone()[0]
+
+    def stream_page(self, category=None, *, after=None, before=None, limit=20) -> BookPage:
+        limit = max(1, int(limit))
+        key = Book.decode_cursor(before)
+        backwards = key is not None
+        key = key or Book.decode_cursor(after)
+        params: List[Any] = [] if not category or category == "All" else [category]
+        if key:
+            title, oid = key
+            params += [title, title, str(oid)]
+        params.append(limit + 1)
+        rows = self.store.conn().execute(_page_sql(category, key, backwards), params).fetchall()
+        # local reads are sub-millisecond, so the page is simply built in one go
+        return Book.build_page([_book_doc(r) for r in rows], limit=limit, after=after, before=before)
+
+    def add(self, doc) -> ObjectId:
+        oid = ObjectId()
+        try:
+            self.store.conn().execute(SQL["add_book"], _book_row(oid, doc))
+        except sqlite3.IntegrityError:
+            raise ValueError("This title already exists.")
+        return oid
+
+    def seed(self, books=None) -> int:
+        docs = [Book.normalize(b) for b in (all_books if books is None else books)]
+        with self.store.write() as conn:
+            before = conn.total_changes
+            conn.executemany(SQL["insert_book"], [_book_row(ObjectId(), d) for d in docs])
+            return conn.total_changes - before
+
+    def fingerprint(self) -> List[Any]:
+        count, newest = self.store.conn().execute(SQL["fingerprint"]).fetchone()
+        return [count, newest]
+
+    def search_docs(self):
+        for row in self.store.conn().execute(SQL["search_docs"]):
+            yield ObjectId(row["id"]), {
+                "title": row["title"],
+                "authors": json.loads(row["authors"]),
+                "genres": json.loads(row["genres"]),
+                "description": json.loads(row["description"]),
+            }
+
+
+# ------------------------------
+# Users
+# ------------------------------
+def _user(row: Optional[sqlite3.Row]) -> Optional[User]:
+    if row is None:
+        return None
+    return User(id=row["id"], email=row["email"], name=row["name"], role=row["role"], pw_hash=row["pw_hash"])
+
+
+class SQLiteUsers(UserRepository):
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    def get(self, user_id: str) -> Optional[User]:
+        return _user(self.store.conn().execute(SQL["user"], (str(user_id),)).fetchone())
+
+    def by_email(self, email: str) -> Optional[User]:
+        return _user(self.store.conn().execute(SQL["user_by_email"], (email.lower().strip(),)).fetchone())
+
+    def create(self, email, password, name, role="user") -> User:
+        user = User(id=str(ObjectId()), email=email.lower().strip(), name=name.strip(), role=role,
+                    pw_hash=passwords.hasher.hash(password))
+        try:
+            self.store.conn().execute(SQL["insert_user"], (user.id, user.email, user.name, user.role, user.pw_hash))
+        except sqlite3.IntegrityError:
+            raise ValueError("Email already registered")
+        return user
+
+    def authenticate(self, email: str, password: str) -> Optional[User]:
+        """May raise passwords.HasherBusy when the hashing pool is saturated."""
+        u = self.by_email(email)
+        if not u or not u.verify_password(password):
+            return None
+        if passwords.hasher.needs_rehash(u.pw_hash):
+            try:
+                new_hash = passwords.hasher.hash(password)
+            except passwords.HasherBusy:
+                return u
+            # guarded on the old hash, like User.upgrade_hash
+            if self.store.conn().execute(SQL["upgrade_hash"], (new_hash, u.id, u.pw_hash)).rowcount:
+                u.pw_hash = new_hash
+                User.changed(u.id)
+        return u
+
+
+# ------------------------------
+# Loans
+# ------------------------------
+def _loan(row: sqlite3.Row) -> Loan:
+    return Loan(
+        user_id=ObjectId(row["user_id"]),
+        book_id=ObjectId(row["book_id"]),
+        borrow_date=_dt(row["borrow_date"]),
+        return_date=_dt(row["return_date"]),
+        renew_count=row["renew_count"],
+        _id=ObjectId(row["id"]),
+        due_date=_dt(row["due_date"]),
+        overdue=bool(row["overdue"]),
+    )
+
+
+class SQLiteLoans(LoanRepository):
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    def get(self, loan_id) -> Optional[Loan]:
+        row = self.store.conn().execute(SQL["loan"], (str(loan_id),)).fetchone()
+        return _loan(row) if row else None
+
+    def create(self, *, user_id, book_id, when) -> Loan:
+        loan = Loan(user_id=user_id, book_id=book_id, borrow_date=when, _id=ObjectId(), due_date=due_date_for(when))
+        try:
+            with self.store.write() as conn:
+                if conn.execute(SQL["take_copy"], (str(book_id),)).rowcount == 0:
+                    raise ValueError("No available copies for this title.")
+                conn.execute(SQL["insert_loan"], (str(loan._id), str(user_id), str(book_id),
+                                                  _ts(when), _ts(loan.due_date)))
+        except sqlite3.IntegrityError as e:
+            # the copy taken above was rolled back with the insert
+            if "UNIQUE" in str(e):  # loans_one_active
+                raise ValueError("User already has an active loan for this title.")
+            raise ValueError("Unknown reader or title.")
+        return loan
+
+    def renew(self, *, loan_id, when) -> Loan:
+        conn = self.store.conn()
+        if conn.execute(SQL["renew_loan"], (_ts(when), _ts(due_date_for(when)), str(loan_id))).rowcount == 0:
+            raise ValueError("Only active loans can be renewed.")
+        return self.get(loan_id)
+
+    def return_loan(self, *, loan_id, when) -> Loan:
+        with self.store.write() as conn:
+            if conn.execute(SQL["return_loan"], (_ts(when), str(loan_id))).rowcount == 0:
+                raise ValueError("Loan is already returned or does not exist.")
+            row = conn.execute(SQL["loan"], (str(loan_id),)).fetchone()
+            conn.execute(SQL["put_copy"], (row["book_id"],))  # guarded against exceeding copies
+        return _loan(row)
+
+    def delete_if_returned(self, *, loan_id) -> bool:
+        return self.store.conn().execute(SQL["delete_loan"], (str(loan_id),)).rowcount == 1
+
+    def stream_for_user(self, user_id, *, active_after=None, returned_after=None, per_page=20,
+                        loan_days=LOAN_DAYS, now=None) -> LoanPageStream:
+        """Same rows as Loan.user_page_pipeline (active slice, then returned slice) for LoanPageStream."""
+        today = start_of_day(now)
+        conn = self.store.conn()
+        docs = []
+        for section, sql, after in (("active", SQL["user_loans_active"], active_after),
+                                    ("returned", SQL["user_loans_returned"], returned_after)):
+            key = Loan.decode_cursor(after)
+            below = (_ts(key[0]), str(key[1])) if key else _NEWEST_LOAN
+            for row in conn.execute(sql, (str(user_id), *below, per_page + 1)):
+                due = _dt(row["due_date"])
+                docs.append({
+                    "_id": ObjectId(row["id"]),
+                    "section": section,
+                    "borrow_date": _dt(row["borrow_date"]),
+                    "return_date": _dt(row["return_date"]),
+                    "renew_count": row["renew_count"],
+                    "due_date": due,
+                    "overdue": row["return_date"] is None and due < today,
+                    "book": {
+                        "_id": ObjectId(row["book_id"]),
+                        "title": row["title"] if row["title"] is not None else "(missing)",
+                        "authors": json.loads(row["authors"]) if row["authors"] else [],
+                        "url": row["url"] or "",
+                        "cover": None,
+                    },
+                })
+        return LoanPageStream(docs, per_page)
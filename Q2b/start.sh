@@ -14,4 +14,5 @@ export FLASK_APP=app.py
 export PYTHONPATH=.
 export FLASK_DEBUG=1
 
+flask library init
 flask run --host=0.0.0.0
\ No newline at end of file
@@ -0,0 +1,53 @@
+import threading
+
+from .models import Loan
+from .holds import Hold
+
+
+class OverdueSweeper(threading.Thread):
+    """
+    Daemon thread that periodically flags newly overdue loans (see Loan.mark_overdue) and
+    passes copies freed by expired holds on to the next reader in the queue (Hold.promote).
+    """
+
+    def __init__(self, app, interval: float, batch_size: int):
+        super().__init__(name="overdue-sweeper", daemon=True)
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        # Wait first: startup shouldn't pay for a sweep
+        while not self._stop_event.wait(self.interval):
+            self.sweep_once()
+
+    def sweep_once(self) -> int:
+        try:
+            flagged = Loan.mark_overdue(self.app.loans_col, batch_size=self.batch_size)
+        except Exception:
+            self.app.logger.exception("Overdue sweep failed")
+            return 0
+        if flagged:
+            self.app.logger.info(f"Overdue sweep flagged {flagged} loan(s)")
+        try:
+            promoted = Hold.promote(self.app.holds_col, self.app.books_col, self.app.inventory)
+        except Exception:
+            self.app.logger.exception("Hold promotion failed")
+            promoted = 0
+        if promoted:
+            self.app.logger.info(f"Hold sweep made {promoted} hold(s) ready")
+        return flagged
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def start_overdue_sweeper(app):
+    """Start one sweeper per process unless OVERDUE_SWEEP_SECONDS is 0 (or storage isn't Mongo)."""
+    interval = app.config["OVERDUE_SWEEP_SECONDS"]
+    if interval <= 0 or app.repos.backend != "mongo" or getattr(app, "overdue_sweeper", None) is not None:
+        return None
+    app.overdue_sweeper = OverdueSweeper(app, interval, app.config["OVERDUE_SWEEP_BATCH"])
+    app.overdue_sweeper.start()
+    return app.overdue_sweeper
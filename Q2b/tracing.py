@@ -0,0 +1,272 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+
+# Commands that continue or wrap another one; they are listed but never count towards N+1
+NOT_A_QUERY = {"getMore", "killCursors", "endSessions", "hello", "isMaster", "ismaster", "ping"}
+
+
+# ------------------------------
+# Query shapes
+# ------------------------------
+def _shape(value: Any) -> Any:
+    """Keep field names and operators, drop the values: {"_id": ObjectId(..)} -> {"_id": "?"}."""
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [_shape(v) for v in value]
+        # $in lists etc. differ only in length; keep one element so the shape is stable
+        return shapes[:1] if all(s == "?" for s in shapes) else shapes
+    return "?"
+
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> str:
+    """The filter part of a command, as a value-free string (pipelines: stage names + $match)."""
+    if command_name == "find":
+        target = {"filter": command.get("filter", {})}
+        if command.get("sort"):
+            target["sort"] = list(command["sort"])  # key order only; directions are values
+    elif command_name == "aggregate":
+        target = [
+            {stage: _shape(body) if stage == "$match" else None}
+            for s in command.get("pipeline", []) for stage, body in s.items()
+        ]
+        return repr(target)
+    elif command_name in ("count", "findAndModify", "distinct"):
+        target = command.get("query", {})
+    elif command_name in ("update", "delete"):
+        key = "updates" if command_name == "update" else "deletes"
+        target = [op.get("q", {}) for op in command.get(key, [])]
+    else:
+        return ""
+    return repr(_shape(target))
+
+
+def docs_returned(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "value" in reply:  # findAndModify
+        return int(reply["value"] is not None)
+    if "values" in reply:  # distinct
+        return len(reply["values"])
+    return int(reply.get("n", 0))
+
+
+# ------------------------------
+# Request-scoped trace
+# ------------------------------
+@dataclass
+class QueryRecord:
+    command: str
+    collection: str
+    shape: str
+    ms: float = 0.0
+    docs: int = 0
+    ok: bool = True
+
+
+@dataclass
+class RequestTrace:
+    endpoint: str
+    started: float = field(default_factory=time.perf_counter)
+    queries: List[QueryRecord] = field(default_factory=list)
+    _pending: Dict[Tuple, QueryRecord] = field(default_factory=dict, repr=False)
+
+    @property
+    def round_trips(self) -> int:
+        return len(self.queries)
+
+    @property
+    def mongo_ms(self) -> float:
+        return sum(q.ms for q in self.queries)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, str, str, int]]:
+        """(command, collection, shape, times) for every shape issued at least `threshold` times."""
+        counts: Dict[Tuple[str, str, str], int] = {}
+        for q in self.queries:
+            if q.command not in NOT_A_QUERY:
+                key = (q.command, q.collection, q.shape)
+                counts[key] = counts.get(key, 0) + 1
+        return [k + (n,) for k, n in counts.items() if n >= threshold]
+
+
+# The trace is a mutable object shared through the context, so commands issued from the
+# async Mongo loop (which inherits the submitting view's context) land in it as well.
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("library_request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+@contextmanager
+def traced(name: str) -> Iterator[RequestTrace]:
+    """Trace whatever runs inside the block (e.g. a whole test-client request, body included)."""
+    trace = RequestTrace(name)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+class QueryTracer(monitoring.CommandListener):
+    """Appends every command issued while a trace is active to that trace."""
+
+    def started(self, event):
+        trace = _current.get()
+        if trace is None:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        trace._pending[(event.connection_id, event.request_id)] = QueryRecord(
+            command=event.command_name,
+            collection=collection if isinstance(collection, str) else "",
+            shape=query_shape(event.command_name, event.command),
+        )
+
+    def _finish(self, event, ok: bool, reply: Optional[Dict[str, Any]] = None):
+        trace = _current.get()
+        if trace is None:
+            return
+        record = trace._pending.pop((event.connection_id, event.request_id), None)
+        if record is None:
+            return
+        record.ms = event.duration_micros / 1000
+        record.ok = ok
+        if reply is not None:
+            record.docs = docs_returned(reply)
+        trace.queries.append(record)
+
+    def succeeded(self, event):
+        self._finish(event, True, event.reply)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+
+# ------------------------------
+# Per-route summary (for /admin/traces)
+# ------------------------------
+class RouteStats:
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace: RequestTrace, elapsed_ms: float, n_plus_one: bool, slow: bool) -> None:
+        with self._lock:
+            s = self._routes.setdefault(trace.endpoint, {
+                "requests": 0, "round_trips": 0, "max_round_trips": 0, "mongo_ms": 0.0,
+                "elapsed_ms": 0.0, "n_plus_one": 0, "over_budget": 0,
+            })
+            s["requests"] += 1
+            s["round_trips"] += trace.round_trips
+            s["max_round_trips"] = max(s["max_round_trips"], trace.round_trips)
+            s["mongo_ms"] += trace.mongo_ms
+            s["elapsed_ms"] += elapsed_ms
+            s["n_plus_one"] += int(n_plus_one)
+            s["over_budget"] += int(slow)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                route: {
+                    "requests": s["requests"],
+                    "round_trips_per_request": round(s["round_trips"] / s["requests"], 2),
+                    "max_round_trips": s["max_round_trips"],
+                    "mongo_ms_per_request": round(s["mongo_ms"] / s["requests"], 3),
+                    "ms_per_request": round(s["elapsed_ms"] / s["requests"], 3),
+                    "n_plus_one": s["n_plus_one"],
+                    "over_budget": s["over_budget"],
+                }
+                for route, s in sorted(self._routes.items())
+            }
+
+
+def _describe(trace: RequestTrace) -> str:
+    return "; ".join(
+        f"{q.command} {q.collection} {q.shape} {q.ms:.1f}ms {q.docs} doc(s){'' if q.ok else ' FAILED'}"
+        for q in trace.queries
+    )
+
+
+# ------------------------------
+# Flask hooks
+# ------------------------------
+def summarise(app, trace: RequestTrace, method: str, path: str) -> None:
+    """Log N+1 shapes and over-budget requests, and add the request to app.trace_stats."""
+    elapsed_ms = (time.perf_counter() - trace.started) * 1000
+    repeated = trace.repeated(app.config["TRACE_REPEAT_THRESHOLD"])
+    slow = (elapsed_ms > app.config["TRACE_SLOW_MS"]
+            or trace.round_trips > app.config["TRACE_MAX_ROUND_TRIPS"])
+    for command, collection, shape, times in repeated:
+        app.logger.warning(f"N+1 on {trace.endpoint}: {command} {collection} {shape} issued {times} times")
+    if slow:
+        app.logger.warning(
+            f"Over budget: {method} {path} ({trace.endpoint}) took {elapsed_ms:.1f}ms "
+            f"with {trace.round_trips} round trip(s): {_describe(trace)}"
+        )
+    app.trace_stats.record(trace, elapsed_ms, bool(repeated), slow)
+
+
+def init_app(app) -> None:
+    """
+    When TRACE_QUERIES is on, trace every request: warn about repeated query shapes and
+    about requests over TRACE_SLOW_MS or TRACE_MAX_ROUND_TRIPS. The trace is summarised
+    when the response is closed, so streamed views count the queries their body makes.
+    The optional Server-Timing header only goes on non-streamed responses, whose work is
+    done before the headers are sent.
+    """
+    from flask import request
+
+    app.trace_stats = RouteStats()
+    if not app.config["TRACE_QUERIES"]:
+        return
+
+    @app.before_request
+    def _trace_start():
+        request.environ["library.trace_token"] = _current.set(RequestTrace(request.endpoint or "unmatched"))
+
+    @app.after_request
+    def _trace_finish(response):
+        trace = _current.get()
+        if trace is None:
+            return response
+        if app.config["TRACE_SERVER_TIMING"] and not response.is_streamed:
+            response.headers.add(
+                "Server-Timing",
+                f'mongo;dur={trace.mongo_ms:.1f};desc="{trace.round_trips} round trips", '
+                f"app;dur={(time.perf_counter() - trace.started) * 1000:.1f}",
+            )
+        method, path = request.method, request.path
+        # Flask tears the request down before a streamed body is sent; keep the trace current
+        # until the server closes the response, so queries made by the body land in it
+        token = request.environ.pop("library.trace_token", None) if response.is_streamed else None
+
+        def finish():
+            if token is not None:
+                _reset(token)
+            summarise(app, trace, method, path)
+
+        response.call_on_close(finish)
+        return response
+
+    @app.teardown_request
+    def _trace_reset(exc):
+        token = request.environ.pop("library.trace_token", None)
+        if token is not None:
+            _reset(token)
+
+
+def _reset(token) -> None:
+    try:
+        _current.reset(token)
+    except ValueError:
+        _current.set(None)  # closed from a different context than the one that started it
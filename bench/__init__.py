@@ -0,0 +1,12 @@
+"""
+Load and benchmark suite for the library app (run from the repository root):
+
+    python -m bench --scale 10k --inmemory -o results.json
+
+--inmemory starts a throwaway mongod through pymongo_inmemory (bench/requirements.txt), which
+downloads a MongoDB build on first use; without it, pass --uri to a scratch mongod. A sample
+report showing the JSON layout is in bench/results/sample-10k.json.
+
+Importing the app connects it to whatever MONGODB_URI/MONGODB_DB say, so the app modules
+are only imported by `python -m bench` once it has pointed them at the benchmark database.
+"""
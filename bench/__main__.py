@@ -0,0 +1,99 @@
+import json
+import os
+import random
+import sys
+
+import click
+
+try:  # optional: a throwaway mongod for --inmemory (pip install -r bench/requirements.txt)
+    from pymongo_inmemory import Mongod
+except ImportError:  # pragma: no cover
+    Mongod = None
+
+NO_INMEMORY = (
+    "--inmemory needs the pymongo_inmemory package (pip install -r bench/requirements.txt); "
+    "or point --uri at a scratch mongod"
+)
+
+DEFAULT_SCENARIOS = "browse,details,login,loan_cycle,my_loans"
+
+
+@click.command()
+@click.option("--scale", type=click.Choice(["10k", "100k", "1m"]), default="10k", show_default=True,
+              help="Catalogue size (readers and loans scale with it).")
+@click.option("--seed", default=0, show_default=True, help="Data and scenario seed; same seed, same run.")
+@click.option("--uri", default=lambda: os.environ.get("MONGODB_URI", "mongodb://localhost:27017"),
+              help="mongod to run against (default: $MONGODB_URI or localhost).")
+@click.option("--db", "db_name", default="library_bench", show_default=True,
+              help="Database to (re)build; never the live one.")
+@click.option("--inmemory", is_flag=True, help="Start a throwaway mongod instead (needs pymongo_inmemory).")
+@click.option("--scenarios", default=DEFAULT_SCENARIOS, show_default=True)
+@click.option("--iterations", default=200, show_default=True, help="Runs of each scenario.")
+@click.option("--concurrency", default=4, show_default=True, help="Threads issuing requests.")
+@click.option("--warmup", default=5, show_default=True, help="Untimed runs of each scenario first.")
+@click.option("-o", "--output", type=click.File("w"), default="-", help="JSON report (default: stdout).")
+def main(scale, seed, uri, db_name, inmemory, scenarios, iterations, concurrency, warmup, output):
+    """Build a synthetic dataset, run the scripted scenarios and report latency as JSON."""
+    if db_name == "library_db":
+        raise click.BadParameter("refusing to overwrite the live database", param_hint="--db")
+    names = [s.strip() for s in scenarios.split(",") if s.strip()]
+
+    mongod = None
+    if inmemory:
+        if Mongod is None:
+            raise click.UsageError(NO_INMEMORY)
+        try:
+            # None: pymongo_inmemory's defaults (setup.cfg / PYMONGOIM__* env). The first run
+            # downloads a mongod build, so it needs network access or a pre-filled download folder.
+            mongod = Mongod(None)
+            mongod.start()
+        except OSError as e:
+            raise click.ClickException(f"could not start an in-memory mongod ({e}); use --uri instead")
+        uri = mongod.connection_string
+
+    # Point the app at the bench database before anything imports it
+    os.environ["MONGODB_URI"] = uri
+    os.environ["MONGODB_DB"] = db_name
+    os.environ.setdefault("INDEX_CHECK", "off")
+    os.environ["TRACE_QUERIES"] = "0"  # the runner traces each whole request itself, body included
+
+    from pymongo import monitoring
+    from Q2b.tracing import QueryTracer
+    monitoring.register(QueryTracer())  # global, so it covers the app's sync and async clients
+
+    from Q2b import app, db
+    from Q2b.cli import run_init
+    from .datagen import load
+    from .runner import environment, run_scenario
+    from .scenarios import SCENARIOS, Context
+
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise click.BadParameter(f"unknown scenario(s): {', '.join(unknown)}", param_hint="--scenarios")
+
+    try:
+        log = lambda msg: click.echo(msg, err=True)
+        dataset = load(db, scale, seed=seed, log=log)
+        run_init(app)  # indexes (and copy documents under INVENTORY_MODEL=copies)
+
+        ctx = Context(
+            db=db,
+            book_ids=[d["_id"] for d in db.books.find({}, {"_id": 1})],
+            readers=dataset["users"],
+            heavy_readers=max(1, dataset["users"] // 100),
+            rng=random.Random(seed),
+        )
+        report = {"environment": environment(app, dataset), "scenarios": {}}
+        for name in names:
+            log(f"running {name} x{iterations} on {concurrency} thread(s)")
+            report["scenarios"][name] = run_scenario(app, ctx, name, iterations=iterations,
+                                                     concurrency=concurrency, warmup=warmup)
+        json.dump(report, output, indent=2)
+        output.write("\n")
+    finally:
+        if mongod is not None:
+            mongod.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
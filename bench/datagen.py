@@ -0,0 +1,157 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from bson import ObjectId
+
+from Q2b.books import all_books
+from Q2b.importer import CATEGORIES
+from Q2b.models import Book, Loan
+from Q2b import passwords
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BENCH_PASSWORD = "bench-12345"
+BATCH = 5_000
+META = "bench_meta"
+
+# Word pools for titles/authors; everything else is copied from the all_books templates
+_ADJECTIVES = ("Silent", "Crimson", "Hidden", "Last", "Broken", "Golden", "Winter", "Hollow",
+               "Secret", "Burning", "Lost", "Midnight", "Glass", "Wild", "Iron", "Paper")
+_NOUNS = ("Kingdom", "River", "Garden", "Library", "Crown", "Forest", "Letters", "Tide",
+          "Orchard", "Harbour", "Atlas", "Lantern", "Circus", "Archive", "Sparrow", "Engine")
+_FIRST = ("Alice", "Ben", "Chen", "Dara", "Elif", "Farah", "Goh", "Hana", "Ivan", "Jun",
+          "Kiran", "Lena", "Mei", "Nora", "Omar", "Priya", "Quinn", "Ravi", "Siti", "Tom")
+_LAST = ("Tan", "Lim", "Ng", "Kuang", "Okafor", "Silva", "Novak", "Haddad", "Ito", "Kaur",
+         "Murphy", "Santos", "Weber", "Yusof", "Park", "Reyes", "Ahmed", "Ong", "Costa", "Levi")
+
+
+# ------------------------------
+# Catalogue
+# ------------------------------
+def generate_books(n: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    n titles shaped like all_books: each one borrows genres, description and url from a
+    template title, gets a generated title/author pair (unique, so dedupe_key holds) and a
+    category. Copies are skewed: most titles have one or two, a few popular ones have up to 8.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        t = all_books[i % len(all_books)]
+        copies = min(8, 1 + int(rng.expovariate(0.9)))
+        raw = {
+            "genres": t["genres"],
+            "title": f"The {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)} {i:07d}",
+            "category": rng.choice(CATEGORIES),
+            "url": t["url"],
+            "description": t["description"],
+            "authors": [f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"],
+            "pages": rng.randint(80, 900),
+            "available": copies,
+            "copies": copies,
+        }
+        yield Book.normalize(raw)
+
+
+# ------------------------------
+# Readers and loan histories
+# ------------------------------
+def generate_users(n: int, pw_hash: str) -> Iterator[Dict[str, Any]]:
+    """bench0000000@lib.test ...; one shared hash, since hashing is what login measures."""
+    for i in range(n):
+        yield {"email": bench_email(i), "name": f"Bench Reader {i}", "role": "user", "pw_hash": pw_hash}
+
+
+def bench_email(i: int) -> str:
+    return f"bench{i:07d}@lib.test"
+
+
+def generate_loans(user_ids: List[ObjectId], book_ids: List[ObjectId], available: List[int], seed: int = 0,
+                   heavy_share: float = 0.01, now: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Loan histories: most readers have a handful of returned loans, the heaviest 1% have
+    hundreds, and a third of all picks go to a Pareto-shaped set of popular titles. Up to
+    three recent loans per reader stay active; each takes a copy out of `available`
+    (updated in place, parallel to book_ids).
+    """
+    rng = random.Random(seed + 1)
+    now = now or datetime.utcnow()
+    heavy = max(1, int(len(user_ids) * heavy_share))
+    last = len(book_ids) - 1
+    for idx, uid in enumerate(user_ids):
+        count = rng.randint(200, 600) if idx < heavy else int(rng.expovariate(1 / 6))
+        active_left = 3
+        seen = set()
+        for _ in range(count):
+            b = min(last, int(rng.paretovariate(1.2)) - 1) if rng.random() < 0.3 else rng.randint(0, last)
+            if b in seen:
+                continue
+            seen.add(b)
+            borrowed = now - timedelta(days=rng.randint(1, 3 * 365), minutes=rng.randint(0, 1440))
+            active = active_left > 0 and available[b] > 0 and borrowed > now - timedelta(days=30)
+            loan = Loan(user_id=uid, book_id=book_ids[b], borrow_date=borrowed,
+                        renew_count=rng.choice((0, 0, 0, 1, 2)) if active else 0)
+            if active:
+                active_left -= 1
+                available[b] -= 1
+            else:
+                loan.return_date = borrowed + timedelta(days=rng.randint(3, 28))
+            yield loan.to_doc()
+
+
+# ------------------------------
+# Loading
+# ------------------------------
+def _batched(items, size: int = BATCH):
+    buf = []
+    for item in items:
+        buf.append(item)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def load(db, scale: str, *, seed: int = 0, users: Optional[int] = None,
+         log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    (Re)build the benchmark dataset in `db` unless it already holds this scale and seed.
+    Never point this at the live database: books, users, loans, copies and holds are dropped.
+    """
+    n_books = SCALES[scale]
+    n_users = users or max(200, n_books // 50)
+    wanted = {"_id": "dataset", "scale": scale, "seed": seed, "users": n_users}
+    if db[META].find_one({"_id": "dataset"}) == wanted:
+        log(f"dataset {scale}/seed {seed} already loaded")
+        return wanted
+
+    for name in ("books", "users", "loans", "copies", "holds", META):
+        db.drop_collection(name)
+
+    # Draw the loans against (ids, availability) first, then regenerate the same titles
+    # (the generator is seeded) with their final availability, so 1M books never sit in memory.
+    book_ids = [ObjectId() for _ in range(n_books)]
+    available = [doc["copies"] for doc in generate_books(n_books, seed)]
+
+    pw_hash = passwords.hasher.hash(BENCH_PASSWORD)
+    user_ids = []
+    for batch in _batched(generate_users(n_users, pw_hash)):
+        user_ids.extend(db.users.insert_many(batch, ordered=False).inserted_ids)
+
+    loans = 0
+    for batch in _batched(generate_loans(user_ids, book_ids, available, seed)):
+        db.loans.insert_many(batch, ordered=False)
+        loans += len(batch)
+
+    def final_books():
+        for i, doc in enumerate(generate_books(n_books, seed)):
+            doc["_id"] = book_ids[i]
+            doc["available"] = available[i]
+            yield doc
+
+    for batch in _batched(final_books()):
+        db.books.insert_many(batch, ordered=False)
+    log(f"loaded {n_books:,} titles, {n_users:,} readers, {loans:,} loans")
+
+    db[META].insert_one(wanted)
+    return wanted
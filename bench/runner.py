@@ -0,0 +1,138 @@
+import os
+import platform
+import subprocess
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from Q2b import tracing
+from .scenarios import SCENARIOS, Context, Step
+
+
+# ------------------------------
+# Samples and summaries
+# ------------------------------
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))  # ceil without floats drifting
+    return sorted_values[int(rank) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self._samples: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, ms: float, round_trips: int, mongo_ms: float, status: int, ok: bool) -> None:
+        with self._lock:
+            self._samples.setdefault(name, []).append((ms, round_trips, mongo_ms, status, ok))
+
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        out = {}
+        with self._lock:
+            items = sorted(self._samples.items())
+        for name, samples in items:
+            ms = sorted(s[0] for s in samples)
+            trips = [s[1] for s in samples]
+            statuses: Dict[str, int] = {}
+            for s in samples:
+                statuses[str(s[3])] = statuses.get(str(s[3]), 0) + 1
+            out[name] = {
+                "requests": len(samples),
+                "errors": sum(1 for s in samples if not s[4]),
+                "statuses": statuses,
+                "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+                "latency_ms": {
+                    "mean": round(sum(ms) / len(ms), 3),
+                    "p50": round(percentile(ms, 50), 3),
+                    "p95": round(percentile(ms, 95), 3),
+                    "p99": round(percentile(ms, 99), 3),
+                    "max": round(ms[-1], 3),
+                },
+                "round_trips": {
+                    "mean": round(sum(trips) / len(trips), 2),
+                    "max": max(trips),
+                },
+                "mongo_ms_mean": round(sum(s[2] for s in samples) / len(samples), 3),
+            }
+        return out
+
+
+# ------------------------------
+# Running
+# ------------------------------
+def _run_steps(client, steps: List[Step], recorder: Optional[Recorder]) -> None:
+    body = b""
+    for step in steps:
+        path = step.path(body) if callable(step.path) else step.path
+        if path is None:
+            continue
+        with tracing.traced(step.name) as trace:
+            started = time.perf_counter()
+            rv = client.open(path, method=step.method, data=step.data)
+            body = rv.get_data()  # streamed pages are timed (and traced) to the last byte
+            elapsed = (time.perf_counter() - started) * 1000
+        if recorder is not None:
+            recorder.add(step.name, elapsed, trace.round_trips, trace.mongo_ms, rv.status_code,
+                         rv.status_code in step.expect)
+
+
+def run_scenario(app, ctx: Context, name: str, *, iterations: int, concurrency: int,
+                 warmup: int = 5) -> Dict[str, Any]:
+    """Run one scenario `iterations` times over `concurrency` threads; each iteration has a fresh session."""
+    scenario = SCENARIOS[name]
+    for _ in range(warmup):
+        client = app.test_client()
+        _run_steps(client, scenario(client, ctx), None)
+
+    recorder = Recorder()
+    remaining = [iterations]
+    lock = threading.Lock()
+    failures: List[BaseException] = []
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0 or failures:
+                    return
+                remaining[0] -= 1
+            try:
+                client = app.test_client()
+                _run_steps(client, scenario(client, ctx), recorder)
+            except BaseException as e:  # surfaced after the threads stop
+                failures.append(e)
+                return
+
+    threads = [threading.Thread(target=worker, name=f"bench-{name}-{i}") for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    if failures:
+        raise failures[0]
+    return {"iterations": iterations, "concurrency": concurrency, "wall_seconds": round(wall, 3),
+            "steps": recorder.summary(wall)}
+
+
+def environment(app, dataset: Dict[str, Any]) -> Dict[str, Any]:
+    """What a result depends on, so two JSON reports can be compared fairly."""
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    return {
+        "started": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "dataset": {k: v for k, v in dataset.items() if k != "_id"},
+        "config": {k: app.config[k] for k in ("INVENTORY_MODEL", "BOOKS_PER_PAGE", "LOANS_PER_PAGE",
+                                              "PASSWORD_HASH_METHOD", "PASSWORD_POOL_WORKERS")},
+    }
@@ -0,0 +1,125 @@
+import html
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from bson import ObjectId
+
+from Q2b.importer import CATEGORIES
+from .datagen import BENCH_PASSWORD, bench_email
+
+_NEXT_LINK = re.compile(rb'href="(/\?[^"]*after=[^"]+)"')
+
+
+@dataclass
+class Step:
+    """
+    One timed request. `path` may be a function of the previous step's response body that
+    is resolved just before the request (returning None skips the step).
+    """
+    name: str
+    method: str
+    path: Union[str, Callable[[bytes], Optional[str]]]
+    data: Optional[Dict[str, str]] = None
+    expect: Tuple[int, ...] = (200,)
+
+
+@dataclass
+class Context:
+    """What the scenarios draw from; filled once from the loaded dataset."""
+    db: object
+    book_ids: List[ObjectId]
+    readers: int
+    heavy_readers: int
+    rng: random.Random = field(default_factory=random.Random)
+
+    def random_book(self) -> str:
+        return str(self.rng.choice(self.book_ids))
+
+    def random_reader(self) -> str:
+        return bench_email(self.rng.randrange(self.heavy_readers, self.readers))
+
+    def heavy_reader(self) -> str:
+        return bench_email(self.rng.randrange(self.heavy_readers))
+
+    def user_id(self, email: str) -> ObjectId:
+        return self.db.users.find_one({"email": email}, {"_id": 1})["_id"]
+
+
+def login(client, email: str, attempts: int = 50) -> None:
+    """Untimed setup: give the test client a session cookie (waiting out a busy hasher pool)."""
+    for _ in range(attempts):
+        rv = client.post("/auth/login", data={"email": email, "password": BENCH_PASSWORD})
+        if rv.status_code != 503:
+            break
+        time.sleep(0.05)
+    if rv.status_code != 302 or "/auth/login" in rv.headers.get("Location", ""):
+        raise RuntimeError(f"could not log in as {email}")
+
+
+# ------------------------------
+# Scenarios
+# ------------------------------
+# Each scenario gets a fresh test client and the context, does its untimed setup and
+# returns the steps to time, in order.
+
+def browse(client, ctx: Context) -> List[Step]:
+    """Anonymous catalogue browsing by category: first page, then the next one."""
+    category = ctx.rng.choice(("All",) + CATEGORIES)
+
+    def next_page(body: bytes) -> Optional[str]:
+        m = _NEXT_LINK.search(body)
+        return html.unescape(m.group(1).decode()) if m else None
+
+    return [Step("browse", "GET", f"/?category={category}"), Step("browse_next", "GET", next_page)]
+
+
+def details(client, ctx: Context) -> List[Step]:
+    return [Step("details", "GET", f"/books/{ctx.random_book()}")]
+
+
+def login_flow(client, ctx: Context) -> List[Step]:
+    """Password check included: this is the cost of the configured hash method."""
+    data = {"email": ctx.random_reader(), "password": BENCH_PASSWORD}
+    return [Step("login", "POST", "/auth/login", data, (302,))]
+
+
+def loan_cycle(client, ctx: Context) -> List[Step]:
+    """make_loan, renew_loan, return_loan on a title with a free copy, as an ordinary reader."""
+    email = ctx.random_reader()
+    login(client, email)
+    uid = ctx.user_id(email)
+    doc = ctx.db.books.find_one({"_id": {"$in": ctx.rng.sample(ctx.book_ids, 20)}, "available": {"$gt": 0}},
+                                {"_id": 1})
+    if doc is None:
+        return []
+    book_id = doc["_id"]
+
+    def loan_path(action: str) -> Callable[[bytes], Optional[str]]:
+        def resolve(_body: bytes) -> Optional[str]:
+            loan = ctx.db.loans.find_one({"user_id": uid, "book_id": book_id, "return_date": None}, {"_id": 1})
+            return f"/loans/{loan['_id']}/{action}" if loan else None
+        return resolve
+
+    return [
+        Step("make_loan", "POST", f"/loans/create/{book_id}", {}, (302,)),
+        Step("renew_loan", "POST", loan_path("renew"), {}, (302,)),
+        Step("return_loan", "POST", loan_path("return"), {}, (302,)),
+    ]
+
+
+def my_loans(client, ctx: Context) -> List[Step]:
+    """The loans page of a reader with hundreds of loans."""
+    login(client, ctx.heavy_reader())
+    return [Step("my_loans", "GET", "/loans")]
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "browse": browse,
+    "details": details,
+    "login": login_flow,
+    "loan_cycle": loan_cycle,
+    "my_loans": my_loans,
+}
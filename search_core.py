@@ -0,0 +1,199 @@
+"""
+BM25F full-text search over the catalogue, shared by both apps. Each app's search.py is a
+thin adapter that feeds it that app's books. Q2b finds it because the repository root is
+the parent of its package; Q2a's start.sh adds the root to PYTHONPATH.
+"""
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import snowballstemmer
+    _stemmer = snowballstemmer.stemmer("english")
+    stem = _stemmer.stemWord
+except ImportError:
+    _SUFFIXES = ("ational", "ization", "fulness", "ousness", "iveness", "ations", "ments",
+                 "ingly", "ation", "ness", "ment", "ing", "ies", "ied", "ed", "ly", "es", "s")
+
+    def stem(word: str) -> str:
+        # Light suffix stripper, good enough when snowballstemmer isn't installed
+        for suf in _SUFFIXES:
+            if word.endswith(suf) and len(word) - len(suf) >= 3:
+                return word[: -len(suf)] + ("y" if suf in ("ies", "ied") else "")
+        return word
+
+
+# ------------------------------
+# Tokenizer
+# ------------------------------
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in into is it its of on or our
+she so that the their them they this to was we were what when which who will with you your
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(w) for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+# Field weights: a hit in the title or author outranks one buried in a paragraph
+FIELDS = ("title", "authors", "genres", "description")
+FIELD_WEIGHTS = {"title": 3.0, "authors": 2.5, "genres": 1.5, "description": 1.0}
+
+
+def _field_text(doc: Dict[str, Any], name: str) -> str:
+    value = doc.get(name) or ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value)
+
+
+# ------------------------------
+# BM25F inverted index
+# ------------------------------
+class SearchIndex:
+    """
+    In-memory inverted index over the catalogue, ranked with BM25F.
+    Keys are whatever identifies a book to the caller (str(_id) in Q2b, the int id in Q2a).
+    """
+
+    VERSION = 1
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.fingerprint: Any = None
+        # term -> {key: [tf per field]}
+        self._postings: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+        # key -> [length per field]
+        self._lengths: Dict[str, List[int]] = {}
+        self._total_lengths = [0] * len(FIELDS)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    # --- Build / update ---
+    def add_document(self, key, doc: Dict[str, Any]) -> None:
+        key = str(key)
+        with self._lock:
+            if key in self._lengths:
+                self.remove_document(key)
+            lengths = [0] * len(FIELDS)
+            for i, name in enumerate(FIELDS):
+                terms = tokenize(_field_text(doc, name))
+                lengths[i] = len(terms)
+                for t in terms:
+                    tfs = self._postings[t].get(key)
+                    if tfs is None:
+                        tfs = self._postings[t][key] = [0] * len(FIELDS)
+                    tfs[i] += 1
+            self._lengths[key] = lengths
+            self._total_lengths = [a + b for a, b in zip(self._total_lengths, lengths)]
+
+    def remove_document(self, key) -> None:
+        key = str(key)
+        with self._lock:
+            lengths = self._lengths.pop(key, None)
+            if lengths is None:
+                return
+            self._total_lengths = [a - b for a, b in zip(self._total_lengths, lengths)]
+            for t in list(self._postings):
+                postings = self._postings[t]
+                if postings.pop(key, None) is not None and not postings:
+                    del self._postings[t]
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[Any, Dict[str, Any]]], fingerprint: Any = None) -> "SearchIndex":
+        index = cls()
+        for key, doc in docs:
+            index.add_document(key, doc)
+        index.fingerprint = fingerprint
+        return index
+
+    # --- Query ---
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """Return up to `limit` (key, score) pairs, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            n = len(self._lengths)
+            if n == 0:
+                return []
+            avg = [(t / n) or 1.0 for t in self._total_lengths]
+            weights = [FIELD_WEIGHTS[f] for f in FIELDS]
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for key, tfs in postings.items():
+                    lengths = self._lengths[key]
+                    tf = 0.0
+                    for i, f_tf in enumerate(tfs):
+                        if f_tf:
+                            norm = 1 - self.b + self.b * lengths[i] / avg[i]
+                            tf += weights[i] * f_tf / norm
+                    scores[key] += idf * tf / (self.k1 + tf)
+        return heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+
+    # --- Persistence ---
+    def save(self, path: str) -> None:
+        """Write atomically so a crashed save never leaves a half-written index behind."""
+        with self._lock:
+            payload = {
+                "version": self.VERSION,
+                "fingerprint": self.fingerprint,
+                "k1": self.k1,
+                "b": self.b,
+                "lengths": self._lengths,
+                "postings": self._postings,
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(payload, fh, separators=(",", ":"))
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["SearchIndex"]:
+        try:
+            with open(path, encoding="utf-8") as fh:
+                payload = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if payload.get("version") != cls.VERSION:
+            return None
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.fingerprint = payload.get("fingerprint")
+        index._lengths = payload["lengths"]
+        index._postings = defaultdict(dict, payload["postings"])
+        totals = [0] * len(FIELDS)
+        for lengths in index._lengths.values():
+            totals = [a + b for a, b in zip(totals, lengths)]
+        index._total_lengths = totals
+        return index
+
+    @classmethod
+    def load_or_build(cls, path: str, fingerprint: Any,
+                      loader: Callable[[], Iterable[Tuple[Any, Dict[str, Any]]]]) -> "SearchIndex":
+        """Reuse the on-disk index when it matches the current data, otherwise rebuild and save it."""
+        index = cls.load(path)
+        if index is not None and index.fingerprint == fingerprint:
+            return index
+        index = cls.build(loader(), fingerprint=fingerprint)
+        try:
+            index.save(path)
+        except OSError:
+            pass
+        return index
@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+import pytest
+
+# Q2b configures itself from the environment at import time, so this has to run before any
+# test module imports it: the app runs on a throwaway SQLite file, with no mongod needed
+# (Mongo clients connect lazily and the Mongo-backed tests below use mongomock).
+_scratch = tempfile.mkdtemp(prefix="library-tests-")
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(_scratch, "library.sqlite3"))
+os.environ.setdefault("SEARCH_INDEX_PATH", os.path.join(_scratch, "search_index.json"))
+os.environ.setdefault("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+os.environ.setdefault("PASSWORD_POOL_WORKERS", "0")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from Q2b import app as flask_app
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    flask_app.repos.books.seed()
+    flask_app.repos.users.seed()
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def reader(client):
+    """A test client logged in as the seeded reader (poh@lib.sg)."""
+    client.post("/auth/login", data={"email": "poh@lib.sg", "password": "12345"})
+    return client
+
+
+@pytest.fixture
+def admin(client):
+    """A test client logged in as the seeded admin (admin@lib.sg)."""
+    client.post("/auth/login", data={"email": "admin@lib.sg", "password": "12345"})
+    return client
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """A fresh in-memory Mongo database for the model-level tests."""
+    mongomock = pytest.importorskip("mongomock")
+    # pymongo >= 4.11 hands UpdateOne's sort= to the bulk builder, which mongomock 4.3 predates
+    builder = mongomock.collection.BulkOperationBuilder
+    add_update, add_replace = builder.add_update, builder.add_replace
+    monkeypatch.setattr(builder, "add_update", lambda self, *a, sort=None, **kw: add_update(self, *a, **kw))
+    monkeypatch.setattr(builder, "add_replace", lambda self, *a, sort=None, **kw: add_replace(self, *a, **kw))
+    return mongomock.MongoClient()["library_test"]
+
+
+@pytest.fixture
+def api_client():
+    """Factory: a test client for just the JSON API, over the given (mongomock) collection."""
+    from flask import Flask
+    from Q2b.blueprints.api import bp as api_bp
+
+    def make(books_col, inventory=None):
+        api = Flask(__name__)
+        api.config.update(BOOKS_PER_PAGE=20, API_MAX_LIMIT=100)
+        api.raw_books_col = books_col
+        api.inventory = inventory
+        api.register_blueprint(api_bp)
+        return api.test_client()
+    return make
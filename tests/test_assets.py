@@ -0,0 +1,75 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask
+
+from Q2b import assets
+from Q2b.blueprints.assets import bp as assets_bp
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A bare app over a scratch static/ folder holding one stylesheet and the font it uses."""
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "fonts").mkdir()
+    (static / "fonts" / "face.woff2").write_bytes(b"font bytes")
+    (static / "css" / "site.css").write_text("body { color: red; }\n" * 50
+                                             + "@font-face { src: url('../fonts/face.woff2'); }\n")
+    app = Flask(__name__, static_folder=str(static))
+    app.register_blueprint(assets_bp)
+    app.asset_manifest = {}
+    return app
+
+
+def test_build_fingerprints_and_rewrites_css(site):
+    manifest = assets.build(site.static_folder, log=lambda _: None)
+    assert manifest == assets.load_manifest(site)
+    css, font = manifest["css/site.css"], manifest["fonts/face.woff2"]
+    assert css.startswith("css/site.") and font.startswith("fonts/face.")
+    built = os.path.join(site.static_folder, assets.DIST, *css.split("/"))
+    with open(built, encoding="utf-8") as fh:
+        assert f"url(../{font})" in fh.read()
+    assert os.path.exists(built + ".gz")
+    assert not os.path.exists(os.path.join(site.static_folder, assets.DIST, *font.split("/")) + ".gz")
+
+
+def test_asset_url_falls_back_before_the_build(site):
+    with site.test_request_context():
+        assert assets.asset_url("css/site.css") == "/static/css/site.css"
+        vendored = "vendor/bootstrap/bootstrap.min.css"
+        assert assets.asset_url(vendored) == assets.VENDOR[vendored]  # not fetched yet: the CDN
+        site.asset_manifest = assets.build(site.static_folder, log=lambda _: None)
+        assert assets.asset_url("css/site.css") == f"/assets/{site.asset_manifest['css/site.css']}"
+
+
+def test_assets_are_immutable_and_precompressed(site):
+    manifest = assets.build(site.static_folder, log=lambda _: None)
+    client = site.test_client()
+    url = f"/assets/{manifest['css/site.css']}"
+
+    plain = client.get(url)
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert "immutable" in plain.headers["Cache-Control"]
+    assert f"max-age={365 * 24 * 60 * 60}" in plain.headers["Cache-Control"]
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    packed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert packed.mimetype == "text/css"
+    assert gzip.decompress(packed.data) == plain.data
+
+    if assets.brotli is not None:
+        best = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+        assert best.headers["Content-Encoding"] == "br"
+        assert assets.brotli.decompress(best.data) == plain.data
+
+
+def test_manifest_and_missing_files_are_not_served(site):
+    assets.build(site.static_folder, log=lambda _: None)
+    client = site.test_client()
+    assert client.get(f"/assets/{assets.MANIFEST}").status_code == 404
+    assert client.get("/assets/css/nope.css").status_code == 404
+    assert client.get("/assets/../css/site.css").status_code == 404
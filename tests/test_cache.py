@@ -0,0 +1,80 @@
+from bson import ObjectId
+
+from Q2b.blueprints.catalogue import book_view, with_card_html
+from Q2b.cache import CardCache, TTLCache
+from Q2b.models import Book
+
+
+def test_card_is_rendered_once_per_revision():
+    cache = CardCache(maxsize=8)
+    book_id, made = ObjectId(), []
+
+    def make():
+        made.append(1)
+        return f"card {len(made)}"
+
+    assert cache.render(book_id, 0, make) == "card 1"
+    assert cache.render(str(book_id), 0, make) == "card 1"  # ObjectId or its string: one key
+    assert cache.render(book_id, 1, make) == "card 2"
+    assert cache.stats() == {"size": 2, "maxsize": 8, "hits": 1, "misses": 2, "evictions": 0, "hit_ratio": 0.3333}
+
+
+def test_cards_are_evicted_least_recently_used_first():
+    cache = CardCache(maxsize=2)
+    a, b, c = ObjectId(), ObjectId(), ObjectId()
+    for oid in (a, b):
+        cache.render(oid, 0, lambda: "x")
+    cache.render(a, 0, lambda: "x")  # a is now the most recent
+    cache.render(c, 0, lambda: "x")
+    assert cache.get((str(b), 0)) is None
+    assert cache.get((str(a), 0)) == "x"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_changed_content_shows_on_the_card(app, monkeypatch):
+    monkeypatch.setattr(app, "card_cache", CardCache(maxsize=8))
+    doc = Book.normalize({"title": "Covered", "authors": ["A. Writer"], "available": 1, "copies": 1})
+    doc["_id"] = ObjectId()
+    with app.test_request_context():
+        before = with_card_html(book_view(Book.from_doc(doc)))["card_html"]
+        # a content write bumps rev with it, as CoverStore.ingest does
+        changed = Book.from_doc({**doc, "url": "https://covers.example/new.jpg", "rev": 1})
+        after = with_card_html(book_view(changed))["card_html"]
+        stale = with_card_html(book_view(Book.from_doc({**doc, "title": "Renamed"})))["card_html"]
+    assert "new.jpg" in after and "new.jpg" not in before
+    assert stale == before  # same rev, same card: only rev-bumping writes reach the cache
+    assert app.card_cache.stats()["misses"] == 2
+
+
+def test_ttl_entries_expire(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("Q2b.cache.time.monotonic", lambda: clock[0])
+    cache = TTLCache(maxsize=8, ttl=60)
+    cache.set("u1", "Peter")
+    clock[0] += 59
+    assert cache.get("u1") == "Peter"
+    clock[0] += 1
+    assert cache.get("u1") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_ttl_cache_stays_bounded():
+    cache = TTLCache(maxsize=2, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == ("B", "C")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_signed_in_requests_reuse_the_cached_user(app, reader, monkeypatch):
+    monkeypatch.setattr(app, "user_cache", TTLCache(maxsize=8, ttl=60))
+    lookups = []
+    get = app.repos.users.get
+    monkeypatch.setattr(app.repos.users, "get", lambda user_id: lookups.append(user_id) or get(user_id))
+    for _ in range(3):
+        assert reader.get("/loans").status_code == 200
+    assert len(lookups) == 1
+    assert app.user_cache.stats()["hits"] == 2
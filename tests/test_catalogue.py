@@ -0,0 +1,69 @@
+import importlib.util
+import threading
+from pathlib import Path
+
+import pytest
+
+# Q2a is a flat app folder, not a package: load its catalogue module by path
+_spec = importlib.util.spec_from_file_location("q2a_catalogue", Path(__file__).parent.parent / "Q2a" / "catalogue.py")
+catalogue = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(catalogue)
+
+BOOKS = [
+    {"title": "Zebra Days", "category": "Children", "authors": ["Z. Writer"], "genres": ["Animals"],
+     "description": ["First.", "", "Middle.", "Last."]},
+    {"title": "Apple Tree", "category": "Adult", "authors": ["A. Writer"], "description": ["Only."]},
+]
+
+
+def test_records_are_read_only():
+    record = catalogue.BookRecord(1, BOOKS[0])
+    with pytest.raises(AttributeError):
+        record.title = "Renamed"
+    with pytest.raises(AttributeError):
+        record.extra = 1
+    assert record.authors == ("Z. Writer",)
+    assert (record.first_para, record.last_para) == ("First.", "Last.")
+    assert record.get("title") == "Zebra Days" and record.get("missing", "-") == "-"
+
+
+def test_records_do_not_share_the_source_lists():
+    raw = {"title": "Shared", "authors": ["A"]}
+    record = catalogue.BookRecord(1, raw)
+    raw["authors"].append("B")
+    assert record.authors == ("A",)
+
+
+def test_catalogue_sorts_once_per_category():
+    store = catalogue.Catalogue(BOOKS)
+    assert [r.title for r in store.titles()] == ["Apple Tree", "Zebra Days"]
+    assert [r.title for r in store.titles("Children")] == ["Zebra Days"]
+    assert store.titles("Teens") == () and store.titles("Unknown") == ()
+    assert store.get(2).title == "Apple Tree" and len(store) == 2
+
+
+def test_load_publishes_a_new_catalogue_without_touching_the_old():
+    before = catalogue.load(BOOKS[:1])
+    held = catalogue.current()
+    after = catalogue.load(BOOKS)
+    assert catalogue.current() is after is not before
+    assert len(held) == 1  # a request still holding the old catalogue sees it unchanged
+
+
+def test_readers_always_see_a_whole_catalogue():
+    small, big = BOOKS[:1], BOOKS
+    catalogue.load(small)
+    seen, stop = set(), threading.Event()
+
+    def read():
+        while not stop.is_set():
+            store = catalogue.current()
+            seen.add((len(store), len(store.titles())))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for n in range(200):
+        catalogue.load(big if n % 2 else small)
+    stop.set()
+    reader.join()
+    assert seen <= {(1, 1), (2, 2)}
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from Q2b.migrations import clear_returned_overdue
+from Q2b.models import Book, Loan
+
+WHEN = datetime(2025, 3, 1)
+
+
+def add_books(books_col, *available):
+    ids = []
+    for i, n in enumerate(available):
+        doc = Book.normalize({"title": f"Title {i}", "authors": [f"Author {i}"], "category": "Adult",
+                              "available": n, "copies": max(n, 1)})
+        ids.append(books_col.insert_one(doc).inserted_id)
+    return ids
+
+
+def test_create_many_takes_one_copy_per_title(mongo_db):
+    books, loans = mongo_db["books"], mongo_db["loans"]
+    a, b, empty = add_books(books, 2, 1, 0)
+    user = ObjectId()
+
+    results = Loan.create_many(loans, books, user_id=user, book_ids=[a, b, empty, a], when=WHEN)
+
+    assert [(r.book_id, r.ok) for r in results] == [(a, True), (b, True), (empty, False)]
+    assert results[2].error == "No available copies for this title."
+    assert books.find_one({"_id": a})["available"] == 1
+    assert books.find_one({"_id": b})["available"] == 0
+    assert loans.count_documents({"user_id": user, "return_date": None}) == 2
+    assert books.count_documents({"checkout_batches": {"$exists": True, "$ne": []}}) == 0
+
+
+def test_create_many_refuses_a_second_active_loan(mongo_db):
+    books, loans = mongo_db["books"], mongo_db["loans"]
+    (a,) = add_books(books, 3)
+    user = ObjectId()
+    Loan.create_many(loans, books, user_id=user, book_ids=[a], when=WHEN)
+
+    (again,) = Loan.create_many(loans, books, user_id=user, book_ids=[a], when=WHEN)
+
+    assert not again.ok
+    assert again.error == "User already has an active loan for this title."
+    assert books.find_one({"_id": a})["available"] == 2
+
+
+def test_return_many_restocks_and_clears_the_token(mongo_db):
+    books, loans = mongo_db["books"], mongo_db["loans"]
+    a, b, c = add_books(books, 1, 1, 1)
+    user, other = ObjectId(), ObjectId()
+    Loan.create_many(loans, books, user_id=user, book_ids=[a, b], when=WHEN)
+    Loan.create_many(loans, books, user_id=other, book_ids=[c], when=WHEN)
+
+    results = Loan.return_many(loans, books, user_id=user, book_ids=[a, b, c], when=WHEN)
+
+    assert [r.ok for r in results] == [True, True, False]
+    assert results[2].error == "No active loan for this title."
+    assert [books.find_one({"_id": bid})["available"] for bid in (a, b, c)] == [1, 1, 0]
+    assert loans.count_documents({"user_id": user, "return_date": WHEN}) == 2
+    assert loans.count_documents({"return_batch": {"$exists": True}}) == 0
+    assert loans.count_documents({"user_id": other, "return_date": None}) == 1
+
+
+def test_returns_clear_the_overdue_flag(mongo_db):
+    books, loans = mongo_db["books"], mongo_db["loans"]
+    a, b = add_books(books, 1, 1)
+    user = ObjectId()
+    single = Loan.create(loans, books, user_id=user, book_id=a, when=WHEN)
+    Loan.create_many(loans, books, user_id=user, book_ids=[b], when=WHEN)
+    loans.update_many({"user_id": user}, {"$set": {"overdue": True}})  # what mark_overdue sets
+
+    Loan.return_loan(loans, books, loan_id=single._id, when=WHEN + timedelta(days=61))
+    Loan.return_many(loans, books, user_id=user, book_ids=[b], when=WHEN + timedelta(days=61))
+
+    assert loans.count_documents({"overdue": True}) == 0
+    assert not Loan.find_by_id(loans, single._id).overdue
+
+
+def test_migration_clears_overdue_on_returned_loans_only(mongo_db):
+    loans = mongo_db["loans"]
+    loans.insert_many([
+        {"user_id": ObjectId(), "book_id": ObjectId(), "borrow_date": WHEN, "return_date": WHEN, "overdue": True},
+        {"user_id": ObjectId(), "book_id": ObjectId(), "borrow_date": WHEN, "return_date": None, "overdue": True},
+    ])
+    assert clear_returned_overdue(mongo_db, batch_size=1, log=lambda msg: None) == 1
+    assert loans.count_documents({"overdue": True, "return_date": None}) == 1
+    assert loans.count_documents({"overdue": True}) == 1
+    assert clear_returned_overdue(mongo_db, log=lambda msg: None) == 0  # checkpointed as done
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from flask import Flask
+
+from Q2b.cli import run_init
+
+
+def test_run_init_times_each_step_on_sqlite(app):
+    result = run_init(app)
+    assert result["inserted_books"] == 0  # the app fixture has already seeded
+    assert set(result["timings"]) == {"books", "users"}
+    assert all(secs >= 0 for secs in result["timings"].values())
+
+
+def test_run_init_times_each_step_on_mongo(mongo_db):
+    flask_app = Flask(__name__)
+    flask_app.config["INDEX_CHECK"] = "off"
+    mongo_app = SimpleNamespace(
+        repos=SimpleNamespace(backend="mongo"), config=flask_app.config, logger=flask_app.logger,
+        db=mongo_db, books_col=mongo_db["books"], users_col=mongo_db["users"], inventory=None,
+    )
+    first = run_init(mongo_app)
+    assert first["inserted_books"] > 0
+    assert list(first["timings"]) == ["indexes", "books", "users"]
+    assert mongo_db["users"].count_documents({}) == 2
+    assert run_init(mongo_app)["inserted_books"] == 0  # safe to re-run
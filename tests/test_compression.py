@@ -0,0 +1,43 @@
+import gzip
+
+from werkzeug.test import Client
+from werkzeug.wrappers import Request, Response
+
+from Q2b.compression import CompressionMiddleware
+
+BODY = b"<p>" + b"catalogue " * 200 + b"</p>"
+
+
+@Request.application
+def etagged(request):
+    response = Response(BODY, mimetype="text/html")
+    response.set_etag("v1")
+    return response.make_conditional(request)
+
+
+def gzip_client():
+    middleware = CompressionMiddleware(etagged, min_size=10)
+    return middleware, Client(middleware)
+
+
+def test_get_is_compressed_and_cached():
+    middleware, client = gzip_client()
+    for hit in (False, True):
+        response = client.get("/x", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.get_data()) == BODY
+    assert middleware.cache.stats()["hits"] == 1
+
+
+def test_head_does_not_poison_the_cache():
+    middleware, client = gzip_client()
+    client.head("/x", headers={"Accept-Encoding": "gzip"})
+    response = client.get("/x", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(response.get_data()) == BODY
+
+
+def test_identity_when_not_accepted():
+    _, client = gzip_client()
+    response = client.get("/x", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data() == BODY
@@ -0,0 +1,104 @@
+import io
+from datetime import datetime
+
+import gridfs
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+from Q2b import covers
+from Q2b.blueprints.covers import bp as covers_bp
+
+IMAGE = bytes(range(256)) * 40
+
+
+class _StoredFile(io.BytesIO):
+    def __init__(self, doc):
+        super().__init__(doc["data"])
+        self._id, self.metadata, self.upload_date = doc["_id"], doc["metadata"], doc["uploadDate"]
+        self.length = len(doc["data"])
+
+
+class MemoryBucket:
+    """Just the GridFSBucket calls CoverStore makes, over the (mongomock) files collection."""
+
+    def __init__(self, db, bucket_name="fs", chunk_size_bytes=None):
+        self.files = db[f"{bucket_name}.files"]
+
+    def upload_from_stream(self, filename, source, metadata=None):
+        self.files.insert_one({"filename": filename, "data": source.read(), "metadata": metadata,
+                               "uploadDate": datetime(2025, 1, 1)})
+
+    def delete(self, file_id):
+        self.files.delete_one({"_id": file_id})
+
+    def open_download_stream_by_name(self, filename):
+        doc = self.files.find_one({"filename": filename})
+        if doc is None:
+            raise gridfs.NoFile(filename)
+        return _StoredFile(doc)
+
+
+class _Download(io.BytesIO):
+    class headers:
+        @staticmethod
+        def get_content_type():
+            return "image/png"
+
+
+@pytest.fixture
+def store(mongo_db, monkeypatch):
+    monkeypatch.setattr(covers.gridfs, "GridFSBucket", MemoryBucket)
+    monkeypatch.setattr(covers.urllib.request, "urlopen", lambda url, timeout=None: _Download(IMAGE))
+    return covers.CoverStore(mongo_db)
+
+
+@pytest.fixture
+def cover_client(store):
+    app = Flask(__name__)
+    app.cover_store = store
+    app.register_blueprint(covers_bp)
+    return app.test_client()
+
+
+def test_ingest_stores_the_cover_and_bumps_rev(mongo_db, store):
+    books = mongo_db["books"]
+    bid = books.insert_one({"title": "Covered", "url": "https://covers.example/1.png", "rev": 0}).inserted_id
+    cover = store.ingest(books, books.find_one({"_id": bid}))
+    assert cover["source"] == "https://covers.example/1.png"
+    assert books.find_one({"_id": bid})["rev"] == 1
+    assert store.open(bid, "card").read() == IMAGE  # without Pillow the original serves every size
+
+    assert store.ingest(books, books.find_one({"_id": bid})) is None  # same source: nothing to do
+    assert books.find_one({"_id": bid})["rev"] == 1
+
+
+def test_cover_is_cached_and_revalidated(mongo_db, store, cover_client):
+    books = mongo_db["books"]
+    bid = books.insert_one({"title": "Covered", "url": "https://covers.example/1.png"}).inserted_id
+    store.ingest(books, books.find_one({"_id": bid}))
+
+    first = cover_client.get(f"/covers/{bid}/card")
+    assert first.status_code == 200
+    assert first.data == IMAGE
+    assert first.mimetype == "image/png"
+    assert "immutable" in first.headers["Cache-Control"]
+
+    again = cover_client.get(f"/covers/{bid}/card", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_cover_ranges_are_served_partially(mongo_db, store, cover_client):
+    books = mongo_db["books"]
+    bid = books.insert_one({"title": "Covered", "url": "https://covers.example/1.png"}).inserted_id
+    store.ingest(books, books.find_one({"_id": bid}))
+
+    part = cover_client.get(f"/covers/{bid}/orig", headers={"Range": "bytes=100-199"})
+    assert part.status_code == 206
+    assert part.data == IMAGE[100:200]
+    assert part.headers["Content-Range"] == f"bytes 100-199/{len(IMAGE)}"
+
+
+def test_unknown_cover_is_not_found(cover_client):
+    assert cover_client.get(f"/covers/{ObjectId()}/card").status_code == 404
+    assert cover_client.get("/covers/not-an-id/card").status_code == 404
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from Q2b.models import Book, Loan, LoanPageStream
+
+
+@pytest.fixture
+def books_col(mongo_db):
+    col = mongo_db["books"]
+    col.insert_many([Book.normalize({"title": f"Title {i:02d}", "authors": [f"Author {i}"],
+                                     "category": "Children" if i % 2 else "Adult",
+                                     "available": 1, "copies": 1}) for i in range(11)])
+    return col
+
+
+def titles(page):
+    return [b.title for b in page.books]
+
+
+def test_cursor_round_trip_and_bad_tokens():
+    oid = ObjectId()
+    assert Book.decode_cursor(Book.encode_cursor("Ünïcode title", oid)) == ("Ünïcode title", oid)
+    for bad in (None, "", "!!!", Book.encode_cursor("x", oid)[:-3], "WyJ4Il0"):
+        assert Book.decode_cursor(bad) is None
+
+
+def test_pages_walk_forward_and_back(books_col):
+    first = Book.find_page(books_col, limit=4)
+    second = Book.find_page(books_col, after=first.next_cursor, limit=4)
+    third = Book.find_page(books_col, after=second.next_cursor, limit=4)
+    assert titles(first) + titles(second) + titles(third) == [f"Title {i:02d}" for i in range(11)]
+    assert (first.prev_cursor, third.next_cursor) == (None, None)
+
+    back = Book.find_page(books_col, before=third.prev_cursor, limit=4)
+    assert titles(back) == titles(second)
+    assert back.next_cursor == second.next_cursor
+
+
+def test_stream_page_matches_find_page(books_col):
+    page = Book.stream_page(books_col, "Children", limit=3)
+    streamed = titles(page)  # cursors are only set once the rows have been read
+    found = Book.find_page(books_col, "Children", limit=3)
+    assert streamed == titles(found) == ["Title 01", "Title 03", "Title 05"]
+    assert page.next_cursor == found.next_cursor
+
+
+def test_bad_before_token_is_the_first_page():
+    docs = [{"_id": ObjectId(), "title": f"T{i}"} for i in range(3)]
+    page = Book.build_page(list(docs), limit=2, before="not-a-cursor", decode=lambda d: d)
+    assert page.books == docs[:2]
+    assert page.prev_cursor is None
+    assert page.next_cursor == Book.encode_cursor("T1", docs[1]["_id"])
+
+
+def test_api_uses_the_same_cursors(books_col, api_client):
+    client = api_client(books_col)
+
+    first = client.get("/api/books?limit=4&fields=title").get_json()
+    assert [d["title"] for d in first["data"]] == ["Title 00", "Title 01", "Title 02", "Title 03"]
+    assert first["prev"] is None
+    second = client.get(f"/api/books?limit=4&after={first['next']}").get_json()
+    assert second["data"][0]["title"] == "Title 04"
+    back = client.get(f"/api/books?limit=4&before={second['prev']}").get_json()
+    assert [d["title"] for d in back["data"]] == [d["title"] for d in first["data"]]
+    bogus = client.get("/api/books?limit=4&before=bogus").get_json()
+    assert [d["title"] for d in bogus["data"]] == ["Title 00", "Title 01", "Title 02", "Title 03"]
+    assert bogus["prev"] is None
+
+
+# ------------------------------
+# My-loans sections
+# ------------------------------
+def test_loan_cursor_round_trip_and_bad_tokens():
+    oid, when = ObjectId(), datetime(2025, 3, 1, 9, 30, 0, 123000)
+    assert Loan.decode_cursor(Loan.encode_cursor(when, oid)) == (when, oid)
+    for bad in (None, "", "!!!", Book.encode_cursor("x", oid)):
+        assert Loan.decode_cursor(bad) is None
+
+
+def test_loan_branches_walk_by_key(mongo_db):
+    """The active branch's $match/$sort/$limit, run page by page, visits every loan once."""
+    user = ObjectId()
+    when = datetime(2025, 3, 1)
+    mongo_db.loans.insert_many([{"user_id": user, "book_id": ObjectId(), "return_date": None,
+                                 "borrow_date": when + timedelta(days=i // 2)} for i in range(7)])
+    seen, after = [], None
+    while True:
+        pipeline = Loan.user_page_pipeline("loans", "books", user, active_after=after, returned_after=None,
+                                           per_page=3, loan_days=14, now=when)
+        match, sort, limit = (pipeline[i][k] for i, k in enumerate(("$match", "$sort", "$limit")))
+        rows = [{**d, "section": "active"} for d in
+                mongo_db.loans.find(match, sort=list(sort.items()), limit=limit)]
+        stream = LoanPageStream(rows, 3)
+        seen += [r["id"] for r in stream.active()]
+        after = stream.active_next
+        if after is None:
+            break
+    expected = mongo_db.loans.find({}, sort=[("borrow_date", -1), ("_id", -1)])
+    assert seen == [str(d["_id"]) for d in expected]
+    assert all("$skip" not in stage for stage in pipeline)
@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+
+from bson import ObjectId
+
+from Q2b import exporter
+from Q2b.inventory import CopyInventory
+
+
+def test_books_export_counts_free_copies_under_the_copy_inventory(mongo_db):
+    books = mongo_db["books"]
+    inventory = CopyInventory(mongo_db["copies"])
+    ids = books.insert_many([{"title": f"T{n}", "available": 9, "copies": 2} for n in range(5)]).inserted_ids
+    for bid in ids:
+        inventory.add_copies(bid, 2, taken=[ObjectId()] if bid == ids[0] else None)
+
+    fields = ["title", "available"]
+    cursor = exporter.open_cursor(books, ["_id", *fields])
+    rows = list(exporter.live_availability(cursor, inventory, fields, group=2))
+    assert rows == [{"title": f"T{n}", "available": 1 if n == 0 else 2} for n in range(5)]
+
+
+def _rows(books, fmt, fields):
+    return b"".join(exporter.stream(exporter.open_cursor(books, fields, batch_size=2), fmt, fields))
+
+
+def test_jsonl_export_is_one_document_per_line(mongo_db):
+    books = mongo_db["books"]
+    books.insert_many([{"title": f"T{n}", "authors": ["A", "B"], "pages": n, "url": "x"} for n in range(3)])
+    fields = exporter.pick_fields("books", "title,pages,password,url")
+    assert fields == ["title", "pages", "url"]  # unknown fields are dropped
+    lines = _rows(books, "jsonl", fields).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{"title": f"T{n}", "pages": n, "url": "x"} for n in range(3)]
+
+
+def test_csv_export_has_a_header_and_flattens_lists(mongo_db):
+    books = mongo_db["books"]
+    books.insert_many([{"title": "Two, Authors", "authors": ["A", "B"]}, {"title": "None"}])
+    text = _rows(books, "csv", ["title", "authors"]).decode()
+    assert list(csv.reader(io.StringIO(text))) == [["title", "authors"], ["Two, Authors", "A|B"], ["None", ""]]
+
+
+def test_export_sends_the_first_row_alone_then_coalesces(mongo_db, monkeypatch):
+    monkeypatch.setattr(exporter, "CHUNK_BYTES", 100)
+    books = mongo_db["books"]
+    books.insert_many([{"title": "x" * 40} for _ in range(10)])
+    chunks = list(exporter.stream(exporter.open_cursor(books, ["title"]), "jsonl", ["title"]))
+    assert chunks[0] == b'{"title": "' + b"x" * 40 + b'"}\n'
+    assert [len(c) for c in chunks] == [54, 108, 108, 108, 108, 54]  # then pairs of rows, then the rest
+    assert b"".join(chunks).count(b"\n") == 10
+
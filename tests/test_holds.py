@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from Q2b.holds import Hold
+from Q2b.models import Book, Loan
+
+NOW = datetime(2025, 3, 1)
+
+
+@pytest.fixture
+def shelf(mongo_db):
+    """One title with a single copy, plus the loans and holds collections."""
+    books = mongo_db["books"]
+    doc = Book.normalize({"title": "Held Title", "authors": ["A. Writer"], "available": 1, "copies": 1})
+    return books, mongo_db["loans"], mongo_db["holds"], books.insert_one(doc).inserted_id
+
+
+def test_queue_is_first_come_first_served(shelf):
+    _, _, holds, book = shelf
+    first = Hold.place(holds, user_id=ObjectId(), book_id=book, now=NOW)
+    second = Hold.place(holds, user_id=ObjectId(), book_id=book, now=NOW + timedelta(minutes=1))
+
+    assert Hold.position(holds, first) == 1
+    assert Hold.position(holds, second) == 2
+    ready = Hold.allocate(holds, book, now=NOW)
+    assert ready._id == first._id and ready.is_ready
+    assert ready.expires_at == NOW + timedelta(days=3)
+    assert Hold.position(holds, second) == 1
+
+
+def test_duplicate_hold_is_refused(shelf):
+    _, _, holds, book = shelf
+    holds.create_index([("user_id", 1), ("book_id", 1)], unique=True)
+    user = ObjectId()
+    Hold.place(holds, user_id=user, book_id=book)
+    with pytest.raises(ValueError, match="already have a hold"):
+        Hold.place(holds, user_id=user, book_id=book)
+
+
+def test_return_hands_the_copy_to_the_queue(shelf):
+    books, loans, holds, book = shelf
+    borrower, waiting, other = ObjectId(), ObjectId(), ObjectId()
+    loan = Loan.create(loans, books, user_id=borrower, book_id=book, when=NOW, holds_col=holds)
+    Hold.place(holds, user_id=waiting, book_id=book)
+
+    Loan.return_loan(loans, books, loan_id=loan._id, when=NOW, holds_col=holds)
+
+    assert Hold.reserved(holds, book) == 1
+    assert Hold.spare(holds, books, book) == 0
+    with pytest.raises(ValueError, match="on hold for other readers"):
+        Loan.create(loans, books, user_id=other, book_id=book, when=NOW, holds_col=holds)
+    with pytest.raises(ValueError, match="on hold for other readers"):
+        Book.borrow_by_id(books, book, holds_col=holds)
+    collected = Loan.create(loans, books, user_id=waiting, book_id=book, when=NOW, holds_col=holds)
+    assert collected.user_id == waiting
+    assert holds.count_documents({}) == 0
+
+
+def test_sweeper_promotes_waiting_holds_onto_free_copies(shelf):
+    books, _, holds, book = shelf
+    Book.borrow_by_id(books, book, holds_col=holds)
+    Hold.place(holds, user_id=ObjectId(), book_id=book)
+
+    books.update_one({"_id": book}, {"$inc": {"available": 1}})  # the copy comes back
+    assert Hold.promote(holds, books) == 1
+    assert Hold.spare(holds, books, book) == 0
+
+
+def test_loans_page_lists_positions_from_one_aggregation(shelf):
+    books, _, holds, book = shelf
+    other = books.insert_one(Book.normalize({"title": "Second Title", "available": 0, "copies": 1})).inserted_id
+    user = ObjectId()
+    for n in range(3):
+        Hold.place(holds, user_id=ObjectId(), book_id=book, now=NOW + timedelta(minutes=n))
+    Hold.place(holds, user_id=user, book_id=book, now=NOW + timedelta(minutes=5))
+    Hold.place(holds, user_id=user, book_id=other, now=NOW)
+    Hold.allocate(holds, book, now=datetime.utcnow())  # the head of the queue moves to ready
+
+    listed = {h["title"]: h["position"] for h in Hold.for_user(holds, books, user)}
+    assert listed == {"Held Title": 3, "Second Title": 1}
+    for d in holds.find({"user_id": user}):
+        assert Hold.position(holds, Hold.from_doc(d)) == listed[books.find_one({"_id": d["book_id"]})["title"]]
+
+
+def test_hold_views_refuse_bad_ids_and_other_backends(app, reader, monkeypatch):
+    response = reader.post(f"/holds/{ObjectId()}/cancel")
+    assert response.status_code == 302
+    with reader.session_transaction() as session:
+        assert "Holds are not available" in session["_flashes"][-1][1]
+
+    monkeypatch.setattr(app.repos, "backend", "mongo")
+    assert reader.post("/holds/not-an-id/cancel").status_code == 404
+    assert reader.post("/books/not-an-id/hold").status_code == 404
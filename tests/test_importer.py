@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from Q2b.importer import CatalogueImporter
+
+
+@pytest.fixture
+def books_col(mongo_db):
+    col = mongo_db["books"]
+    col.create_index("dedupe_key", unique=True)
+    return col
+
+
+def record(i, **extra):
+    return {"title": f"Title {i}", "authors": [f"Author {i}"], "category": "Adult", "copies": 2, **extra}
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in rows), encoding="utf-8")
+    return str(path)
+
+
+class Crash(Exception):
+    pass
+
+
+def test_duplicates_are_counted_not_inserted(books_col, tmp_path):
+    CatalogueImporter(books_col, write_jsonl(tmp_path / "first.jsonl", [record(0)])).run()
+    path = write_jsonl(tmp_path / "books.jsonl", [
+        record(0),                      # already in the catalogue
+        record(1),
+        record(1, pages=99),            # same title and authors later in the file
+        "{not json",
+        record(2, category="Comics"),
+        record(3),
+    ])
+
+    stats = CatalogueImporter(books_col, path, batch_size=2).run()
+
+    assert (stats.read, stats.inserted, stats.duplicates, stats.rejected) == (6, 2, 2, 2)
+    assert sorted(d["title"] for d in books_col.find()) == ["Title 0", "Title 1", "Title 3"]
+    rejects = [json.loads(line) for line in open(f"{path}.rejects.jsonl", encoding="utf-8")]
+    assert [r["line"] for r in rejects] == [4, 5]
+    assert rejects[1]["error"].startswith("category must be one of")
+
+
+def test_interrupted_import_resumes_from_the_checkpoint(books_col, tmp_path):
+    path = write_jsonl(tmp_path / "books.jsonl", [record(i) for i in range(5)] + ["{bad", record(6)])
+
+    def crash_after_first_batch(stats):
+        raise Crash()
+
+    with pytest.raises(Crash):
+        CatalogueImporter(books_col, path, batch_size=2, progress=crash_after_first_batch).run()
+    assert books_col.count_documents({}) == 2
+    assert json.load(open(f"{path}.progress", encoding="utf-8"))["line"] == 2
+
+    stats = CatalogueImporter(books_col, path, batch_size=2).run()
+
+    assert books_col.count_documents({}) == 6
+    assert (stats.read, stats.inserted, stats.duplicates, stats.rejected) == (7, 6, 0, 1)
+    rejects = [json.loads(line) for line in open(f"{path}.rejects.jsonl", encoding="utf-8")]
+    assert [r["line"] for r in rejects] == [6]  # numbered from the top of the file, not the resume point
+    with pytest.raises(FileNotFoundError):
+        open(f"{path}.progress")
+
+
+def test_restart_ignores_saved_progress(books_col, tmp_path):
+    path = write_jsonl(tmp_path / "books.jsonl", [record(i) for i in range(3)])
+    with open(f"{path}.progress", "w", encoding="utf-8") as fh:
+        json.dump({"read": 3, "inserted": 3, "offset": 10 ** 6, "line": 3}, fh)
+
+    stats = CatalogueImporter(books_col, path).run(restart=True)
+
+    assert (stats.read, stats.inserted) == (3, 3)
+
+
+def test_csv_list_fields_are_pipe_separated(books_col, tmp_path):
+    path = tmp_path / "books.csv"
+    path.write_text("title,authors,genres,category,copies\n"
+                    "Pairs,Ann Lee|Bo Tan,Poetry| Travel ,Teens,3\n", encoding="utf-8")
+
+    stats = CatalogueImporter(books_col, str(path)).run()
+
+    doc = books_col.find_one({"title": "Pairs"})
+    assert stats.inserted == 1
+    assert (doc["authors"], doc["genres"], doc["copies"], doc["available"]) == (["Ann Lee", "Bo Tan"],
+                                                                                ["Poetry", "Travel"], 3, 3)
+
+
+def test_resuming_does_not_repeat_rejects_from_the_replayed_batch(books_col, tmp_path):
+    path = write_jsonl(tmp_path / "books.jsonl", [record(0), record(1), "{bad", record(3), record(4)])
+    batches = []
+
+    def crash_on_second_batch(docs):
+        batches.append(docs)
+        if len(batches) == 2:  # the rejected line 3 is already written, the checkpoint is not
+            raise Crash()
+
+    with pytest.raises(Crash):
+        CatalogueImporter(books_col, path, batch_size=2, on_insert=crash_on_second_batch).run()
+    CatalogueImporter(books_col, path, batch_size=2).run()
+
+    rejects = [json.loads(line) for line in open(f"{path}.rejects.jsonl", encoding="utf-8")]
+    assert [r["line"] for r in rejects] == [3]
+    assert books_col.count_documents({}) == 4
+
+
+def test_on_insert_gets_only_the_documents_inserted(books_col, tmp_path):
+    CatalogueImporter(books_col, write_jsonl(tmp_path / "first.jsonl", [record(0)])).run()
+    path = write_jsonl(tmp_path / "books.jsonl", [record(0), record(1), record(2)])
+    inserted = []
+
+    CatalogueImporter(books_col, path, batch_size=2, on_insert=inserted.extend).run()
+
+    assert [d["title"] for d in inserted] == ["Title 1", "Title 2"]
+    assert {d["_id"] for d in inserted} == {d["_id"] for d in books_col.find({"title": {"$ne": "Title 0"}})}
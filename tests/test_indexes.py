@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+from flask import Flask
+
+from Q2b import indexes
+
+COLLSCAN = {"queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}}
+IXSCAN = {"queryPlanner": {"winningPlan": {"stage": "LIMIT", "inputStage": {
+    "stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}}
+
+
+@pytest.fixture
+def startup(mongo_db, monkeypatch):
+    """check_indexes against mongomock, with canned plans: one indexed shape, one not."""
+    monkeypatch.setattr(indexes, "query_shapes", lambda: {
+        "indexed": lambda db: IXSCAN,
+        "book_titles[All]": lambda db: COLLSCAN,
+    })
+
+    def run(mode):
+        app = Flask(__name__)
+        app.config["INDEX_CHECK"] = mode
+        indexes.check_indexes(app, mongo_db)
+    return run
+
+
+def test_missing_indexes_are_created_once(mongo_db):
+    created = indexes.ensure_indexes(mongo_db, log=lambda _: None)
+    assert len(created) == len(indexes.INDEXES)
+    assert "books.title_1__id_1" in created
+    assert indexes.ensure_indexes(mongo_db, log=lambda _: None) == []
+
+
+def test_warn_mode_logs_unindexed_shapes(startup, caplog):
+    with caplog.at_level(logging.WARNING):
+        startup("warn")
+    warnings = [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+    assert warnings == ["Unindexed query shape book_titles[All]: COLLSCAN, SORT"]
+
+
+def test_strict_mode_refuses_to_start(startup):
+    with pytest.raises(indexes.PlanProblem, match=r"book_titles\[All\]: COLLSCAN, SORT"):
+        startup("strict")
+
+
+def test_off_mode_skips_the_plans(startup, monkeypatch):
+    monkeypatch.setattr(indexes, "verify_query_plans", lambda db: pytest.fail("plans were explained"))
+    startup("off")
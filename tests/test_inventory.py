@@ -0,0 +1,81 @@
+import threading
+
+from bson import ObjectId
+
+from Q2b.inventory import CopyInventory
+
+
+def test_claim_many_takes_one_free_copy_per_title(mongo_db):
+    inventory = CopyInventory(mongo_db["copies"])
+    titles = [ObjectId() for _ in range(20)]
+    for bid in titles:
+        inventory.add_copies(bid, 3)
+    empty = ObjectId()
+    inventory.add_copies(empty, 1, taken=[ObjectId()])
+
+    claims = {bid: ObjectId() for bid in titles + [empty]}
+    claimed = inventory.claim_many(claims)
+
+    assert set(claimed) == set(titles)  # every title got one, even when its probe wrapped around
+    for bid, copy_id in claimed.items():
+        copy = mongo_db["copies"].find_one({"_id": copy_id})
+        assert (copy["book_id"], copy["free"], copy["loan_id"]) == (bid, False, claims[bid])
+    assert inventory.available_many(titles + [empty]) == {**{bid: 2 for bid in titles}, empty: 0}
+
+
+def test_claim_many_probes_from_a_random_point(mongo_db, monkeypatch):
+    copies = mongo_db["copies"]
+    bid = ObjectId()
+    copies.insert_many([{"book_id": bid, "n": n, "free": True, "loan_id": None, "r": n / 10}
+                        for n in range(10)])
+    inventory = CopyInventory(copies)
+
+    monkeypatch.setattr("Q2b.inventory.random.random", lambda: 0.45)
+    copy_id = inventory.claim_many({bid: ObjectId()})[bid]
+    assert copies.find_one({"_id": copy_id})["r"] >= 0.45  # not simply the first copy
+
+    monkeypatch.setattr("Q2b.inventory.random.random", lambda: 0.95)  # nothing free above: wrap around
+    copy_id = inventory.claim_many({bid: ObjectId()})[bid]
+    assert copies.find_one({"_id": copy_id})["r"] < 0.95
+
+
+def test_claim_never_takes_the_copies_it_must_keep_free(mongo_db):
+    inventory = CopyInventory(mongo_db["copies"])
+    bid = ObjectId()
+    inventory.add_copies(bid, 3)
+    start = threading.Barrier(8)
+    got = []
+
+    def borrow():
+        start.wait()
+        if inventory.claim(bid, ObjectId(), keep=1):
+            got.append(1)
+
+    threads = [threading.Thread(target=borrow) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(got) <= 2
+    assert inventory.available(bid) == 3 - len(got) >= 1
+
+
+def test_claim_many_gives_back_copies_set_aside(mongo_db):
+    inventory = CopyInventory(mongo_db["copies"])
+    spare, tight = ObjectId(), ObjectId()
+    inventory.add_copies(spare, 2)
+    inventory.add_copies(tight, 1)
+    claimed = inventory.claim_many({spare: ObjectId(), tight: ObjectId()}, keep={spare: 1, tight: 1})
+    assert set(claimed) == {spare}
+    assert inventory.available_many([spare, tight]) == {spare: 1, tight: 1}
+
+
+def test_api_reports_free_copies(mongo_db, api_client):
+    books = mongo_db["books"]
+    bid = books.insert_one({"title": "Counted", "available": 5, "copies": 2}).inserted_id
+    inventory = CopyInventory(mongo_db["copies"])
+    inventory.add_copies(bid, 2, taken=[ObjectId()])
+    client = api_client(books, inventory)
+    assert client.get("/api/books").get_json()["data"][0]["available"] == 1
+    assert client.get(f"/api/books/{bid}").get_json()["available"] == 1
+    assert "available" not in client.get(f"/api/books/{bid}?fields=title").get_json()
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from Q2b import metrics
+from Q2b.metrics import Registry
+
+
+def test_dead_threads_are_folded_into_the_totals():
+    reg = Registry()
+    reg.counter("jobs_total", "Jobs.")
+    reg.histogram("job_seconds", "Job time.", (0.1, 1.0))
+
+    def work():
+        reg.inc("jobs_total")
+        reg.observe("job_seconds", (), 0.5)
+
+    for _ in range(50):
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+    work()  # this thread stays alive
+
+    assert len(reg._shards) == 1
+    totals = reg.collect()
+    assert totals[("jobs_total", ())] == 51
+    assert totals[("job_seconds", ())] == [0, 51, 0, 25.5]
+    assert "job_seconds_count 51" in reg.render()
+
+
+def test_streamed_pages_are_timed_to_the_last_byte(client, monkeypatch):
+    def slow_stream(template, **context):
+        yield "<html>"
+        time.sleep(0.05)  # body rendering that an after_request hook would miss
+        yield "</html>"
+
+    monkeypatch.setattr("Q2b.blueprints.catalogue.stream_template", slow_stream)
+    before = metrics.registry.collect()
+    response = client.get("/")
+    response.get_data()
+    response.close()  # what the WSGI server does once the body is sent
+    key = (metrics.HTTP_LATENCY, (("endpoint", "catalogue_bp.book_titles"), ("method", "GET"), ("status", "200")))
+    after = metrics.registry.collect()[key]
+    prev = before.get(key) or [0] * len(after)
+    assert after[-1] - prev[-1] >= 0.05
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+from Q2b import migrations
+
+
+@pytest.fixture
+def library(mongo_db, monkeypatch):
+    """One title with an active and a returned-but-flagged loan. The due-date backfill is an
+    update pipeline mongomock can't evaluate, so a stand-in records that it ran."""
+    book = mongo_db["books"].insert_one({"title": "Old Stock", "authors": ["A. Writer"],
+                                         "copies": 2, "available": 1}).inserted_id
+    mongo_db["loans"].insert_one({"user_id": book, "book_id": book, "borrow_date": datetime(2025, 1, 1),
+                                  "return_date": None})
+    mongo_db["loans"].insert_one({"user_id": book, "book_id": book, "borrow_date": datetime(2024, 1, 1),
+                                  "return_date": datetime(2024, 1, 5), "overdue": True})
+
+    def backfill_loan_due_dates(db, *, batch_size, log):
+        return 1
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        backfill_loan_due_dates if m is migrations.backfill_loan_due_dates else m for m in migrations.MIGRATIONS])
+    return mongo_db, book
+
+
+def test_every_migration_is_registered():
+    assert migrations.MIGRATIONS == [
+        migrations.backfill_book_dedupe_keys, migrations.backfill_loan_due_dates,
+        migrations.clear_returned_overdue, migrations.split_book_copies,
+    ]
+
+
+def test_run_all_runs_them_in_order(library):
+    db, book = library
+    done = migrations.run_all(db, copies=True, log=lambda _: None)
+    assert done == {"backfill_book_dedupe_keys": 1, "backfill_loan_due_dates": 1,
+                    "clear_returned_overdue": 1, "split_book_copies": 2}
+    assert db["books"].find_one({"_id": book})["dedupe_key"]
+    assert db["loans"].count_documents({"overdue": True}) == 0
+    assert db["copies"].count_documents({"book_id": book, "free": True}) == 1
+
+
+def test_copy_split_only_runs_for_the_copy_inventory(library):
+    db, _ = library
+    assert "split_book_copies" not in migrations.run_all(db, log=lambda _: None)
+    assert db["copies"].count_documents({}) == 0
@@ -0,0 +1,55 @@
+def test_book_titles_streams_whole_page(client, app):
+    response = client.get("/")
+    body = response.get_data(as_text=True)  # drains the streamed body
+    assert response.status_code == 200
+    assert "BOOK TITLES" in body
+    assert body.rstrip().endswith("</html>")
+    first = app.repos.books.stream_page(limit=1).books
+    assert next(iter(first)).title in body
+
+
+def test_book_titles_next_page(client, app):
+    page = app.repos.books.stream_page(limit=app.config["BOOKS_PER_PAGE"])
+    list(page.books)
+    response = client.get(f"/?after={page.next_cursor}")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).rstrip().endswith("</html>")
+
+
+def test_my_loans_streams_whole_page(reader):
+    response = reader.get("/loans")
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "CURRENT LOANS" in body
+    assert body.rstrip().endswith("</html>")
+
+
+def new_book_form(title):
+    return {"title": title, "genres": ["Fiction"], "category": "Adult", "description": "A test book.",
+            "authors-0-name": "Test Author", "pages": "12", "copies": "2"}
+
+
+def test_search_uses_the_configured_backend(client, app):
+    title = next(iter(app.repos.books.stream_page(limit=1).books)).title
+    response = client.get("/search", query_string={"q": title})
+    assert response.status_code == 200
+    assert title in response.get_data(as_text=True)
+
+
+def test_admin_adds_a_book_to_the_sqlite_catalogue(admin, app):
+    response = admin.post("/books/new", data=new_book_form("Embedded Backends"))
+    assert response.status_code == 302
+    hits = app.search_index.search("embedded backends", limit=1)
+    book = app.repos.books.get(hits[0][0])
+    assert (book.title, book.copies, book.available) == ("Embedded Backends", 2, 2)
+
+    again = admin.post("/books/new", data=new_book_form("Embedded  backends"))
+    assert again.status_code == 200
+    assert "This title already exists." in again.get_data(as_text=True)
+
+
+def test_mongo_only_routes_are_off_under_sqlite(admin):
+    assert admin.get("/admin/overdue").status_code == 404
+    assert admin.get("/admin/export/books.jsonl").status_code == 404
+    assert admin.get("/api/books").status_code == 404
+    assert "Overdue" not in admin.get("/").get_data(as_text=True)
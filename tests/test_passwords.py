@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from Q2b.passwords import HasherBusy, PasswordHasher
+
+
+def test_busy_when_no_slot_frees_up_in_time():
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0, max_pending=1, acquire_timeout=0.01)
+    started, finish = threading.Event(), threading.Event()
+
+    def slow(_):
+        started.set()
+        finish.wait(5)
+        return "done"
+
+    worker = threading.Thread(target=hasher._run, args=(slow, None))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(HasherBusy):
+            hasher.hash("12345")
+    finally:
+        finish.set()
+        worker.join()
+    assert hasher.verify(hasher.hash("12345"), "12345")  # the slot is free again
+
+
+def test_waits_up_to_the_timeout_for_a_slot():
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0, max_pending=1, acquire_timeout=5)
+    started, finish = threading.Event(), threading.Event()
+
+    def slow(_):
+        started.set()
+        finish.wait(5)
+
+    worker = threading.Thread(target=hasher._run, args=(slow, None))
+    worker.start()
+    started.wait(5)
+    threading.Timer(0.05, finish.set).start()
+    assert hasher.verify(hasher.hash("12345"), "12345")  # queued behind the slow call, not refused
+    worker.join()
+
+
+def test_needs_rehash_only_when_the_method_changed():
+    old = PasswordHasher(method="pbkdf2:sha256:1000", workers=0)
+    new = PasswordHasher(method="pbkdf2:sha256:2000", workers=0)
+    pw_hash = old.hash("12345")
+    assert not old.needs_rehash(pw_hash)
+    assert new.needs_rehash(pw_hash)
+    assert not new.needs_rehash(new.hash("12345"))
+
+
+def test_pool_workers_start_fresh_rather_than_forked():
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=1)
+    try:
+        assert hasher.verify(hasher.hash("12345"), "12345")
+        assert hasher._pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        hasher.shutdown()
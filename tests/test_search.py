@@ -0,0 +1,86 @@
+import importlib.util
+from pathlib import Path
+
+from search_core import FIELDS, SearchIndex
+
+DOCS = [
+    ("1", {"title": "The Silent River", "authors": ["Ana Tan"], "genres": ["Mystery"], "description": "A town."}),
+    ("2", {"title": "Quiet Gardens", "authors": ["Ben River"], "genres": ["Poetry"], "description": "Quiet verse."}),
+    ("3", {"title": "Road Atlas", "authors": ["Cy Ong"], "genres": ["Travel"], "description": "Rivers and roads."}),
+]
+
+
+def test_title_hits_outrank_author_and_description_hits():
+    index = SearchIndex.build(DOCS)
+    assert [key for key, _ in index.search("river")] == ["1", "2", "3"]
+    assert index.search("the and of") == []
+
+
+def test_saved_index_is_reused_only_while_the_fingerprint_matches(tmp_path):
+    path = str(tmp_path / "index.json")
+    built = []
+
+    def docs():
+        built.append(True)
+        return iter(DOCS)
+
+    first = SearchIndex.load_or_build(path, [3, "a"], docs)
+    again = SearchIndex.load_or_build(path, [3, "a"], docs)
+    assert len(built) == 1
+    assert again.search("quiet") == first.search("quiet")
+    SearchIndex.load_or_build(path, [4, "b"], docs)
+    assert len(built) == 2
+
+
+# ------------------------------
+# Q2b adapter
+# ------------------------------
+def add_elsewhere(app, title):
+    """Insert through the repository only, as another worker or the importer would."""
+    from Q2b.models import Book
+    return app.repos.books.add(Book.normalize({"title": title, "authors": ["Elsewhere"], "category": "Adult",
+                                               "available": 1, "copies": 1}))
+
+
+def test_books_added_elsewhere_show_up_after_the_refresh_interval(app, monkeypatch):
+    from Q2b import search
+    monkeypatch.setitem(app.config, "SEARCH_REFRESH_SECONDS", 3600)
+    search.get_index(app)
+    oid = add_elsewhere(app, "Quokka Migrations")
+    assert search.get_index(app).search("quokka") == []  # still inside the interval
+
+    monkeypatch.setitem(app.config, "SEARCH_REFRESH_SECONDS", 0)
+    assert [key for key, _ in search.get_index(app).search("quokka")] == [str(oid)]
+    assert search.get_index(app).fingerprint == app.repos.books.fingerprint()
+
+
+def test_local_inserts_are_indexed_now_and_saved_later(app, monkeypatch):
+    from Q2b import search
+    monkeypatch.setitem(app.config, "SEARCH_REFRESH_SECONDS", 0)
+    monkeypatch.setitem(app.config, "SEARCH_SAVE_DELAY", 3600)
+    saved = []
+    monkeypatch.setattr(SearchIndex, "save", lambda self, path: saved.append(path))
+    oid = add_elsewhere(app, "Wombat Tunnels")
+    search.index_book(app, oid, {"title": "Wombat Tunnels", "authors": ["Elsewhere"]})
+
+    assert saved == []  # not on the request path
+    assert search.get_index(app).fingerprint == app.repos.books.fingerprint()
+    assert [key for key, _ in search.get_index(app).search("wombat")] == [str(oid)]
+    search.save_index(app)
+    assert saved == [app.config["SEARCH_INDEX_PATH"]]
+    assert app.search_save_timer is None
+
+
+# ------------------------------
+# Q2a adapter
+# ------------------------------
+def test_q2a_fingerprint_covers_every_indexed_field():
+    spec = importlib.util.spec_from_file_location("q2a_search", Path(__file__).parent.parent / "Q2a" / "search.py")
+    q2a_search = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(q2a_search)
+    books = [doc for _, doc in DOCS]
+    before = q2a_search.fingerprint(books)
+    for field in FIELDS:
+        edited = [dict(books[0], **{field: "changed"})] + books[1:]
+        assert q2a_search.fingerprint(edited) != before, field
+    assert q2a_search.fingerprint([dict(b) for b in books]) == before
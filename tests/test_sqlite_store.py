@@ -0,0 +1,218 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from Q2b.models import Book, due_date_for
+from Q2b.sqlite_store import SQLiteStore
+
+WHEN = datetime(2025, 3, 1, 10, 30)
+
+
+def book(title, *, available=1, copies=1, category="Adult"):
+    return {"title": title, "authors": [f"{title} Author"], "category": category,
+            "available": available, "copies": copies}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteStore(str(tmp_path / "library.sqlite3"))
+
+
+@pytest.fixture
+def users(store, app):  # app: configures the (fast, inline) password hasher
+    """Three registered readers' ids."""
+    return [ObjectId(store.users.create(f"reader{i}@example.org", "pw", f"Reader {i}").id) for i in range(3)]
+
+
+@pytest.fixture
+def title(store):
+    """A title with two copies on the shelf."""
+    return store.books.add(Book.normalize(book("Two Copies", available=2, copies=2)))
+
+
+def test_seed_is_idempotent(store):
+    books = [book(f"Title {i:02d}") for i in range(5)]
+    assert store.books.seed(books) == 5
+    assert store.books.seed(books) == 0
+    assert store.books.count() == 5
+
+
+def test_duplicate_title_is_refused(store):
+    store.books.add(Book.normalize(book("Same Book")))
+    # dedupe_key ignores case, spacing and punctuation
+    with pytest.raises(ValueError, match="already exists"):
+        store.books.add(Book.normalize({**book("Same Book"), "title": "  same book! "}))
+    assert store.books.count() == 1
+
+
+def test_get_and_get_many(store, title):
+    other = store.books.add(Book.normalize(book("Other")))
+    assert store.books.get(title).title == "Two Copies"
+    assert store.books.get("not-an-id") is None
+    assert set(store.books.get_many([title, other, ObjectId()])) == {title, other}
+
+
+def test_create_takes_a_copy(store, title, users):
+    user = users[0]
+    loan = store.loans.create(user_id=user, book_id=title, when=WHEN)
+    assert loan.due_date == due_date_for(WHEN)
+    assert store.books.get(title).available == 1
+    stored = store.loans.get(loan._id)
+    assert (stored.user_id, stored.book_id, stored.borrow_date) == (user, title, WHEN)
+
+
+def test_second_active_loan_is_refused_and_rolled_back(store, title, users):
+    user = users[0]
+    store.loans.create(user_id=user, book_id=title, when=WHEN)
+    with pytest.raises(ValueError, match="already has an active loan"):
+        store.loans.create(user_id=user, book_id=title, when=WHEN)
+    assert store.books.get(title).available == 1
+
+
+def test_no_copies_left(store, title, users):
+    store.loans.create(user_id=users[0], book_id=title, when=WHEN)
+    store.loans.create(user_id=users[1], book_id=title, when=WHEN)
+    with pytest.raises(ValueError, match="No available copies"):
+        store.loans.create(user_id=users[2], book_id=title, when=WHEN)
+    assert store.books.get(title).available == 0
+
+
+def test_renew_moves_the_due_date(store, title, users):
+    loan = store.loans.create(user_id=users[0], book_id=title, when=WHEN)
+    later = WHEN + timedelta(days=10)
+    renewed = store.loans.renew(loan_id=loan._id, when=later)
+    assert renewed.renew_count == 1
+    assert renewed.borrow_date == later
+    assert renewed.due_date == due_date_for(later)
+
+
+def test_return_restocks_once(store, title, users):
+    loan = store.loans.create(user_id=users[0], book_id=title, when=WHEN)
+    returned = store.loans.return_loan(loan_id=loan._id, when=WHEN + timedelta(days=3))
+    assert returned.return_date == WHEN + timedelta(days=3)
+    assert store.books.get(title).available == 2
+    with pytest.raises(ValueError, match="already returned"):
+        store.loans.return_loan(loan_id=loan._id, when=WHEN)
+    with pytest.raises(ValueError, match="Only active loans"):
+        store.loans.renew(loan_id=loan._id, when=WHEN)
+    assert store.books.get(title).available == 2
+
+
+def test_return_clears_the_overdue_flag(store, title, users):
+    loan = store.loans.create(user_id=users[0], book_id=title, when=WHEN)
+    store.conn().execute("UPDATE loans SET overdue = 1 WHERE id = ?", (str(loan._id),))
+    assert store.loans.get(loan._id).overdue
+    assert not store.loans.return_loan(loan_id=loan._id, when=WHEN + timedelta(days=60)).overdue
+    assert not store.loans.get(loan._id).overdue
+
+
+def test_only_returned_loans_can_be_deleted(store, title, users):
+    loan = store.loans.create(user_id=users[0], book_id=title, when=WHEN)
+    assert not store.loans.delete_if_returned(loan_id=loan._id)
+    store.loans.return_loan(loan_id=loan._id, when=WHEN)
+    assert store.loans.delete_if_returned(loan_id=loan._id)
+    assert store.loans.get(loan._id) is None
+
+
+def test_unknown_reader_is_refused(store, title):
+    with pytest.raises(ValueError, match="Unknown reader"):
+        store.loans.create(user_id=ObjectId(), book_id=title, when=WHEN)
+    assert store.books.get(title).available == 2
+
+
+def test_users(store, app):
+    user = store.users.create("Reader@Example.org ", "pw", "Reader")
+    assert store.users.by_email("reader@example.org").id == user.id
+    assert store.users.authenticate("reader@example.org", "pw").id == user.id
+    assert store.users.authenticate("reader@example.org", "wrong") is None
+    with pytest.raises(ValueError, match="already registered"):
+        store.users.create("reader@example.org", "pw", "Again")
+
+
+# ------------------------------
+# Keyset paging
+# ------------------------------
+def walk(store, limit, category=None):
+    """Follow next cursors from the first page; returns every page's titles."""
+    pages, after = [], None
+    while True:
+        page = store.books.stream_page(category, after=after, limit=limit)
+        pages.append([b.title for b in page.books])
+        if not page.next_cursor:
+            return pages
+        after = page.next_cursor
+
+
+def test_forward_pages_cover_every_title_once(store):
+    titles = [f"Title {i:02d}" for i in range(23)]
+    store.books.seed([book(t) for t in reversed(titles)])
+    pages = walk(store, limit=5)
+    assert [len(p) for p in pages] == [5, 5, 5, 5, 3]
+    assert [t for p in pages for t in p] == titles
+
+
+def test_equal_titles_are_split_by_id(store):
+    store.books.seed([{**book("Same"), "authors": [f"Author {i}"]} for i in range(7)])
+    pages = walk(store, limit=3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+
+
+def test_backward_page_mirrors_forward_page(store):
+    store.books.seed([book(f"Title {i:02d}") for i in range(12)])
+    first = store.books.stream_page(limit=4)
+    assert first.prev_cursor is None
+    second = store.books.stream_page(after=first.next_cursor, limit=4)
+    back = store.books.stream_page(before=second.prev_cursor, limit=4)
+    assert [b.title for b in back.books] == [b.title for b in first.books]
+    assert back.prev_cursor is None
+    assert back.next_cursor == first.next_cursor
+
+
+def test_category_pages_and_bad_cursor(store):
+    store.books.seed([book(f"Kid {i}", category="Children") for i in range(4)]
+                     + [book(f"Adult {i}") for i in range(4)])
+    assert [t for p in walk(store, limit=3, category="Children") for t in p] == [f"Kid {i}" for i in range(4)]
+    assert store.books.count("Children") == 4
+    page = store.books.stream_page(after="not-a-cursor", limit=3)
+    assert [b.title for b in page.books] == ["Adult 0", "Adult 1", "Adult 2"]
+    assert page.prev_cursor is None
+
+
+def test_loans_page_by_section(store, users):
+    user = users[0]
+    store.books.seed([book(f"Title {i}") for i in range(5)])
+    books = walk(store, limit=10)[0]
+    oids = [b._id for b in store.books.stream_page(limit=10).books]
+    loans = [store.loans.create(user_id=user, book_id=oid, when=WHEN + timedelta(days=i))
+             for i, oid in enumerate(oids)]
+    for ln in loans[:2]:
+        store.loans.return_loan(loan_id=ln._id, when=WHEN + timedelta(days=20))
+
+    stream = store.loans.stream_for_user(user, per_page=2, now=WHEN)
+    active = list(stream.active())
+    returned = list(stream.returned())
+    assert [r["book"]["title"] for r in active] == [books[4], books[3]]
+    assert stream.active_next
+    assert [r["book"]["title"] for r in returned] == [books[1], books[0]]
+    assert stream.returned_next is None
+
+    older = store.loans.stream_for_user(user, active_after=stream.active_next, per_page=2, now=WHEN)
+    assert [r["book"]["title"] for r in older.active()] == [books[2]]
+    assert older.active_next is None
+    assert len(list(older.returned())) == 2  # the other section stays on its newest page
+
+
+def test_loans_pages_split_borrow_date_ties(store, users):
+    user = users[0]
+    store.books.seed([book(f"Title {i}") for i in range(5)])
+    oids = [b._id for b in store.books.stream_page(limit=10).books]
+    ids = {store.loans.create(user_id=user, book_id=oid, when=WHEN)._id for oid in oids}
+    seen, after = [], None
+    while True:
+        stream = store.loans.stream_for_user(user, active_after=after, per_page=2, now=WHEN)
+        seen += [ObjectId(r["id"]) for r in stream.active()]
+        after = stream.active_next
+        if after is None:
+            break
+    assert seen == sorted(ids, reverse=True)
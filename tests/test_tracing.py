@@ -0,0 +1,60 @@
+from flask import Flask, Response, jsonify, stream_with_context
+
+from Q2b import tracing
+from Q2b.tracing import QueryRecord, current_trace, query_shape
+
+
+def lookup():
+    """Stand-in for one Mongo round trip, as the QueryTracer would record it."""
+    current_trace().queries.append(QueryRecord("find", "books", query_shape("find", {"filter": {"_id": 1}}), ms=1.0))
+
+
+def traced_app(**config):
+    app = Flask(__name__)
+    app.config.update(TRACE_QUERIES=True, TRACE_SLOW_MS=1000, TRACE_MAX_ROUND_TRIPS=10,
+                      TRACE_REPEAT_THRESHOLD=3, TRACE_SERVER_TIMING=True, **config)
+    tracing.init_app(app)
+
+    @app.get("/streamed")
+    def streamed():
+        def rows():
+            for i in range(4):
+                lookup()  # one query per row, issued while the body is sent
+                yield f"<li>{i}</li>"
+        return Response(stream_with_context(rows()), mimetype="text/html")
+
+    @app.get("/plain")
+    def plain():
+        lookup()
+        return jsonify(ok=True)
+
+    return app
+
+
+def fetch(app, path):
+    response = app.test_client().get(path)
+    response.get_data()
+    response.close()
+    return response
+
+
+def test_streamed_body_queries_are_traced():
+    app = traced_app()
+    response = fetch(app, "/streamed")
+    assert "Server-Timing" not in response.headers
+    stats = app.trace_stats.stats()["streamed"]
+    assert stats["max_round_trips"] == 4
+    assert stats["n_plus_one"] == 1
+    assert current_trace() is None
+
+
+def test_plain_responses_get_server_timing():
+    app = traced_app()
+    response = fetch(app, "/plain")
+    assert response.headers["Server-Timing"].startswith('mongo;dur=1.0;desc="1 round trips"')
+    assert app.trace_stats.stats()["plain"]["n_plus_one"] == 0
+
+
+def test_shapes_drop_values():
+    assert query_shape("find", {"filter": {"_id": 1, "tags": {"$in": [1, 2, 3]}}}) == \
+        repr({"filter": {"_id": "?", "tags": {"$in": ["?"]}}})